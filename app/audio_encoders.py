@@ -0,0 +1,156 @@
+"""
+Audio Encoders
+Output encodings for synthesized audio and Accept-header negotiation
+"""
+import io
+import logging
+from math import gcd
+from typing import Callable, Dict, NamedTuple, Optional
+
+import numpy as np
+from scipy.io import wavfile
+from scipy.signal import resample_poly
+
+from app.audio_utils import decode_wav
+
+logger = logging.getLogger(__name__)
+
+# Opus only runs at these sample rates
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+
+
+class AudioEncoder(NamedTuple):
+    name: str
+    media_type: str
+    encode: Callable[[int, np.ndarray], bytes]
+
+
+def _encode_wav_int16(sample_rate: int, samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    wavfile.write(buffer, sample_rate, (np.clip(samples, -1.0, 1.0) * 32767.0).astype(np.int16))
+    return buffer.getvalue()
+
+
+def _encode_wav_float32(sample_rate: int, samples: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    wavfile.write(buffer, sample_rate, samples.astype(np.float32))
+    return buffer.getvalue()
+
+
+def _encode_flac(sample_rate: int, samples: np.ndarray) -> bytes:
+    import soundfile as sf
+
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, sample_rate, format="FLAC", subtype="PCM_16")
+    return buffer.getvalue()
+
+
+def _encode_ogg_opus(sample_rate: int, samples: np.ndarray) -> bytes:
+    import soundfile as sf
+
+    # Resample up to the nearest rate Opus supports (e.g. 22050 -> 24000)
+    target = next((rate for rate in OPUS_SAMPLE_RATES if rate >= sample_rate), OPUS_SAMPLE_RATES[-1])
+    if target != sample_rate:
+        divisor = gcd(target, sample_rate)
+        samples = resample_poly(samples, target // divisor, sample_rate // divisor).astype(np.float32)
+
+    buffer = io.BytesIO()
+    sf.write(buffer, samples, target, format="OGG", subtype="OPUS")
+    return buffer.getvalue()
+
+
+ENCODERS: Dict[str, AudioEncoder] = {}
+
+
+def register_encoder(name: str, media_type: str, encode: Callable[[int, np.ndarray], bytes]):
+    """
+    Register an output format
+
+    Args:
+        name: Format name used in `format=` and cache keys
+        media_type: Content-Type of the encoded audio
+        encode: Function of (sample_rate, float32 samples) -> encoded bytes
+    """
+    ENCODERS[name] = AudioEncoder(name, media_type, encode)
+
+
+register_encoder("wav-int16", "audio/wav", _encode_wav_int16)
+register_encoder("wav-float32", "audio/wav", _encode_wav_float32)
+register_encoder("flac", "audio/flac", _encode_flac)
+register_encoder("ogg-opus", "audio/ogg; codecs=opus", _encode_ogg_opus)
+
+# Accept media types -> format names
+_MEDIA_TYPES = {
+    "audio/ogg": "ogg-opus",
+    "audio/opus": "ogg-opus",
+    "audio/flac": "flac",
+    "audio/x-flac": "flac",
+}
+_WAV_MEDIA_TYPES = {"audio/wav", "audio/x-wav", "audio/wave", "audio/vnd.wave"}
+
+
+def encode_audio(audio: bytes, audio_format: str) -> bytes:
+    """
+    Encode a WAV rendering into an output format
+
+    Args:
+        audio: WAV bytes as produced by the engine
+        audio_format: Registered format name
+
+    Returns:
+        Encoded audio bytes
+    """
+    sample_rate, samples = decode_wav(audio)
+    return encode_samples(sample_rate, samples, audio_format)
+
+
+def encode_samples(sample_rate: int, samples: np.ndarray, audio_format: str) -> bytes:
+    """Encode float samples into an output format"""
+    return ENCODERS[audio_format].encode(sample_rate, samples)
+
+
+def get_media_type(audio_format: str) -> str:
+    """Content-Type for a format"""
+    return ENCODERS[audio_format].media_type
+
+
+def negotiate_format(requested: Optional[str], accept: Optional[str], default: str) -> str:
+    """
+    Pick an output format
+
+    An explicit `format=` wins. Otherwise the highest-quality acceptable
+    media type in the Accept header is used, falling back to `default`.
+
+    Raises:
+        ValueError: If `requested` is not a registered format
+    """
+    if requested:
+        if requested not in ENCODERS:
+            raise ValueError(f"Unknown format '{requested}', expected one of: {', '.join(ENCODERS)}")
+        return requested
+
+    if not accept:
+        return default
+
+    candidates = []
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [token.strip() for token in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type.lower()))
+
+    for _, _, media_type in sorted(candidates):
+        if media_type in _MEDIA_TYPES:
+            return _MEDIA_TYPES[media_type]
+        if media_type in _WAV_MEDIA_TYPES:
+            return default if default.startswith("wav-") else "wav-int16"
+        if media_type in ("audio/*", "*/*"):
+            return default
+
+    return default
@@ -0,0 +1,315 @@
+"""
+Audio Utilities
+Sentence splitting, WAV decoding, PCM framing, sample-level editing and
+loudness helpers
+"""
+import io
+import re
+import struct
+from typing import List, Tuple, Union
+
+import numpy as np
+import soundfile as sf
+from scipy.io import wavfile
+from scipy.signal import istft, lfilter, stft
+
+# Sentence ends (., !, ?, ellipses) followed by whitespace
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+# Clause boundaries used to break up overly long sentences
+_CLAUSE_END = re.compile(r"(?<=[,;:])\s+")
+
+
+def split_sentences(text: str, max_chars: int = 200) -> List[str]:
+    """
+    Split text into sentences, breaking long sentences at clause boundaries
+
+    Args:
+        text: Text to split
+        max_chars: Sentences longer than this are split at commas/semicolons
+
+    Returns:
+        Non-empty segments in order
+    """
+    segments = []
+    for sentence in _SENTENCE_END.split(text.strip()):
+        if len(sentence) <= max_chars:
+            segments.append(sentence)
+            continue
+
+        current = ""
+        for clause in _CLAUSE_END.split(sentence):
+            if current and len(current) + len(clause) + 1 > max_chars:
+                segments.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}" if current else clause
+        segments.append(current)
+
+    return [segment.strip() for segment in segments if segment.strip()]
+
+
+def decode_wav(audio: Union[bytes, memoryview]) -> Tuple[int, np.ndarray]:
+    """
+    Decode WAV bytes to mono float32 samples in [-1, 1]
+
+    Returns:
+        (sample_rate, samples)
+    """
+    sample_rate, samples = wavfile.read(io.BytesIO(audio))
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if samples.dtype == np.int16:
+        samples = samples.astype(np.float32) / 32768.0
+    elif samples.dtype == np.int32:
+        samples = samples.astype(np.float32) / 2147483648.0
+    elif samples.dtype == np.uint8:
+        samples = (samples.astype(np.float32) - 128.0) / 128.0
+    return sample_rate, samples.astype(np.float32, copy=False)
+
+
+def wav_duration(audio: Union[bytes, memoryview]) -> float:
+    """Duration of WAV audio in seconds, read from the header"""
+    return sf.info(io.BytesIO(audio)).duration
+
+
+def to_pcm16(samples: np.ndarray) -> bytes:
+    """Convert float samples to little-endian 16-bit PCM"""
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes()
+
+
+def streaming_wav_header(sample_rate: int, channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    """
+    WAV header for a stream of unknown length
+
+    The RIFF and data sizes are set to the maximum value, which players treat
+    as "read until end of stream".
+    """
+    block_align = channels * bits_per_sample // 8
+    return b"".join([
+        b"RIFF", struct.pack("<I", 0xFFFFFFFF), b"WAVE",
+        b"fmt ", struct.pack("<IHHIIHH", 16, 1, channels, sample_rate,
+                             sample_rate * block_align, block_align, bits_per_sample),
+        b"data", struct.pack("<I", 0xFFFFFFFF),
+    ])
+
+
+def trim_silence(samples: np.ndarray, sample_rate: int, threshold_db: float = -40.0, pad_ms: float = 10.0) -> np.ndarray:
+    """
+    Trim leading and trailing silence
+
+    Args:
+        samples: Float samples
+        sample_rate: Sample rate in Hz
+        threshold_db: Level (dBFS) below which audio counts as silence
+        pad_ms: Silence to keep on each side
+
+    Returns:
+        View of the non-silent region
+    """
+    above = np.flatnonzero(np.abs(samples) > 10 ** (threshold_db / 20))
+    if not len(above):
+        return samples[:0]
+    pad = int(sample_rate * pad_ms / 1000)
+    return samples[max(0, above[0] - pad):above[-1] + pad + 1]
+
+
+def rms_db(samples: np.ndarray) -> float:
+    """RMS level in dBFS"""
+    if not len(samples):
+        return -np.inf
+    return 20 * np.log10(max(float(np.sqrt(np.mean(np.square(samples, dtype=np.float64)))), 1e-9))
+
+
+def match_loudness(samples: np.ndarray, target_db: float) -> np.ndarray:
+    """Scale samples to an RMS level in dBFS"""
+    if not len(samples):
+        return samples
+    return samples * np.float32(10 ** ((target_db - rms_db(samples)) / 20))
+
+
+def crossfade_concat(segments: List[np.ndarray], sample_rate: int, crossfade_ms: float = 15.0) -> np.ndarray:
+    """
+    Join segments with short equal-power crossfades
+
+    The output is written into one preallocated buffer; each boundary overlaps
+    the tail of one segment with the head of the next.
+
+    Args:
+        segments: Float sample arrays at the same sample rate
+        sample_rate: Sample rate in Hz
+        crossfade_ms: Overlap at each boundary (shortened for very short segments)
+
+    Returns:
+        Joined samples
+    """
+    segments = [segment for segment in segments if len(segment)]
+    if not segments:
+        return np.zeros(0, dtype=np.float32)
+
+    fade = int(sample_rate * crossfade_ms / 1000)
+    overlaps = [min(fade, len(a) // 2, len(b) // 2) for a, b in zip(segments, segments[1:])]
+
+    out = np.empty(sum(len(segment) for segment in segments) - sum(overlaps), dtype=np.float32)
+    out[:len(segments[0])] = segments[0]
+    end = len(segments[0])
+
+    for segment, overlap in zip(segments[1:], overlaps):
+        start = end - overlap
+        if overlap:
+            ramp = np.linspace(0.0, np.pi / 2, overlap, dtype=np.float32)
+            out[start:end] = out[start:end] * np.cos(ramp) + segment[:overlap] * np.sin(ramp)
+        out[end:start + len(segment)] = segment[overlap:]
+        end = start + len(segment)
+
+    return out
+
+
+def _nearest_peaks(magnitude: np.ndarray) -> np.ndarray:
+    """For each bin of each frame (row), the bin index of the nearest spectral peak"""
+    n_bins = magnitude.shape[1]
+    bins = np.arange(n_bins)
+    edge = np.ones((len(magnitude), 1), dtype=bool)
+    rising = np.hstack([edge, magnitude[:, 1:] > magnitude[:, :-1]])
+    falling = np.hstack([magnitude[:, :-1] >= magnitude[:, 1:], edge])
+    is_peak = rising & falling  # every frame has at least one (its first maximum)
+
+    below = np.maximum.accumulate(np.where(is_peak, bins, -1), axis=1)
+    above = np.minimum.accumulate(np.where(is_peak, bins, n_bins)[:, ::-1], axis=1)[:, ::-1]
+    use_above = (below < 0) | ((above < n_bins) & (above - bins < bins - below))
+    return np.where(use_above, above, below)
+
+
+def time_stretch(samples: np.ndarray, rate: float, n_fft: int = 1024, hop: int = 256) -> np.ndarray:
+    """
+    Change tempo without changing pitch (phase vocoder with identity phase locking)
+
+    Output frames are read from fractional positions of the STFT, with
+    magnitudes interpolated between neighbouring frames. Each spectral
+    peak's phase advances by its measured instantaneous frequency, and the
+    bins around it keep their original phase offsets to it, which avoids
+    the smeared, "phasey" sound of a plain phase vocoder on speech.
+
+    Args:
+        samples: Float samples
+        rate: Speed-up factor (2.0 is twice as fast, half as long)
+        n_fft: Analysis window length in samples
+        hop: Hop between frames in samples
+
+    Returns:
+        Stretched samples, len(samples) / rate long
+    """
+    if rate == 1.0 or len(samples) < n_fft:
+        return samples
+    _, _, spec = stft(samples.astype(np.float32, copy=False), nperseg=n_fft, noverlap=n_fft - hop)
+    spec = spec.T  # frame-major, so per-frame rows are contiguous
+
+    # Fractional source frame for each output frame
+    positions = np.arange(0, len(spec) - 1, rate)
+    frame = positions.astype(int)
+    frac = (positions - frame).astype(np.float32)[:, None]
+    left, right = spec[frame], spec[frame + 1]
+    magnitude = (1 - frac) * np.abs(left) + frac * np.abs(right)
+
+    # Per-hop phase advance of each bin: expected rotation plus the wrapped deviation
+    expected = (2 * np.pi * hop / n_fft * np.arange(spec.shape[1])).astype(np.float32)
+    left_phase = np.angle(left)
+    advance = np.angle(right) - left_phase - expected
+    advance -= np.float32(2 * np.pi) * np.round(advance / np.float32(2 * np.pi))
+    advance += expected
+
+    # Phase of each bin relative to its peak; only peaks need the recurrence
+    peaks = _nearest_peaks(magnitude)
+    offset = left_phase - np.take_along_axis(left_phase, peaks, axis=1)
+    phase = np.empty_like(offset)
+    phase[0] = left_phase[0]
+    for j in range(1, len(phase)):
+        accumulated = phase[j - 1] + advance[j - 1]
+        phase[j] = accumulated[peaks[j]] + offset[j]
+
+    _, out = istft((magnitude * np.exp(1j * phase).astype(np.complex64)).T, nperseg=n_fft, noverlap=n_fft - hop)
+    length = int(round(len(samples) / rate))
+    out = out[:length] if len(out) >= length else np.pad(out, (0, length - len(out)))
+    return out.astype(np.float32)
+
+
+def _k_weighting(sample_rate: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+    """BS.1770 K-weighting (high shelf, then high pass) as biquads for any sample rate"""
+    # Shelving stage
+    k = np.tan(np.pi * 1681.974450955533 / sample_rate)
+    q = 0.7071752369554196
+    vh = 10 ** (3.999843853973347 / 20)
+    vb = vh ** 0.4996667741545416
+    a0 = 1 + k / q + k * k
+    shelf = (
+        np.array([(vh + vb * k / q + k * k) / a0, 2 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]),
+        np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]),
+    )
+    # High-pass stage
+    k = np.tan(np.pi * 38.13547087602444 / sample_rate)
+    q = 0.5003270373238773
+    a0 = 1 + k / q + k * k
+    high_pass = (np.array([1.0, -2.0, 1.0]), np.array([1.0, 2 * (k * k - 1) / a0, (1 - k / q + k * k) / a0]))
+    return [shelf, high_pass]
+
+
+def integrated_loudness(samples: np.ndarray, sample_rate: int) -> float:
+    """
+    Integrated loudness in LUFS (ITU-R BS.1770-4, mono)
+
+    K-weighted mean square over 400 ms blocks with 75% overlap, gated at
+    -70 LUFS and then 10 LU below the ungated level. Clips shorter than one
+    block are measured as a single block.
+
+    Returns:
+        Loudness in LUFS, or -inf for silence
+    """
+    if not len(samples):
+        return -np.inf
+    weighted = samples.astype(np.float64)
+    for b, a in _k_weighting(sample_rate):
+        weighted = lfilter(b, a, weighted)
+
+    block = int(0.4 * sample_rate)
+    step = block // 4
+    energy = np.concatenate([[0.0], np.cumsum(np.square(weighted))])
+    if len(weighted) <= block:
+        powers = np.array([energy[-1] / len(weighted)])
+    else:
+        starts = np.arange(0, len(weighted) - block + 1, step)
+        powers = (energy[starts + block] - energy[starts]) / block
+
+    with np.errstate(divide="ignore"):
+        levels = -0.691 + 10 * np.log10(powers)
+    gated = levels > -70.0
+    if not gated.any():
+        return -np.inf
+    relative_gate = -0.691 + 10 * np.log10(powers[gated].mean()) - 10.0
+    return float(-0.691 + 10 * np.log10(powers[gated & (levels > relative_gate)].mean()))
+
+
+def normalize_loudness(samples: np.ndarray, sample_rate: int, target_lufs: float,
+                       peak_ceiling_db: float = -1.0) -> np.ndarray:
+    """
+    Scale samples to an integrated loudness
+
+    The gain is limited so sample peaks stay below `peak_ceiling_db` dBFS,
+    so quiet clips with loud transients can end up under the target rather
+    than clipping.
+
+    Args:
+        samples: Float samples
+        sample_rate: Sample rate in Hz
+        target_lufs: Integrated loudness to reach
+        peak_ceiling_db: Highest sample peak allowed after the gain
+
+    Returns:
+        Scaled samples (unchanged if silent)
+    """
+    measured = integrated_loudness(samples, sample_rate)
+    if not np.isfinite(measured):
+        return samples
+    gain = 10 ** ((target_lufs - measured) / 20)
+    peak = float(np.max(np.abs(samples)))
+    if peak > 0:
+        gain = min(gain, 10 ** (peak_ceiling_db / 20) / peak)
+    return samples * np.float32(gain)
@@ -1,78 +1,635 @@
+import asyncio
+import contextvars
 import hashlib
-import pickle
+import random
+from collections import OrderedDict, deque
 from pathlib import Path
 import logging
-from typing import Optional
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple, Union
+
+from app import metrics
+from app.audio_encoders import encode_audio, encode_samples
+from app.audio_utils import crossfade_concat, decode_wav, split_sentences, wav_duration
+from app.config import settings
+from app.inference_executor import (
+    InferenceQueueFull, PriorityRef, current_priority, inference_priority, set_current_priority
+)
+from app.memory_cache import MemoryCache
+from app.post_process import PostProcess
+from app.segment_store import SegmentStore
+from app.text_normalizer import canonicalize
+from app.voice_registry import VoiceRegistry
 
 logger = logging.getLogger(__name__)
 
+# Phrases whose variant pools are tracked (recent picks, pending top-ups)
+MAX_POOLED_PHRASES = 10000
+
 class AudioCacheManager:
     """Manages pre-generated and cached audio"""
 
-    def __init__(self, tts_engine, jim_personality, cache_dir: str = "cache/pregenerated"):
+    def __init__(self, tts_engine, jim_personality, cache_dir: str = "cache/pregenerated",
+                 voices: Optional[VoiceRegistry] = None, engine_id: str = "", shard_concurrency: int = 1):
         self.tts_engine = tts_engine
         self.jim_personality = jim_personality
+        self.voices = voices
+        self.engine_id = engine_id
+        self.shard_concurrency = max(1, shard_concurrency)
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(parents=True, exist_ok=True)
 
-        # In-memory cache for fastest access
-        self.memory_cache = {}
+        # Byte-budgeted in-memory cache for fastest access
+        self.memory_cache = MemoryCache(
+            max_bytes=settings.memory_cache_max_bytes,
+            policy=settings.memory_cache_policy
+        )
+        self.disk_hits = 0
+        self.disk_misses = 0
 
-        # Load existing cache from disk
-        self._load_disk_cache()
+        # Indexed, memory-mapped disk store; opening it only reads the index
+        self.store = SegmentStore(self.cache_dir)
+        self._remove_pickle_cache()
+        self._store_generation = self.store.generation
 
-    def _get_cache_key(self, text: str) -> str:
-        """Generate cache key from text"""
-        return hashlib.md5(text.encode()).hexdigest()
+        # Syntheses currently running, keyed like the cache, so concurrent
+        # identical requests share one result instead of each synthesizing.
+        # Each carries its own priority so an urgent joiner can raise it.
+        self._inflight: Dict[str, Tuple[asyncio.Task, PriorityRef]] = {}
 
-    def _load_disk_cache(self):
-        """Load cached audio files from disk into memory"""
-        logger.info("Loading cached audio from disk...")
-        count = 0
+        # Cache key -> (sha256, length) of its audio, for entries already content-addressed
+        self._digests: Dict[str, Tuple[str, int]] = {}
+
+        # Personality variant pools, keyed by (canonical text, quality, voice):
+        # recently served renderings, and pools still missing some
+        self.variant_pool_size = max(1, settings.personality_variants)
+        self._recent_variants: "OrderedDict[tuple, Deque[str]]" = OrderedDict()
+        self._pool_top_ups: "OrderedDict[tuple, None]" = OrderedDict()
+        self._top_up_wakeup = asyncio.Event()
+        self._top_up_task: Optional[asyncio.Task] = None
+        self.variants_rendered = 0
+
+    def spoken_text(
+        self,
+        text: str,
+        quality: Optional[str] = None,
+        use_personality: bool = True,
+        variant: int = 0
+    ) -> str:
+        """
+        The text actually synthesized for a request, which audio is cached under
+
+        Requests are canonicalized first, so trivially different spellings
+        share audio. The personality transform is seeded, so the same
+        arguments always give the same text.
+
+        Args:
+            text: Commentary as requested
+            quality: Throw quality the personality reacts to
+            use_personality: Apply Jim's personality transformation
+            variant: Personality rendering to use
+
+        Returns:
+            Text to synthesize and to pass to the other cache methods
+        """
+        canonical = canonicalize(text)
+        if not use_personality:
+            return canonical
+        return self.jim_personality.enhance_text(canonical, quality, variant)
+
+    def variant_texts(self, text: str, quality: Optional[str] = None) -> List[str]:
+        """
+        The distinct personality renderings in a phrase's variant pool
+
+        Short lines can have fewer distinct renderings than the pool size.
+        The first is always variant 0, what spoken_text gives by default.
+        """
+        canonical = canonicalize(text)
+        pool = []
+        # A few extra seeds, since different seeds often render the same text
+        for variant in range(self.variant_pool_size * 4):
+            spoken = self.jim_personality.enhance_text(canonical, quality, variant)
+            if spoken not in pool:
+                pool.append(spoken)
+                if len(pool) == self.variant_pool_size:
+                    break
+        return pool
+
+    def spoken_variant(
+        self,
+        text: str,
+        quality: Optional[str] = None,
+        use_personality: bool = True,
+        voice: Optional[str] = None
+    ) -> str:
+        """
+        Pick a personality rendering to serve, preferring ones already cached
+
+        Picks at random among the cached variants in the phrase's pool,
+        avoiding the most recently served ones, so repeats sound different
+        without waiting on synthesis. Missing variants are queued to be
+        rendered in the background while inference is idle; until one is
+        cached, variant 0 is used.
+
+        Args:
+            text: Commentary as requested
+            quality: Throw quality the personality reacts to
+            use_personality: Apply Jim's personality transformation
+            voice: Voice the audio will be in
 
-        for cache_file in self.cache_dir.glob("*.pkl"):
+        Returns:
+            Spoken text to look up and synthesize (see spoken_text)
+
+        Raises:
+            KeyError: If the voice is not registered
+        """
+        if not use_personality or self.variant_pool_size == 1:
+            return self.spoken_text(text, quality, use_personality)
+
+        pool = self.variant_texts(text, quality)
+        stored = [spoken for spoken in pool if self._is_stored(self._get_cache_key(spoken, voice))]
+        phrase = (canonicalize(text), quality, voice)
+        if len(stored) < len(pool):
+            self._queue_top_up(phrase)
+        if not stored:
+            return pool[0]
+
+        recent = self._recent_variants.get(phrase)
+        if recent is None:
+            recent = deque(maxlen=max(1, self.variant_pool_size // 2))
+            self._recent_variants[phrase] = recent
+            if len(self._recent_variants) > MAX_POOLED_PHRASES:
+                self._recent_variants.popitem(last=False)
+        self._recent_variants.move_to_end(phrase)
+
+        choice = random.choice([spoken for spoken in stored if spoken not in recent] or stored)
+        recent.append(choice)
+        return choice
+
+    def _queue_top_up(self, phrase: tuple):
+        self._pool_top_ups[phrase] = None
+        self._pool_top_ups.move_to_end(phrase)
+        if len(self._pool_top_ups) > MAX_POOLED_PHRASES:
+            self._pool_top_ups.popitem(last=False)
+        self._top_up_wakeup.set()
+
+    def start_top_up(self, executor, poll_interval_s: float = 0.05):
+        """
+        Start rendering missing pool variants in the background
+
+        Each synthesis waits until the executor has nothing running or
+        queued, and runs at background priority.
+
+        Args:
+            executor: Inference executor whose idleness gates the work
+            poll_interval_s: How often to re-check for idleness
+        """
+        if self._top_up_task is None:
+            self._top_up_task = asyncio.create_task(self._top_up(executor, poll_interval_s))
+
+    async def stop_top_up(self):
+        if self._top_up_task:
+            self._top_up_task.cancel()
             try:
-                with open(cache_file, 'rb') as f:
-                    data = pickle.load(f)
-                    self.memory_cache[data['key']] = data['audio']
-                    count += 1
-            except Exception as e:
-                logger.error(f"Error loading cache file {cache_file}: {e}")
+                await self._top_up_task
+            except asyncio.CancelledError:
+                pass
+            self._top_up_task = None
+
+    async def _top_up(self, executor, poll_interval_s: float):
+        while True:
+            await self._top_up_wakeup.wait()
+            self._top_up_wakeup.clear()
+
+            while self._pool_top_ups:
+                (text, quality, voice), _ = self._pool_top_ups.popitem(last=False)
+                for spoken in self.variant_texts(text, quality):
+                    try:
+                        if self.is_cached(spoken, voice):
+                            continue
+                    except KeyError:
+                        # The voice has been deleted
+                        break
+                    while not executor.is_idle():
+                        await asyncio.sleep(poll_interval_s)
+
+                    async def synthesize(spoken=spoken) -> bytes:
+                        logger.debug(f"Rendering variant: {spoken[:50]}")
+                        return await self.synthesize(spoken, voice)
+
+                    try:
+                        with inference_priority("background"):
+                            _, status = await self.get_or_generate(spoken, synthesize, voice)
+                    except InferenceQueueFull:
+                        break
+                    except Exception as e:
+                        logger.error(f"Failed to render variant '{spoken[:50]}': {e}")
+                        break
+                    if status == "MISS":
+                        self.variants_rendered += 1
+
+    async def synthesize(self, text: str, voice: Optional[str] = None) -> bytes:
+        """
+        Synthesize spoken text, sharding long text by sentence
+
+        Text longer than SHARD_MIN_CHARS is split at sentence boundaries
+        and the sentences are synthesized concurrently, each through the
+        cache, so they spread over the available inference slots, batches
+        or servers, and an edited text only resynthesizes the sentences
+        that changed. At most `shard_concurrency` shards are submitted at
+        once. The shards are stitched with short crossfades.
+
+        Args:
+            text: Spoken text (see spoken_text)
+            voice: Voice to synthesize in (None: the default voice)
+
+        Returns:
+            WAV audio as bytes
+
+        Raises:
+            KeyError: If the voice is not registered
+        """
+        speaker_wav = self.speaker_wav(voice)
+        shards = split_sentences(text) if 0 < settings.shard_min_chars < len(text) else [text]
+        if len(shards) < 2:
+            return await self.tts_engine.generate_audio(text, speaker_wav=speaker_wav)
+
+        # Only as many shards as can actually run are submitted at a time, so
+        # a long text never fills the inference queue by itself
+        slots = asyncio.Semaphore(self.shard_concurrency)
+
+        async def synthesize_shard(shard: str) -> Union[bytes, memoryview]:
+            async def generate() -> bytes:
+                async with slots:
+                    return await self.tts_engine.generate_audio(shard, speaker_wav=speaker_wav)
+            audio, _ = await self.get_or_generate(shard, generate, voice)
+            return audio
+
+        logger.info(f"Synthesizing {len(shards)} shards: {text[:50]}...")
+        results = await asyncio.gather(*(synthesize_shard(shard) for shard in shards))
+        with metrics.stage("stitch"):
+            return await asyncio.to_thread(self._stitch, results)
+
+    @staticmethod
+    def _stitch(shards: List[Union[bytes, memoryview]]) -> bytes:
+        decoded = [decode_wav(audio) for audio in shards]
+        sample_rate = decoded[0][0]
+        samples = crossfade_concat([samples for _, samples in decoded], sample_rate, settings.shard_crossfade_ms)
+        return encode_samples(sample_rate, samples, "wav-float32")
+
+    def _get_cache_key(self, text: str, voice: Optional[str] = None, speed: float = 0.95, post: str = "") -> str:
+        """
+        Generate cache key from everything that determines the audio
+
+        That is the spoken text, the voice (by its clip's content hash, so
+        replacing a voice never serves stale audio), the speed, the engine
+        and any post-processing (PostProcess.key) derived from it.
+
+        Raises:
+            KeyError: If the voice is not registered
+        """
+        record = self.voices.resolve(voice) if voice and self.voices else None
+        if record:
+            voice_id = record["sha256"]
+        else:
+            voice_id = self.voices.default_sha256 if self.voices else None
+        key = "\0".join([self.engine_id, voice_id or "", f"{speed:g}", text] + ([post] if post else []))
+        return hashlib.md5(key.encode()).hexdigest()
+
+    def speaker_wav(self, voice: Optional[str]) -> Optional[str]:
+        """Reference clip to synthesize a voice with (None: the engine's default voice)"""
+        record = self.voices.resolve(voice) if voice and self.voices else None
+        return record["path"] if record else None
+
+    def _remove_pickle_cache(self):
+        """
+        Delete the legacy one-.pkl-per-phrase cache
+
+        Its entries record neither the engine nor the voice that rendered
+        them, and their text predates canonicalization, so they can't be
+        given current cache keys. Imported under their old keys they would
+        never be found again.
+        """
+        pickle_files = list(self.cache_dir.glob("*.pkl"))
+        if not pickle_files:
+            return
+
+        count = 0
+        for cache_file in pickle_files:
+            try:
+                cache_file.unlink()
+                count += 1
+            except OSError as e:
+                logger.error(f"Error removing legacy cache file {cache_file}: {e}")
+
+        logger.info(f"🧹 Removed {count} legacy cache files (they will be synthesized again on demand)")
+
+    def get_cached(
+        self, text: str, voice: Optional[str] = None, speed: float = 0.95
+    ) -> Optional[Union[bytes, memoryview]]:
+        """Get cached audio for spoken text (disk hits are zero-copy views)"""
+        return self._get(self._get_cache_key(text, voice, speed))
+
+    def is_cached(self, text: str, voice: Optional[str] = None, speed: float = 0.95) -> bool:
+        """Check for cached (or in-flight) audio without touching hit statistics"""
+        key = self._get_cache_key(text, voice, speed)
+        return self._is_stored(key) or key in self._inflight
 
-        logger.info(f"📦 Loaded {count} cached audio files")
+    def is_fragment_cached(self, text: str, voice: Optional[str] = None) -> bool:
+        """Check for a cached (or in-flight) template fragment"""
+        key = f"fragment:{self._get_cache_key(text, voice)}"
+        return self._is_stored(key) or key in self._inflight
 
-    def get_cached(self, text: str) -> Optional[bytes]:
-        """Get cached audio for text"""
-        key = self._get_cache_key(text)
-        return self.memory_cache.get(key)
+    def _is_stored(self, key: str) -> bool:
+        self._sync_clear()
+        return key in self.memory_cache or key in self.store
 
-    def cache_audio(self, text: str, audio_bytes: bytes):
+    def _sync_clear(self):
+        """Drop this worker's memory tier and digests once any worker has cleared the store"""
+        self.store.refresh()
+        if self.store.generation != self._store_generation:
+            self._store_generation = self.store.generation
+            self.memory_cache.clear()
+            self._digests.clear()
+
+    def cache_audio(self, text: str, audio_bytes: bytes, voice: Optional[str] = None, speed: float = 0.95):
         """Cache audio in memory and on disk"""
-        key = self._get_cache_key(text)
+        self._put(
+            self._get_cache_key(text, voice, speed), audio_bytes,
+            {"format": "wav", "text": text, "voice": voice, "speed": speed}
+        )
+
+    def _get(self, key: str) -> Optional[Union[bytes, memoryview]]:
+        self._sync_clear()
+        audio = self.memory_cache.get(key)
+        if audio is not None:
+            return audio
+
+        # Fall through to disk, promoting the entry if memory admits it
+        audio = self.store.get(key)
+        if audio is None:
+            self.disk_misses += 1
+            return None
+        self.disk_hits += 1
+        self.memory_cache.put(key, bytes(audio))
+        return audio
 
+    def _put(self, key: str, audio_bytes: bytes, meta: dict):
         # Store in memory
-        self.memory_cache[key] = audio_bytes
+        self.memory_cache.put(key, audio_bytes)
 
         # Store on disk
-        cache_file = self.cache_dir / f"{key}.pkl"
         try:
-            with open(cache_file, 'wb') as f:
-                pickle.dump({'key': key, 'text': text, 'audio': audio_bytes}, f)
+            with metrics.stage("disk_write"):
+                self.store.put(key, audio_bytes, meta)
         except Exception as e:
             logger.error(f"Error caching to disk: {e}")
 
+    async def get_or_generate(
+        self,
+        text: str,
+        generate: Callable[[], Awaitable[bytes]],
+        voice: Optional[str] = None,
+        speed: float = 0.95
+    ) -> Tuple[bytes, str]:
+        """
+        Get cached audio, or synthesize it exactly once across concurrent callers
+
+        Args:
+            text: Spoken text (see spoken_text)
+            generate: Coroutine factory that synthesizes the audio on a miss
+            voice: Voice the audio is in (None: the default voice)
+            speed: Speech rate the audio is synthesized at
+
+        Returns:
+            (audio bytes, status) where status is HIT, MISS or COALESCED
+        """
+        return await self._get_or_create(
+            self._get_cache_key(text, voice, speed), generate,
+            {"format": "wav", "text": text, "voice": voice, "speed": speed}
+        )
+
+    async def get_or_generate_fragment(
+        self,
+        text: str,
+        generate: Callable[[], Awaitable[bytes]],
+        voice: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """
+        Get or synthesize a reusable template fragment
+
+        Fragments (fixed template text and slot values) are cached apart from
+        whole utterances so the same words can't collide across the two.
+
+        Returns:
+            (audio bytes, status) where status is HIT, MISS or COALESCED
+        """
+        return await self._get_or_create(
+            f"fragment:{self._get_cache_key(text, voice)}", generate,
+            {"format": "wav", "text": text, "voice": voice, "kind": "fragment"}
+        )
+
+    async def get_or_encode(
+        self,
+        text: str,
+        audio_format: str,
+        audio: Union[bytes, memoryview],
+        voice: Optional[str] = None,
+        speed: float = 0.95,
+        post: str = ""
+    ) -> bytes:
+        """
+        Get cached audio for text in an output format, encoding it once on a miss
+
+        Args:
+            text: Spoken text the base WAV is cached under
+            audio_format: Output format name (see app.audio_encoders)
+            audio: Base (or derived) WAV rendering to encode from
+            voice, speed, post: What else the WAV is cached under
+
+        Returns:
+            Encoded audio
+        """
+        async def encode() -> bytes:
+            with metrics.stage("encode"):
+                return await asyncio.to_thread(encode_audio, bytes(audio), audio_format)
+
+        encoded, _ = await self._get_or_create(
+            f"{self._get_cache_key(text, voice, speed, post)}.{audio_format}", encode,
+            {"format": audio_format, "text": text, "voice": voice, "speed": speed, "post": post}
+        )
+        return encoded
+
+    async def get_or_process(
+        self,
+        text: str,
+        audio: Union[bytes, memoryview],
+        post: PostProcess,
+        voice: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """
+        Get a post-processed variant of a cached rendering, deriving it once on a miss
+
+        Variants (other speeds, loudness, trimming) are cached as entries of
+        their own, so each costs a few milliseconds of DSP once rather than
+        a synthesis.
+
+        Args:
+            text: Spoken text the base WAV is cached under
+            audio: Base WAV rendering to derive from
+            post: Adjustments to apply
+            voice: Voice the base WAV is cached under
+
+        Returns:
+            (audio bytes, status) where status is HIT, MISS or COALESCED
+        """
+        async def process() -> bytes:
+            with metrics.stage("post_process"):
+                return await asyncio.to_thread(post.apply, bytes(audio))
+
+        return await self._get_or_create(
+            self._get_cache_key(text, voice, post=post.key), process,
+            {"format": "wav", "text": text, "voice": voice, "post": post.key, "kind": "derived"}
+        )
+
+    async def _get_or_create(
+        self,
+        key: str,
+        create: Callable[[], Awaitable[bytes]],
+        meta: dict
+    ) -> Tuple[bytes, str]:
+        with metrics.stage("cache_lookup"):
+            cached = self._get(key)
+        if cached:
+            return cached, "HIT"
+
+        priority = current_priority()
+        pending = self._inflight.get(key)
+        if pending is not None:
+            task, task_priority = pending
+            task_priority.raise_to(priority.name)
+            return await asyncio.shield(task), "COALESCED"
+
+        # Run as its own task so one caller disconnecting doesn't cancel the
+        # work the others are waiting on
+        task_priority = PriorityRef(priority.name)
+        context = contextvars.copy_context()
+        context.run(set_current_priority, task_priority)
+        # The task times its own stages; they are added to this request's once it's done
+        task_timings = context.run(metrics.start_timings)
+        task = asyncio.get_running_loop().create_task(self._create_and_cache(key, create, meta), context=context)
+        self._inflight[key] = (task, task_priority)
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        audio = await asyncio.shield(task)
+        metrics.merge_timings(task_timings)
+        return audio, "MISS"
+
+    async def _create_and_cache(self, key: str, create: Callable[[], Awaitable[bytes]], meta: dict) -> bytes:
+        audio = await create()
+        if "stitch" in metrics.current_timings():
+            # Joined from shards, whose synthesis is already recorded
+            meta = {**meta, "kind": "stitched"}
+        if meta["format"] == "wav" and meta.get("kind") not in ("derived", "stitched"):
+            synthesis_s = metrics.current_timings().get("inference", 0.0)
+            metrics.record_synthesis(synthesis_s, wav_duration(audio))
+        self._put(key, audio, meta)
+        return audio
+
+    def content_address(
+        self,
+        text: str,
+        audio_format: str,
+        audio: Union[bytes, memoryview],
+        voice: Optional[str] = None,
+        speed: float = 0.95,
+        post: str = ""
+    ) -> str:
+        """
+        Publish encoded audio under its content hash
+
+        The alias shares the encoded variant's blob on disk, so it costs one
+        index record. Each entry is hashed once per process.
+
+        Args:
+            text, audio_format, voice, speed, post: What the encoded variant is cached under
+            audio: The encoded audio (as returned by get_or_encode)
+
+        Returns:
+            Hex sha256 of the audio, for /tts/audio/{sha256}
+        """
+        key = f"{self._get_cache_key(text, voice, speed, post)}.{audio_format}"
+        self._sync_clear()
+        known = self._digests.get(key)
+        # The length check catches an entry regenerated after a clear
+        if known and known[1] == len(audio):
+            digest = known[0]
+        else:
+            digest = hashlib.sha256(audio).hexdigest()
+            self._digests[key] = (digest, len(audio))
+
+        alias = f"sha256:{digest}"
+        if alias not in self.store:
+            try:
+                self.store.link(alias, key, bytes(audio), {"format": audio_format})
+            except Exception as e:
+                logger.error(f"Error publishing content address: {e}")
+        return digest
+
+    def get_by_digest(self, digest: str) -> Optional[Tuple[memoryview, str]]:
+        """
+        Look up content-addressed audio
+
+        Returns:
+            (zero-copy audio view, format name), or None if unknown
+        """
+        alias = f"sha256:{digest}"
+        audio = self.store.get(alias)
+        if audio is None:
+            return None
+        return audio, self.store.get_meta(alias)["format"]
+
+    def get_inflight_count(self) -> int:
+        """Get number of syntheses currently in flight"""
+        return len(self._inflight)
+
     def get_cache_size(self) -> int:
         """Get number of cached items"""
-        return len(self.memory_cache)
+        return sum(1 for key in self.store.keys() if not key.startswith("sha256:"))
+
+    def get_stats(self) -> dict:
+        """Get cache statistics"""
+        disk_lookups = self.disk_hits + self.disk_misses
+        keys = list(self.store.keys())
+        addresses = sum(1 for key in keys if key.startswith("sha256:"))
+        fragments = sum(1 for key in keys if key.startswith("fragment:"))
+        encoded = sum(1 for key in keys if "." in key)
+        derived = sum(1 for key in keys if (self.store.get_meta(key) or {}).get("kind") == "derived")
+        return {
+            "utterances": len(keys) - addresses - fragments - encoded - derived,
+            "derived_variants": derived,
+            "fragments": fragments,
+            "encoded_variants": encoded,
+            "content_addresses": addresses,
+            "variants": {
+                "pool_size": self.variant_pool_size,
+                "rendered": self.variants_rendered,
+                "pending_top_ups": len(self._pool_top_ups),
+            },
+            "memory": self.memory_cache.get_stats(),
+            "disk": {
+                **self.store.get_stats(),
+                "hits": self.disk_hits,
+                "misses": self.disk_misses,
+                "hit_ratio": round(self.disk_hits / disk_lookups, 4) if disk_lookups else 0.0
+            }
+        }
 
     def clear_cache(self):
         """Clear all cached audio"""
         self.memory_cache.clear()
-        for cache_file in self.cache_dir.glob("*.pkl"):
-            try:
-                cache_file.unlink()
-            except Exception as e:
-                logger.error(f"Error deleting cache file: {e}")
+        self.store.clear()
+        self._digests.clear()
+        # Other workers notice the new store on their next lookup and drop their copies
+        self._store_generation = self.store.generation
         logger.info("Cache cleared")
 
     async def pregenerate_common_phrases(self):
@@ -89,14 +646,82 @@ class AudioCacheManager:
             "Game over!",
             "What a comeback!",
         ]
+        await self.pregenerate_phrases([{"text": phrase} for phrase in common_phrases])
 
+    def page_in(self, phrases: List[dict]) -> List[dict]:
+        """
+        Load cached phrases into the memory tier, hottest first
+
+        Only reads what is already on disk, so it needs no TTS engine and can
+        run before the model has loaded. Stops admitting once the memory
+        budget is used.
+
+        Args:
+            phrases: [{"text": ..., "quality": ..., "use_personality": ..., "voice": ...}, ...]
+                in priority order
+
+        Returns:
+            The phrases that are not cached at all
+        """
+        paged = 0
+        missing = []
+        for phrase in phrases:
+            try:
+                spoken = self.spoken_text(phrase["text"], phrase.get("quality"), phrase.get("use_personality", True))
+                key = self._get_cache_key(spoken, phrase.get("voice"))
+            except KeyError:
+                # The voice has been deleted since
+                continue
+            if key in self.memory_cache:
+                continue
+            audio = self.store.get(key)
+            if audio is None:
+                missing.append(phrase)
+            elif self.memory_cache.bytes + len(audio) <= self.memory_cache.max_bytes:
+                self.memory_cache.put(key, bytes(audio))
+                paged += 1
+
+        logger.info(f"🔥 Paged in {paged} hot phrases ({len(missing)} not cached)")
+        return missing
+
+    async def pregenerate_phrases(self, phrases: List[dict]):
+        """Synthesize uncached phrases at background priority, in order"""
         generated = 0
-        for phrase in common_phrases:
-            if not self.get_cached(phrase):
-                logger.info(f"Pre-generating: {phrase}")
-                enhanced = self.jim_personality.enhance_text(phrase)
-                audio = await self.tts_engine.generate_audio(enhanced)
-                self.cache_audio(phrase, audio)
-                generated += 1
-
-        logger.info(f"✅ Pre-generated {generated} new phrases ({len(common_phrases) - generated} were cached)")
+        with inference_priority("background"):
+            for phrase in phrases:
+                try:
+                    status = await self.pregenerate(
+                        phrase["text"], phrase.get("quality"), phrase.get("use_personality", True), phrase.get("voice")
+                    )
+                except Exception as e:
+                    logger.error(f"Failed to pre-generate '{phrase['text'][:50]}': {e}")
+                    continue
+                if status != "HIT":
+                    generated += 1
+
+        logger.info(f"✅ Pre-generated {generated} new phrases ({len(phrases) - generated} were cached)")
+
+    async def pregenerate(
+        self,
+        text: str,
+        quality: Optional[str] = None,
+        use_personality: bool = True,
+        voice: Optional[str] = None
+    ) -> str:
+        """
+        Make sure a phrase is cached, sharing any in-flight synthesis
+
+        Returns:
+            HIT, MISS or COALESCED
+
+        Raises:
+            KeyError: If the voice is not registered
+        """
+        spoken = self.spoken_text(text, quality, use_personality)
+
+        async def synthesize() -> bytes:
+            logger.info(f"Pre-generating: {spoken[:50]}")
+            return await self.synthesize(spoken, voice)
+
+        _, status = await self.get_or_generate(spoken, synthesize, voice)
+        return status
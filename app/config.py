@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List, Literal
+from typing import List, Literal, Optional
 import platform
 import os
 
@@ -10,10 +10,58 @@ class Settings(BaseSettings):
     log_level: str = "INFO"
 
     # TTS Engine settings
-    tts_engine: Literal["auto", "xtts", "mlx"] = "auto"  # auto-detect or force specific engine
+    tts_engine: Literal["auto", "xtts", "mlx", "stub"] = "auto"  # auto-detect or force specific engine
     tts_model: str = "tts_models/multilingual/multi-dataset/xtts_v2"
     tts_device: str = "cpu"  # 'cpu' or 'cuda' (for XTTS)
     speaker_wav: str = "/app/voices/jim_voice.wav"
+    speaker_latent_dir: str = "/app/cache/latents"  # persisted voice conditioning latents
+
+    # CPU inference tuning (XTTS)
+    xtts_cpu_optimize: bool = False  # int8 dynamic quantization of the GPT transformer (CPU only)
+    xtts_warm_up: bool = True  # run one synthesis at load so the first request doesn't pay for it
+    torch_threads: int = 0  # intra-op threads per synthesis (0: torch default, one per core)
+    torch_interop_threads: int = 0  # inter-op threads (0: torch default)
+
+    # Voice registry settings
+    voices_dir: str = "/app/cache/voices"  # uploaded reference clips (must be writable)
+    voice_cache_size: int = 8  # voices whose conditioning latents stay in memory
+    voice_max_upload_bytes: int = 20 * 1024 * 1024  # largest reference clip accepted
+
+    # Inference queue settings
+    inference_workers: int = 1  # concurrent synthesis calls (model is shared)
+    inference_queue_size: int = 8  # requests allowed to wait before rejecting
+    inference_retry_after: int = 5  # seconds suggested to clients when queue is full
+    priority_aging_s: float = 10.0  # queued work moves up one priority class per this many seconds
+    stream_chunk_size: int = 20  # GPT tokens per chunk for WebSocket streaming
+
+    # Multi-worker settings
+    inference_mode: Literal["local", "remote"] = "local"  # remote: HTTP workers share inference server processes
+    inference_socket: str = "/tmp/tts-inference.sock"  # unix socket base path; server i listens on {path}.{i}
+    inference_processes: int = 1  # inference server processes (each loads one copy of the model)
+    inference_authkey: str = ""  # shared secret for the inference sockets (required in remote mode)
+    inference_connect_timeout_s: float = 600.0  # how long HTTP workers wait for servers to load the model
+
+    # Micro-batching settings
+    micro_batch_enabled: bool = False  # group concurrent requests into engine batches (engines that batch inference)
+    micro_batch_max_size: int = 4  # flush when this many requests are waiting
+    micro_batch_max_wait_ms: int = 20  # or when the oldest has waited this long
+
+    # Stub engine settings (testing/benchmarks)
+    stub_latency_ms: int = 200  # simulated inference time per call (idle wait)
+    stub_cpu_ms: int = 0  # simulated inference CPU work per call, on top of the latency
+
+    # Output settings
+    default_audio_format: Literal["wav-int16", "wav-float32", "flac", "ogg-opus"] = "wav-int16"
+    output_loudness_lufs: Optional[float] = None  # normalize /tts/generate audio to this integrated loudness (unset: as synthesized)
+    output_trim_silence: bool = False  # trim leading/trailing silence from /tts/generate audio
+
+    # Long text settings
+    shard_min_chars: int = 200  # longer text is split by sentence and the sentences synthesized concurrently (0: never)
+    shard_crossfade_ms: float = 10.0  # overlap between stitched sentences
+
+    # Template composition settings
+    compose_crossfade_ms: float = 15.0  # overlap between stitched fragments
+    compose_loudness_db: float = -20.0  # RMS level fragments are matched to
 
     @property
     def selected_engine(self) -> str:
@@ -33,6 +81,25 @@ class Settings(BaseSettings):
     # Cache settings
     cache_dir: str = "/app/cache/pregenerated"
     pregenerate_on_startup: bool = True
+    jobs_dir: str = "/app/cache/jobs"  # pregeneration job state, shared by all workers
+    memory_cache_max_bytes: int = 256 * 1024 * 1024  # in-memory audio budget
+    memory_cache_policy: Literal["lru", "tinylfu"] = "lru"  # eviction/admission policy
+
+    # Request history (drives warm start)
+    request_log_path: str = "/app/cache/requests.log"  # rotating JSON-lines request log
+    request_log_max_bytes: int = 5 * 1024 * 1024  # rotate the log at this size
+    request_log_backups: int = 3  # rotated logs to keep
+    phrase_stats_path: str = "/app/cache/phrase_stats.json"  # decayed per-phrase counts
+    phrase_half_life_hours: float = 24.0  # request counts halve over this period
+    warm_start_top_k: int = 50  # phrases to warm on startup, by expected hit value
+
+    # Speculative generation (only while inference is idle)
+    speculation_enabled: bool = True  # pregenerate likely next phrases between requests
+    speculation_candidates: int = 3  # most likely successors considered per request
+    speculation_min_probability: float = 0.2  # skip successors less likely than this
+
+    # Personality variety
+    personality_variants: int = 3  # pre-rendered personality renderings kept per phrase (1: always the same one)
 
     # SSL settings
     ssl_cert_path: str = "/app/certs/cert.pem"
@@ -0,0 +1,290 @@
+"""
+Inference Executor
+Runs blocking model inference on dedicated worker threads behind a bounded,
+priority-ordered queue
+"""
+import asyncio
+import bisect
+import contextvars
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, List, Optional
+
+from app import metrics
+
+logger = logging.getLogger(__name__)
+
+# Priority classes, most urgent first
+PRIORITIES = ("interactive", "prefetch", "background")
+
+# Upper bounds (ms) of the queue wait histogram buckets
+WAIT_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue is at capacity"""
+
+    def __init__(self, queue_size: int, retry_after: int):
+        super().__init__(f"Inference queue full ({queue_size} waiting), retry later")
+        self.queue_size = queue_size
+        self.retry_after = retry_after
+
+
+class PriorityRef:
+    """
+    Mutable priority shared by everyone waiting on the same piece of work
+
+    When a more urgent caller joins work that was queued at a lower priority
+    (e.g. a live request coalescing onto a warm-up synthesis), it raises the
+    priority in place and the queued call is dispatched accordingly.
+    """
+
+    __slots__ = ("level",)
+
+    def __init__(self, priority: str = "interactive"):
+        self.level = PRIORITIES.index(priority)
+
+    @property
+    def name(self) -> str:
+        return PRIORITIES[self.level]
+
+    def raise_to(self, priority: str):
+        self.level = min(self.level, PRIORITIES.index(priority))
+
+
+_current_priority: ContextVar[Optional[PriorityRef]] = ContextVar("inference_priority", default=None)
+
+
+@contextmanager
+def inference_priority(priority: str):
+    """Run inference submitted from this context at the given priority"""
+    token = _current_priority.set(PriorityRef(priority))
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def current_priority() -> PriorityRef:
+    """Priority of inference submitted from the current context"""
+    return _current_priority.get() or PriorityRef("interactive")
+
+
+def set_current_priority(ref: PriorityRef):
+    """Make `ref` the priority for the rest of the current context"""
+    _current_priority.set(ref)
+
+
+class WaitHistogram:
+    """Cumulative histogram of queue wait times"""
+
+    def __init__(self):
+        self.counts = [0] * (len(WAIT_BUCKETS_MS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(WAIT_BUCKETS_MS, seconds * 1000)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def get_stats(self) -> dict:
+        cumulative = 0
+        buckets = {}
+        for bound, count in zip(list(WAIT_BUCKETS_MS) + ["+Inf"], self.counts):
+            cumulative += count
+            buckets[str(bound)] = cumulative
+        return {
+            "count": self.count,
+            "avg_wait_ms": round(self.sum / self.count * 1000, 2) if self.count else 0.0,
+            "wait_histogram_ms": buckets,
+        }
+
+
+class _Waiter:
+    __slots__ = ("priority", "future", "enqueued")
+
+    def __init__(self, priority: PriorityRef, future: asyncio.Future):
+        self.priority = priority
+        self.future = future
+        self.enqueued = time.perf_counter()
+
+
+class InferenceExecutor:
+    """
+    Bounded, priority-aware executor for blocking synthesis calls
+
+    Synthesis runs on its own thread pool so the event loop stays free to serve
+    cache hits and health checks. At most `workers` calls run at once and at most
+    `max_queue` more may wait. Free workers always go to the most urgent class
+    (interactive, then prefetch, then background); a waiting call moves up one
+    class for every `aging_s` seconds it has waited, so lower classes can't be
+    starved. When the queue is full an urgent call displaces the least urgent
+    waiter, otherwise it is rejected immediately with InferenceQueueFull.
+    """
+
+    def __init__(self, workers: int = 1, max_queue: int = 8, retry_after: int = 5,
+                 aging_s: float = 10.0, name: str = "tts-inference"):
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self.retry_after = retry_after
+        self.aging_s = aging_s
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=name)
+
+        self._free = self.workers
+        self._waiters: List[_Waiter] = []
+        self._running = 0
+
+        # Stats
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_wait = 0.0
+        self.last_wait = 0.0
+        self.waits: Dict[str, WaitHistogram] = {priority: WaitHistogram() for priority in PRIORITIES}
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of calls waiting for a worker"""
+        return len(self._waiters)
+
+    @property
+    def running(self) -> int:
+        """Number of calls currently executing"""
+        return self._running
+
+    def is_idle(self) -> bool:
+        """True when nothing is running or waiting"""
+        return not self._waiters and self._running == 0
+
+    def _rank(self, waiter: _Waiter, now: float):
+        aged = (now - waiter.enqueued) / self.aging_s if self.aging_s > 0 else 0.0
+        return (waiter.priority.level - aged, waiter.enqueued)
+
+    async def run(self, func: Callable, *args, **kwargs):
+        """
+        Run a blocking function on the inference pool
+
+        The call is queued at the priority of the current context (see
+        inference_priority), interactive by default.
+
+        Args:
+            func: Blocking callable (e.g. a model forward pass)
+            *args, **kwargs: Passed through to func
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            InferenceQueueFull: If all workers are busy and the queue is full
+        """
+        priority = current_priority()
+        enqueued = time.perf_counter()
+
+        if self._free > 0 and not self._waiters:
+            self._free -= 1
+        else:
+            self._make_room(priority)
+            waiter = _Waiter(priority, asyncio.get_running_loop().create_future())
+            self._waiters.append(waiter)
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.future.done() and not waiter.future.cancelled() and waiter.future.exception() is None:
+                    # Granted a worker just as we were cancelled; hand it on
+                    self._release()
+                raise
+
+        wait = time.perf_counter() - enqueued
+        self.last_wait = wait
+        self.max_wait = max(self.max_wait, wait)
+        self.waits[priority.name].observe(wait)
+        metrics.record_stage("queue_wait", wait)
+
+        def timed():
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                metrics.record_stage("inference", elapsed)
+                metrics.SYNTHESIS_SECONDS.inc(elapsed)
+
+        self._running += 1
+        loop = asyncio.get_running_loop()
+        # Run in a copy of the caller's context so the worker thread records
+        # stage timings against the request that submitted it
+        context = contextvars.copy_context()
+        future = loop.run_in_executor(self._pool, context.run, timed)
+        # Release the worker when the thread finishes, not when the caller stops
+        # waiting, so a cancelled request can't oversubscribe the workers
+        future.add_done_callback(self._on_done)
+        return await asyncio.shield(future)
+
+    def _make_room(self, priority: PriorityRef):
+        """Reject the call, or displace a less urgent waiter, if the queue is full"""
+        if len(self._waiters) < self.max_queue:
+            return
+
+        now = time.perf_counter()
+        victim = max(self._waiters, key=lambda waiter: self._rank(waiter, now)) if self._waiters else None
+        self.rejected += 1
+        if victim is None or victim.priority.level <= priority.level:
+            raise InferenceQueueFull(len(self._waiters), self.retry_after)
+
+        self._waiters.remove(victim)
+        victim.future.set_exception(InferenceQueueFull(len(self._waiters), self.retry_after))
+        logger.info(f"Displaced queued {victim.priority.name} call for {priority.name} work")
+
+    def _on_done(self, future: asyncio.Future):
+        self._running -= 1
+        if future.cancelled() or future.exception() is not None:
+            self.failed += 1
+        else:
+            self.completed += 1
+        self._release()
+
+    def _release(self):
+        """Free a worker and hand it to the most urgent waiter"""
+        self._free += 1
+        now = time.perf_counter()
+        while self._free > 0 and self._waiters:
+            waiter = min(self._waiters, key=lambda waiter: self._rank(waiter, now))
+            self._waiters.remove(waiter)
+            if waiter.future.done():
+                continue
+            self._free -= 1
+            waiter.future.set_result(None)
+
+    def get_stats(self) -> dict:
+        """Get queue depth and wait-time statistics, overall and per priority class"""
+        started = sum(histogram.count for histogram in self.waits.values())
+        total_wait = sum(histogram.sum for histogram in self.waits.values())
+        return {
+            "workers": self.workers,
+            "running": self._running,
+            "queue_depth": len(self._waiters),
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+            "avg_wait_ms": round(total_wait / started * 1000, 2) if started else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 2),
+            "last_wait_ms": round(self.last_wait * 1000, 2),
+            "classes": {
+                priority: {
+                    "waiting": sum(1 for waiter in self._waiters if waiter.priority.name == priority),
+                    **histogram.get_stats(),
+                }
+                for priority, histogram in self.waits.items()
+            },
+        }
+
+    def shutdown(self):
+        """Stop accepting work and release worker threads"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
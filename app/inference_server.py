@@ -0,0 +1,215 @@
+"""
+Inference Server
+Hosts the TTS model in its own process so several HTTP workers can share it
+
+Run one or more servers next to a multi-worker uvicorn:
+    python -m app.inference_server --index 0
+
+HTTP workers reach them through RemoteTTSEngine (INFERENCE_MODE=remote).
+"""
+import argparse
+import asyncio
+import contextvars
+import logging
+import os
+import queue
+import threading
+from multiprocessing.connection import Connection, Listener
+from typing import Dict, Optional, Tuple
+
+from app.config import settings
+from app.inference_executor import InferenceQueueFull, PriorityRef, inference_priority, set_current_priority
+
+logger = logging.getLogger(__name__)
+
+
+def inference_socket_path(index: int) -> str:
+    """Unix socket path of inference server `index`"""
+    return f"{settings.inference_socket}.{index}"
+
+
+def inference_authkey() -> bytes:
+    """
+    Shared secret for the inference sockets
+
+    Requests are pickled, so anyone holding the key can run code in the
+    server. There is no default: it must be set to a private value.
+
+    Raises:
+        RuntimeError: If INFERENCE_AUTHKEY is not set
+    """
+    if not settings.inference_authkey:
+        raise RuntimeError("INFERENCE_AUTHKEY must be set to a private value in remote mode")
+    return settings.inference_authkey.encode()
+
+
+class InferenceServer:
+    """
+    Serves synthesis requests over a unix socket
+
+    Each client connection gets a thread that reads one request at a time:
+        {"op": "info"}
+        {"op": "generate", "text": ..., "speed": ..., "speaker_wav": ..., "priority": ...}
+        {"op": "batch", "texts": [...], "speed": ..., "speaker_wav": ..., "priority": ...}
+        {"op": "stream", "text": ..., "speed": ..., "chunk_size": ..., "speaker_wav": ..., "priority": ...}
+    and answers {"ok": True, "result": ...} or {"ok": False, "error": ...}.
+    A stream is answered with {"chunk": bytes} messages first, and the client
+    may send {"op": "cancel"} while it runs; a cancel arriving after the
+    stream's final reply is ignored.
+
+    Requests run on the engine's own inference executor at the caller's
+    priority, so work from every HTTP worker is scheduled together.
+    Identical concurrent generate requests share one synthesis.
+    """
+
+    def __init__(self, engine, address: str, authkey: bytes):
+        self.engine = engine
+        self.address = address
+        self.authkey = authkey
+        self.loop: asyncio.AbstractEventLoop = None
+        self._inflight: Dict[Tuple[str, float, Optional[str]], Tuple[asyncio.Task, PriorityRef]] = {}
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        if os.path.exists(self.address):
+            os.unlink(self.address)
+        listener = Listener(self.address, family="AF_UNIX", authkey=self.authkey)
+        logger.info(f"✅ Inference server listening on {self.address}")
+
+        try:
+            while True:
+                conn = await asyncio.to_thread(listener.accept)
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+        finally:
+            listener.close()
+
+    def _handle(self, conn: Connection):
+        try:
+            while True:
+                request = conn.recv()
+                if request.get("op") == "cancel":
+                    # Cancel for a stream that already finished: it gets no reply,
+                    # or every later reply would be one request behind
+                    continue
+                conn.send(self._dispatch(conn, request))
+        except (EOFError, OSError):
+            pass
+        finally:
+            conn.close()
+
+    def _dispatch(self, conn: Connection, request: dict) -> dict:
+        op = request.get("op")
+        try:
+            if op == "info":
+                result = {
+                    "sample_rate": self.engine.sample_rate,
+                    "gpu": self.engine.is_gpu_available(),
+                    "voice": self.engine.get_voice_info(),
+                }
+            elif op == "generate":
+                result = self._run(self._generate(
+                    request["text"], request["speed"], request.get("speaker_wav"), request["priority"]
+                ))
+            elif op == "batch":
+                result = self._run(self._batch(
+                    request["texts"], request["speed"], request.get("speaker_wav"), request["priority"]
+                ))
+            elif op == "stream":
+                self._stream(conn, request)
+                result = None
+            else:
+                raise ValueError(f"Unknown operation: {op}")
+        except InferenceQueueFull as e:
+            return {"ok": False, "error": "queue_full", "queue_size": e.queue_size, "retry_after": e.retry_after}
+        except Exception as e:
+            logger.error(f"Inference request {op} failed: {e}")
+            return {"ok": False, "error": "failed", "detail": str(e)}
+
+        return {"ok": True, "result": result}
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def _generate(self, text: str, speed: float, speaker_wav: Optional[str], priority: str) -> bytes:
+        key = (text, speed, speaker_wav)
+        pending = self._inflight.get(key)
+        if pending is not None:
+            task, task_priority = pending
+            task_priority.raise_to(priority)
+            return await asyncio.shield(task)
+
+        task_priority = PriorityRef(priority)
+        context = contextvars.copy_context()
+        context.run(set_current_priority, task_priority)
+        task = self.loop.create_task(self.engine.generate_audio(text, speed, speaker_wav), context=context)
+        self._inflight[key] = (task, task_priority)
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task)
+
+    async def _batch(self, texts, speed: float, speaker_wav: Optional[str], priority: str):
+        with inference_priority(priority):
+            return await self.engine.generate_batch(texts, speed, speaker_wav)
+
+    def _stream(self, conn: Connection, request: dict):
+        """Relay stream chunks as they are produced, watching for a cancel"""
+        cancel = threading.Event()
+        chunks: queue.Queue = queue.Queue()
+
+        async def produce():
+            with inference_priority(request["priority"]):
+                async for chunk in self.engine.stream_audio(
+                    request["text"], speed=request["speed"], chunk_size=request["chunk_size"],
+                    cancel=cancel, speaker_wav=request.get("speaker_wav")
+                ):
+                    chunks.put(chunk)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self.loop)
+        while True:
+            try:
+                conn.send({"chunk": chunks.get(timeout=0.05)})
+                continue
+            except queue.Empty:
+                pass
+            if conn.poll() and conn.recv().get("op") == "cancel":
+                cancel.set()
+            if future.done() and chunks.empty():
+                break
+        future.result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a TTS inference server")
+    parser.add_argument("--index", type=int, default=0, help="Server number (selects the socket path)")
+    args = parser.parse_args()
+    authkey = inference_authkey()
+
+    logging.basicConfig(
+        level=getattr(logging, settings.log_level),
+        format=f'%(asctime)s - inference[{args.index}] - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    # This process hosts the model itself
+    settings.inference_mode = "local"
+    from app.tts_engine import create_tts_engine, micro_batching_enabled
+    from app.micro_batcher import MicroBatcher
+
+    logger.info("Loading TTS model...")
+    engine = create_tts_engine(
+        model_name=settings.tts_model,
+        device=settings.tts_device,
+        speaker_wav=settings.speaker_wav
+    )
+    if micro_batching_enabled():
+        # Requests from every HTTP worker meet here, so this is where batching pays
+        engine = MicroBatcher(
+            engine,
+            max_batch_size=settings.micro_batch_max_size,
+            max_wait_ms=settings.micro_batch_max_wait_ms
+        )
+
+    server = InferenceServer(engine, inference_socket_path(args.index), authkey)
+    asyncio.run(server.serve())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,4 +1,4 @@
-import random
+from random import Random
 import re
 
 class JimPersonality:
@@ -36,17 +36,23 @@ class JimPersonality:
             "anyway",
         ]
 
-    def enhance_text(self, text: str, quality: str = None) -> str:
+    def enhance_text(self, text: str, quality: str = None, variant: int = 0) -> str:
         """
         Make text sound like drunk Jim
 
+        The choices are seeded from the arguments, so the result is a pure
+        function of them and can be cached; a different variant gives a
+        different (but equally repeatable) rendering.
+
         Args:
             text: Original commentary
             quality: Throw quality (great, good, okay, bad, miss, bust, game_winner)
+            variant: Seed selecting one of the possible renderings
 
         Returns:
             Enhanced text with Jim's personality
         """
+        rng = Random(f"{variant}|{quality}|{text}")
         enhanced = text
 
         # Add pauses and ellipses for drunk rambling
@@ -56,26 +62,26 @@ class JimPersonality:
         # Replace words with drunk versions
         for word, replacements in self.drunk_replacements.items():
             if word in enhanced.lower():
-                if random.random() < 0.4:  # 40% chance
-                    drunk_version = random.choice(replacements)
+                if rng.random() < 0.4:  # 40% chance
+                    drunk_version = rng.choice(replacements)
                     # Case-insensitive replacement
                     pattern = re.compile(re.escape(word), re.IGNORECASE)
                     enhanced = pattern.sub(drunk_version, enhanced, count=1)
 
         # Add interjections based on throw quality
         if quality in ["great", "game_winner"]:
-            if random.random() < 0.6:
-                interjection = random.choice(["*laughs*", "wooooow", "holy shit"])
+            if rng.random() < 0.6:
+                interjection = rng.choice(["*laughs*", "wooooow", "holy shit"])
                 enhanced = f"{interjection} {enhanced}"
 
         elif quality in ["bad", "miss"]:
-            if random.random() < 0.5:
-                interjection = random.choice(["*burps*", "*chuckles*", "oooooh"])
+            if rng.random() < 0.5:
+                interjection = rng.choice(["*burps*", "*chuckles*", "oooooh"])
                 enhanced = f"{interjection} {enhanced}"
 
         # Randomly add fillers for rambling effect
-        if random.random() < 0.3:
-            filler = random.choice(self.fillers)
+        if rng.random() < 0.3:
+            filler = rng.choice(self.fillers)
             # Insert filler in the middle
             words = enhanced.split()
             if len(words) > 3:
@@ -84,7 +90,7 @@ class JimPersonality:
                 enhanced = " ".join(words)
 
         # Add occasional trailing off
-        if random.random() < 0.2:
+        if rng.random() < 0.2:
             enhanced += "..."
 
         return enhanced
@@ -0,0 +1,283 @@
+"""
+Pregeneration Jobs
+Background batch pregeneration with progress polling and cancellation
+"""
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.inference_executor import InferenceQueueFull, inference_priority
+
+logger = logging.getLogger(__name__)
+
+# Item states that count as finished
+DONE_STATES = {"cached", "coalesced", "generated", "failed", "cancelled"}
+
+# Shortest interval between progress writes of a running job
+SAVE_INTERVAL_S = 0.5
+# How often a running job checks for a cancel requested through another worker
+CANCEL_POLL_S = 0.5
+
+
+class PregenerationJob:
+    """A batch of phrases being pregenerated in the background"""
+
+    def __init__(self, items: List[dict]):
+        self.id = uuid.uuid4().hex[:12]
+        self.items = [
+            {"text": item["text"], "quality": item.get("quality"), "voice": item.get("voice"), "status": "pending"}
+            for item in items
+        ]
+        self.status = "queued"
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        # Process running the job, as "host:pid"
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.saved = 0.0
+
+    @classmethod
+    def from_state(cls, state: dict) -> "PregenerationJob":
+        """Job as last saved by the worker running it (read-only: it has no task)"""
+        job = cls.__new__(cls)
+        job.id = state["id"]
+        job.items = state["items"]
+        job.status = state["status"]
+        job.created = state["created"]
+        job.started = state["started"]
+        job.finished = state["finished"]
+        job.task = None
+        job.owner = state["owner"]
+        job.saved = 0.0
+        return job
+
+    def state(self) -> dict:
+        """Everything from_state needs"""
+        return {
+            "id": self.id, "items": self.items, "status": self.status, "owner": self.owner,
+            "created": self.created, "started": self.started, "finished": self.finished,
+        }
+
+    def to_dict(self, include_items: bool = True) -> dict:
+        """Progress, throughput and ETA"""
+        counts: Dict[str, int] = {}
+        for item in self.items:
+            counts[item["status"]] = counts.get(item["status"], 0) + 1
+
+        done = sum(count for status, count in counts.items() if status in DONE_STATES)
+        elapsed = ((self.finished or time.time()) - self.started) if self.started else 0.0
+        throughput = done / elapsed if elapsed > 0 else 0.0
+        remaining = len(self.items) - done
+        if not remaining:
+            eta = 0.0
+        elif throughput:
+            eta = round(remaining / throughput, 1)
+        else:
+            eta = None
+
+        result = {
+            "job_id": self.id,
+            "status": self.status,
+            "total": len(self.items),
+            "done": done,
+            "counts": counts,
+            "elapsed_s": round(elapsed, 2),
+            "items_per_s": round(throughput, 3),
+            "eta_s": eta,
+        }
+        if include_items:
+            result["items"] = self.items
+        return result
+
+
+class JobManager:
+    """
+    Runs pregeneration jobs against the cache using all inference capacity
+
+    With a `state_dir`, job state is shared between worker processes: the
+    worker running a job writes its progress to `<state_dir>/<id>.json`
+    (atomically, at most every SAVE_INTERVAL_S), so any worker can report
+    on it. Cancelling another worker's job leaves a `<id>.cancel` marker
+    that the running worker picks up. A job whose process is gone is
+    reported as "interrupted".
+    """
+
+    def __init__(self, cache_manager, concurrency: int = 1, history: int = 50, state_dir: Optional[str] = None):
+        self.cache_manager = cache_manager
+        self.concurrency = max(1, concurrency)
+        self.history = history
+        self.jobs: "OrderedDict[str, PregenerationJob]" = OrderedDict()
+        self.state_dir = Path(state_dir) if state_dir else None
+        if self.state_dir:
+            self.state_dir.mkdir(parents=True, exist_ok=True)
+
+    def submit(self, items: List[dict]) -> PregenerationJob:
+        """
+        Start a job in the background
+
+        Args:
+            items: [{"text": ..., "quality": ..., "voice": ...}, ...]; items without text are skipped
+
+        Returns:
+            The queued job
+        """
+        job = PregenerationJob([item for item in items if item.get("text")])
+        self.jobs[job.id] = job
+        self._save(job)
+        self._trim_history()
+
+        # Explicitly requested warm-up: ahead of background work, behind live requests
+        with inference_priority("prefetch"):
+            job.task = asyncio.create_task(self._run(job))
+        logger.info(f"Pregeneration job {job.id} queued ({len(job.items)} items)")
+        return job
+
+    def get(self, job_id: str) -> Optional[PregenerationJob]:
+        """A job started by any worker"""
+        return self.jobs.get(job_id) or self._load(job_id)
+
+    def list_jobs(self) -> List[PregenerationJob]:
+        """Recent jobs of every worker, oldest first"""
+        jobs = {job.id: job for job in self._load_all()}
+        jobs.update(self.jobs)
+        return sorted(jobs.values(), key=lambda job: job.created)
+
+    def cancel(self, job_id: str) -> Optional[PregenerationJob]:
+        """Cancel a job; items already synthesizing still finish and get cached"""
+        job = self.jobs.get(job_id)
+        if job:
+            if job.task and not job.task.done():
+                job.task.cancel()
+            return job
+
+        # Running in another worker: leave it a marker
+        job = self._load(job_id)
+        if job and job.status in ("queued", "running"):
+            self._path(job_id, ".cancel").touch()
+        return job
+
+    def _path(self, job_id: str, suffix: str = ".json") -> Path:
+        return self.state_dir / f"{job_id}{suffix}"
+
+    def _save(self, job: PregenerationJob, force: bool = True):
+        """Publish a job's progress to the other workers"""
+        if not self.state_dir or (not force and time.time() - job.saved < SAVE_INTERVAL_S):
+            return
+        job.saved = time.time()
+        tmp_path = self._path(job.id, f".{os.getpid()}.tmp")
+        try:
+            tmp_path.write_text(json.dumps(job.state(), separators=(",", ":")))
+            os.replace(tmp_path, self._path(job.id))
+        except OSError as e:
+            logger.error(f"Error saving pregeneration job {job.id}: {e}")
+
+    def _load(self, job_id: str) -> Optional[PregenerationJob]:
+        """A job saved by another worker"""
+        if not self.state_dir or not job_id.isalnum():
+            return None
+        try:
+            job = PregenerationJob.from_state(json.loads(self._path(job_id).read_text()))
+        except (OSError, ValueError, KeyError):
+            return None
+        if not job.finished and not self._owner_alive(job.owner):
+            job.status = "interrupted"
+        return job
+
+    def _load_all(self) -> List[PregenerationJob]:
+        if not self.state_dir:
+            return []
+        jobs = (self._load(path.stem) for path in self.state_dir.glob("*.json"))
+        return [job for job in jobs if job]
+
+    @staticmethod
+    def _owner_alive(owner: str) -> bool:
+        """Whether the process running a job still exists (assumed so on other hosts)"""
+        host, _, pid = owner.rpartition(":")
+        if host != socket.gethostname():
+            return True
+        try:
+            os.kill(int(pid), 0)
+        except ProcessLookupError:
+            return False
+        except (PermissionError, ValueError):
+            pass
+        return True
+
+    def _trim_history(self):
+        """Forget the oldest finished jobs beyond the history limit"""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(self.jobs) - self.history)]:
+            del self.jobs[job_id]
+
+        # Shared state of every worker, including ones that have exited
+        jobs = [job for job in self._load_all() if job.status not in ("queued", "running")]
+        jobs.sort(key=lambda job: job.created)
+        for job in jobs[:max(0, len(jobs) - self.history)]:
+            for suffix in (".json", ".cancel"):
+                self._path(job.id, suffix).unlink(missing_ok=True)
+
+    async def _run(self, job: PregenerationJob):
+        job.status = "running"
+        job.started = time.time()
+        pending = iter(job.items)
+
+        async def worker():
+            for item in pending:
+                await self._process(item)
+                self._save(job, force=False)
+
+        watcher = asyncio.create_task(self._watch_cancel(job)) if self.state_dir else None
+        try:
+            self._save(job)
+            await asyncio.gather(*(worker() for _ in range(self.concurrency)))
+            job.status = "complete"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            for item in job.items:
+                if item["status"] in ("pending", "running"):
+                    item["status"] = "cancelled"
+        except Exception as e:
+            logger.error(f"Pregeneration job {job.id} failed: {e}")
+            job.status = "failed"
+        finally:
+            if watcher:
+                watcher.cancel()
+                self._path(job.id, ".cancel").unlink(missing_ok=True)
+            job.finished = time.time()
+            self._save(job)
+            logger.info(f"Pregeneration job {job.id} {job.status}: {job.to_dict(include_items=False)['counts']}")
+
+    async def _watch_cancel(self, job: PregenerationJob):
+        """Cancel the job when another worker asks for it"""
+        marker = self._path(job.id, ".cancel")
+        while not marker.exists():
+            await asyncio.sleep(CANCEL_POLL_S)
+        job.task.cancel()
+
+    async def _process(self, item: dict):
+        item["status"] = "running"
+        started = time.perf_counter()
+
+        while True:
+            try:
+                status = await self.cache_manager.pregenerate(item["text"], item["quality"], voice=item["voice"])
+                break
+            except InferenceQueueFull as e:
+                # Displaced or rejected in favour of live requests; back off and retry
+                await asyncio.sleep(e.retry_after)
+            except Exception as e:
+                logger.error(f"Failed to generate '{item['text']}': {e}")
+                item["status"] = "failed"
+                item["error"] = str(e)
+                return
+
+        item["status"] = {"HIT": "cached", "COALESCED": "coalesced"}.get(status, "generated")
+        item["duration_ms"] = round((time.perf_counter() - started) * 1000, 1)
@@ -1,16 +1,41 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import Response, FileResponse
+from fastapi import FastAPI, File, Form, HTTPException, Header, Query, UploadFile, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, FileResponse, JSONResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import io
+import re
+from contextlib import contextmanager
 import socket
+import threading
+import time
 import logging
+import numpy as np
 from pathlib import Path
-from typing import Optional
+from scipy.io.wavfile import write
+from string import Formatter
+from typing import Dict, Optional, Tuple, Union
 
-from .tts_engine import create_tts_engine
+from pydantic import BaseModel
+
+from .tts_engine import create_tts_engine, engine_fingerprint, inference_capacity, micro_batching_enabled
 from .tts_base import BaseTTSEngine
+from .micro_batcher import MicroBatcher
+from .inference_executor import InferenceQueueFull
 from .jim_personality import JimPersonality
 from .cache_manager import AudioCacheManager
+from .jobs import JobManager
+from .request_log import RequestLog
+from .speculator import Speculator
+from .voice_registry import VoiceRegistry
+from .text_normalizer import canonicalize
+from .post_process import MAX_SPEED, MIN_SPEED, PostProcess
 from .config import settings
+from . import metrics
+from .audio_utils import (
+    split_sentences, decode_wav, to_pcm16, streaming_wav_header,
+    trim_silence, match_loudness, crossfade_concat
+)
+from .audio_encoders import negotiate_format, get_media_type, encode_samples
 
 # Setup logging
 logging.basicConfig(
@@ -32,12 +57,41 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[
+        "Server-Timing", "X-Cache", "X-Derived", "X-Audio-Format",
+        "ETag", "Content-Location", "Content-Range", "Accept-Ranges"
+    ],
 )
 
+app.add_middleware(metrics.MetricsMiddleware)
+
+class AudioResponse(Response):
+    """WAV response that can send cached memoryview slices without copying"""
+    media_type = "audio/wav"
+
+    def render(self, content) -> Union[bytes, memoryview]:
+        if isinstance(content, memoryview):
+            return content
+        return super().render(content)
+
+# Content-addressed audio never changes, so clients and proxies may keep it forever
+AUDIO_CACHE_CONTROL = "public, max-age=31536000, immutable"
+DIGEST_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+
 # Global instances
-tts_engine: Optional[BaseTTSEngine] = None
+tts_engine: Optional[Union[BaseTTSEngine, MicroBatcher]] = None
 jim_personality: Optional[JimPersonality] = None
 cache_manager: Optional[AudioCacheManager] = None
+job_manager: Optional[JobManager] = None
+request_log: Optional[RequestLog] = None
+speculator: Optional[Speculator] = None
+voice_registry: Optional[VoiceRegistry] = None
+
+# Startup progress: starting -> loading_model -> ready (or failed)
+startup_state = "starting"
+startup_error: Optional[str] = None
+startup_phases: Dict[str, float] = {}
+startup_task: Optional[asyncio.Task] = None
 
 def get_local_ip():
     """Get local IP address"""
@@ -50,12 +104,109 @@ def get_local_ip():
     except Exception:
         return "Unable to determine"
 
+def engine_not_ready() -> HTTPException:
+    """Rejection for work that needs the model while it is still loading"""
+    return HTTPException(
+        status_code=503,
+        detail="TTS engine not ready",
+        headers={"Retry-After": str(settings.inference_retry_after)}
+    )
+
+def resolve_voice(voice: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Validate a requested voice
+
+    Returns:
+        (voice name, or None for the default voice; its reference clip)
+
+    Raises:
+        HTTPException: 404 if the voice is not registered
+    """
+    try:
+        record = voice_registry.resolve(voice)
+    except KeyError:
+        raise HTTPException(status_code=404, detail=f"Unknown voice: {voice}")
+    return (record["name"], record["path"]) if record else (None, None)
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Check an If-None-Match header against an ETag (weak comparison, per RFC 9110)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+def parse_byte_range(range_header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header
+
+    Args:
+        range_header: Range header value, e.g. "bytes=0-1023", "bytes=1024-" or "bytes=-500"
+        size: Full length of the resource
+
+    Returns:
+        (first, last) byte positions, inclusive, or None to send the whole
+        resource (no header, a malformed one, or several ranges)
+
+    Raises:
+        ValueError: If the range can't be satisfied
+    """
+    if not range_header:
+        return None
+    unit, _, spec = range_header.partition("=")
+    first, dash, last = spec.strip().partition("-")
+    if unit.strip().lower() != "bytes" or "," in spec or not dash:
+        return None
+    if not (first or last) or (first and not first.isdigit()) or (last and not last.isdigit()):
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        if int(last) == 0 or size == 0:
+            raise ValueError("Empty suffix range")
+        return max(0, size - int(last)), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError("Range starts past the end")
+    return start, end
+
+def queue_full_error(e: InferenceQueueFull) -> HTTPException:
+    """Fast rejection telling the client when to retry"""
+    return HTTPException(
+        status_code=503,
+        detail=str(e),
+        headers={"Retry-After": str(e.retry_after)}
+    )
+
+@contextmanager
+def startup_phase(name: str):
+    """Time a startup phase, log it and expose it on /readyz and /metrics"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_phases[name] = round(time.perf_counter() - started, 3)
+        metrics.STARTUP_SECONDS.set(startup_phases[name], name)
+        logger.info(f"⏱️  Startup phase {name}: {startup_phases[name]:.2f}s")
+
 @app.on_event("startup")
 async def startup_event():
-    """Initialize TTS engine"""
-    global tts_engine, jim_personality, cache_manager
+    """
+    Open the cache and start loading the TTS engine
+
+    Only the cheap parts run before the server accepts connections: opening
+    the cache index and request history, and paging hot phrases into memory.
+    The model loads in the background, so cache hits are served right away;
+    /readyz reports when misses can be synthesized too.
+    """
+    global jim_personality, cache_manager, job_manager, request_log, voice_registry, startup_state, startup_task
 
     local_ip = get_local_ip()
+    started = time.perf_counter()
 
     logger.info("=" * 70)
     logger.info("🎙️  Local TTS Server Starting...")
@@ -64,33 +215,127 @@ async def startup_event():
     logger.info("=" * 70)
 
     try:
-        logger.info("Loading TTS model...")
-        logger.info(f"Platform detected: {settings.selected_engine}")
-        tts_engine = create_tts_engine(
-            model_name=settings.tts_model,
-            device=settings.tts_device,
-            speaker_wav=settings.speaker_wav
-        )
+        with startup_phase("cache_open"):
+            jim_personality = JimPersonality()
+            voice_registry = VoiceRegistry(settings.voices_dir, default_speaker_wav=settings.speaker_wav)
+            # The engine is attached once it has loaded
+            cache_manager = AudioCacheManager(
+                None,
+                jim_personality,
+                cache_dir=settings.cache_dir,
+                voices=voice_registry,
+                engine_id=engine_fingerprint(),
+                shard_concurrency=inference_capacity()
+            )
 
-        jim_personality = JimPersonality()
-        cache_manager = AudioCacheManager(
-            tts_engine,
-            jim_personality,
-            cache_dir=settings.cache_dir
-        )
+            # Background jobs use every inference slot (and batch slot, if batching)
+            job_manager = JobManager(cache_manager, concurrency=inference_capacity(), state_dir=settings.jobs_dir)
 
-        if settings.pregenerate_on_startup:
-            logger.info("Pre-generating common phrases...")
-            await cache_manager.pregenerate_common_phrases()
+        with startup_phase("request_history"):
+            request_log = RequestLog(
+                settings.request_log_path,
+                settings.phrase_stats_path,
+                max_bytes=settings.request_log_max_bytes,
+                backups=settings.request_log_backups,
+                half_life_s=settings.phrase_half_life_hours * 3600
+            )
+            request_log.start()
 
-        logger.info("=" * 70)
-        logger.info("✅ Server ready! TTS engine loaded and standing by...")
-        logger.info("=" * 70)
+        # Warm with what clients actually request; the static list is only a
+        # fallback until there is some history
+        warm_up = None
+        if settings.pregenerate_on_startup:
+            hot_phrases = request_log.top_phrases(settings.warm_start_top_k)
+            if hot_phrases:
+                with startup_phase("page_in"):
+                    warm_up = cache_manager.page_in(hot_phrases)
 
     except Exception as e:
         logger.error(f"Failed to initialize: {e}")
         raise
 
+    startup_state = "loading_model"
+    startup_task = asyncio.create_task(load_engine(started, warm_up))
+    logger.info("Accepting requests; serving cached audio while the model loads")
+
+async def load_engine(started: float, warm_up: Optional[list]):
+    """
+    Load the TTS engine off the event loop, then run warm-up synthesis
+
+    Args:
+        started: perf_counter() value when startup began
+        warm_up: Hot phrases still to synthesize, or None for the static list
+    """
+    global tts_engine, speculator, startup_state, startup_error
+
+    try:
+        with startup_phase("model_load"):
+            logger.info("Loading TTS model...")
+            logger.info(f"Platform detected: {settings.selected_engine}")
+            engine = await asyncio.to_thread(
+                create_tts_engine,
+                model_name=settings.tts_model,
+                device=settings.tts_device,
+                speaker_wav=settings.speaker_wav
+            )
+        # In remote mode the inference servers do the batching
+        if micro_batching_enabled():
+            logger.info(f"Micro-batching up to {settings.micro_batch_max_size} requests / {settings.micro_batch_max_wait_ms} ms")
+            engine = MicroBatcher(
+                engine,
+                max_batch_size=settings.micro_batch_max_size,
+                max_wait_ms=settings.micro_batch_max_wait_ms
+            )
+        elif settings.micro_batch_enabled and settings.inference_mode == "local":
+            logger.warning(f"Micro-batching disabled: the {settings.selected_engine} engine can't batch inference")
+
+        cache_manager.tts_engine = engine
+        tts_engine = engine
+        cache_manager.start_top_up(tts_engine.inference)
+
+        if settings.speculation_enabled:
+            speculator = Speculator(
+                cache_manager,
+                tts_engine.inference,
+                candidates=settings.speculation_candidates,
+                min_probability=settings.speculation_min_probability
+            )
+            speculator.start()
+
+    except Exception as e:
+        startup_state = "failed"
+        startup_error = str(e)
+        logger.error(f"Failed to load TTS engine: {e}")
+        return
+
+    startup_state = "ready"
+    startup_phases["ready"] = round(time.perf_counter() - started, 3)
+    metrics.STARTUP_SECONDS.set(startup_phases["ready"], "ready")
+
+    logger.info("=" * 70)
+    logger.info(f"✅ Server ready in {startup_phases['ready']:.2f}s! TTS engine loaded and standing by...")
+    logger.info("=" * 70)
+
+    if settings.pregenerate_on_startup:
+        with startup_phase("warm_up"):
+            if warm_up is None:
+                logger.info("Pre-generating common phrases...")
+                await cache_manager.pregenerate_common_phrases()
+            else:
+                await cache_manager.pregenerate_phrases(warm_up)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background work and persist request history"""
+    if startup_task and not startup_task.done():
+        startup_task.cancel()
+    if speculator:
+        await speculator.stop()
+    if cache_manager:
+        await cache_manager.stop_top_up()
+    if request_log:
+        await request_log.stop()
+
 @app.get("/")
 async def root():
     """Server info"""
@@ -101,10 +346,19 @@ async def root():
         "protocol": "HTTPS",
         "endpoints": {
             "health": "/health",
+            "liveness": "/livez",
+            "readiness": "/readyz",
             "generate": "/tts/generate",
+            "audio": "/tts/audio/{sha256}",
+            "stream": "/tts/stream",
+            "websocket": "/tts/ws",
+            "compose": "/tts/compose",
+            "voices": "/voices",
             "batch": "/tts/batch-pregenerate",
+            "jobs": "/tts/jobs/{job_id}",
             "certificate": "/download-cert",
-            "cache_stats": "/cache/stats"
+            "cache_stats": "/cache/stats",
+            "metrics": "/metrics"
         }
     }
 
@@ -112,13 +366,45 @@ async def root():
 async def health():
     """Health check"""
     return {
-        "status": "healthy",
+        "status": "healthy" if startup_state == "ready" else startup_state,
+        "startup": {"state": startup_state, "error": startup_error, "phases_s": startup_phases},
         "tts_engine": "loaded" if tts_engine else "not loaded",
         "gpu_available": tts_engine.is_gpu_available() if tts_engine else False,
         "cached_items": cache_manager.get_cache_size() if cache_manager else 0,
-        "model": tts_engine.get_voice_info() if tts_engine else None
+        "model": tts_engine.get_voice_info() if tts_engine else None,
+        "inference": tts_engine.get_inference_stats() if tts_engine else None,
+        "batching": tts_engine.get_stats() if isinstance(tts_engine, MicroBatcher) else None,
+        "speculation": speculator.get_stats() if speculator else None
     }
 
+@app.get("/livez")
+async def livez():
+    """Liveness: the process is up and its event loop is responding"""
+    if startup_state == "failed":
+        raise HTTPException(status_code=503, detail=f"Startup failed: {startup_error}")
+    return {"status": "alive"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: the model is loaded, so cache misses can be synthesized"""
+    body = {"status": startup_state, "phases_s": startup_phases}
+    if startup_state != "ready":
+        return JSONResponse(body, status_code=503, headers={"Retry-After": str(settings.inference_retry_after)})
+    return body
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics: request counts, stage latencies, real-time factor"""
+    if tts_engine:
+        inference = tts_engine.get_inference_stats()
+        metrics.QUEUE_DEPTH.set(inference["queue_depth"])
+        metrics.INFERENCE_RUNNING.set(inference["running"])
+    if cache_manager:
+        metrics.CACHE_ITEMS.set(cache_manager.get_cache_size())
+        metrics.INFLIGHT.set(cache_manager.get_inflight_count())
+
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/download-cert")
 async def download_certificate():
     """Download SSL certificate for iOS installation"""
@@ -136,96 +422,524 @@ async def download_certificate():
 async def generate_commentary(
     text: str,
     quality: Optional[str] = None,
-    use_personality: bool = True
+    use_personality: bool = True,
+    voice: Optional[str] = None,
+    speed: Optional[float] = None,
+    loudness: Optional[float] = None,
+    audio_format: Optional[str] = Query(None, alias="format"),
+    redirect: bool = False,
+    accept: Optional[str] = Header(None)
 ) -> Response:
     """
     Generate single commentary audio
 
+    The audio is also published at an immutable, content-addressed URL
+    (/tts/audio/{sha256}), given in the Content-Location header, which
+    clients and proxies can cache and revalidate with its ETag.
+
     Args:
         text: Commentary text
         quality: Throw quality (great, good, okay, bad, miss, bust, game_winner)
         use_personality: Apply Jim's personality transformation
+        voice: Registered voice name (see /voices); the default voice when omitted
+        speed: Speech rate (0.5-2.0, default 0.95), derived from the cached
+            rendering by pitch-preserving time-stretching
+        loudness: Integrated loudness to normalize to, in LUFS (default
+            OUTPUT_LOUDNESS_LUFS)
+        format: Output format (wav-int16, wav-float32, flac, ogg-opus);
+            negotiated from the Accept header when omitted
+        redirect: Answer with a 303 redirect to the audio URL instead of the audio
 
     Returns:
-        WAV audio file
+        Audio file in the negotiated format
     """
-    if not tts_engine:
-        raise HTTPException(status_code=503, detail="TTS engine not ready")
+    if not cache_manager:
+        raise engine_not_ready()
 
     try:
-        # Check cache first
-        cached = cache_manager.get_cached(text)
-        if cached:
+        audio_format = negotiate_format(audio_format, accept, settings.default_audio_format)
+        post = PostProcess.for_request(speed, loudness)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    voice, _ = resolve_voice(voice)
+
+    # Audio is cached under exactly what is spoken; repeats of a phrase
+    # rotate through its cached personality variants
+    text = canonicalize(text)
+    with metrics.stage("enhance"):
+        spoken = cache_manager.spoken_variant(text, quality, use_personality, voice)
+
+    # Cached audio is served while the model is still loading
+    if not tts_engine and not cache_manager.is_cached(spoken, voice):
+        raise engine_not_ready()
+
+    async def synthesize() -> bytes:
+        logger.info(f"Generating: {spoken[:50]}...")
+        return await cache_manager.synthesize(spoken, voice)
+
+    started = time.perf_counter()
+    try:
+        # Cache hit, join an identical in-flight synthesis, or generate
+        audio, status = await cache_manager.get_or_generate(spoken, synthesize, voice)
+        if status == "HIT":
             logger.info(f"Cache hit: {text[:50]}...")
-            return Response(
-                content=cached,
-                media_type="audio/wav",
-                headers={"X-Cache": "HIT"}
-            )
+        elif status == "COALESCED":
+            logger.info(f"Coalesced with in-flight synthesis: {text[:50]}...")
+
+        # Speed, loudness and trim variants are derived from the base rendering
+        headers = {"X-Cache": status, "X-Audio-Format": audio_format, "Vary": "Accept"}
+        if post.key:
+            audio, headers["X-Derived"] = await cache_manager.get_or_process(spoken, audio, post, voice)
+
+        # Encoded variants are cached per format, so hot phrases encode once
+        encoded = await cache_manager.get_or_encode(spoken, audio_format, audio, voice, post=post.key)
+        request_log.record(text, quality, use_personality, status, (time.perf_counter() - started) * 1000, voice)
+        if speculator:
+            speculator.observe(text, quality, use_personality, status, voice)
+
+        digest = cache_manager.content_address(spoken, audio_format, encoded, voice, post=post.key)
+        audio_url = f"/tts/audio/{digest}"
+        if redirect:
+            return RedirectResponse(audio_url, status_code=303, headers=headers)
+
+        return AudioResponse(
+            content=encoded,
+            media_type=get_media_type(audio_format),
+            headers={**headers, "ETag": f'"{digest}"', "Content-Location": audio_url}
+        )
+
+    except InferenceQueueFull as e:
+        logger.warning(f"Rejected, inference queue full: {text[:50]}...")
+        raise queue_full_error(e)
+    except Exception as e:
+        logger.error(f"Generation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-        # Generate
-        logger.info(f"Generating: {text[:50]}...")
+@app.api_route("/tts/audio/{digest}", methods=["GET", "HEAD"])
+async def get_audio(
+    digest: str,
+    if_none_match: Optional[str] = Header(None),
+    range_header: Optional[str] = Header(None, alias="Range"),
+    if_range: Optional[str] = Header(None)
+) -> Response:
+    """
+    Content-addressed audio, as linked from /tts/generate
 
-        enhanced = jim_personality.enhance_text(text, quality) if use_personality else text
-        audio = await tts_engine.generate_audio(enhanced)
+    The URL is the sha256 of the audio, so the response never changes: it
+    carries a strong ETag and an immutable Cache-Control. If-None-Match is
+    answered with 304 and a single byte Range with 206 (416 when it can't
+    be satisfied), for seeking and progressive playback.
 
-        # Cache and return
-        cache_manager.cache_audio(text, audio)
+    Args:
+        digest: Hex sha256 of the audio
+    """
+    if not cache_manager:
+        raise HTTPException(status_code=503, detail="Cache not ready")
 
-        return Response(
-            content=audio,
-            media_type="audio/wav",
-            headers={"X-Cache": "MISS"}
-        )
+    found = cache_manager.get_by_digest(digest) if DIGEST_PATTERN.match(digest) else None
+    if not found:
+        raise HTTPException(status_code=404, detail="Audio not found")
+    audio, audio_format = found
+
+    etag = f'"{digest}"'
+    headers = {"ETag": etag, "Cache-Control": AUDIO_CACHE_CONTROL, "Accept-Ranges": "bytes"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+
+    # A Range is only honored if the client's copy (If-Range) is this one
+    size = len(audio)
+    try:
+        byte_range = parse_byte_range(range_header, size) if not if_range or if_range == etag else None
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+
+    if byte_range is None:
+        return AudioResponse(content=audio, media_type=get_media_type(audio_format), headers=headers)
+
+    start, end = byte_range
+    return AudioResponse(
+        content=audio[start:end + 1],
+        status_code=206,
+        media_type=get_media_type(audio_format),
+        headers={**headers, "Content-Range": f"bytes {start}-{end}/{size}"}
+    )
+
+@app.post("/tts/stream")
+async def stream_commentary(
+    text: str,
+    quality: Optional[str] = None,
+    use_personality: bool = True,
+    voice: Optional[str] = None
+) -> StreamingResponse:
+    """
+    Stream commentary audio sentence by sentence
+
+    The text is split into sentences which are synthesized in order (each
+    through the cache) and sent as 16-bit PCM after a streaming WAV header,
+    so playback can start once the first sentence is ready.
+
+    Args:
+        text: Commentary text
+        quality: Throw quality (great, good, okay, bad, miss, bust, game_winner)
+        use_personality: Apply Jim's personality transformation
+        voice: Registered voice name; the default voice when omitted
+
+    Returns:
+        Chunked WAV audio stream
+    """
+    if not cache_manager:
+        raise engine_not_ready()
+    voice, speaker_wav = resolve_voice(voice)
+
+    with metrics.stage("enhance"):
+        spoken = cache_manager.spoken_text(text, quality, use_personality)
+    segments = split_sentences(spoken)
+    if not segments:
+        raise HTTPException(status_code=400, detail="No text to synthesize")
+
+    # Cached sentences are served while the model is still loading
+    if not tts_engine and not all(cache_manager.is_cached(segment, voice) for segment in segments):
+        raise engine_not_ready()
+
+    def synthesize(segment: str) -> asyncio.Task:
+        async def generate() -> bytes:
+            return await tts_engine.generate_audio(segment, speaker_wav=speaker_wav)
+        return asyncio.ensure_future(cache_manager.get_or_generate(segment, generate, voice))
 
+    # Synthesize the first segment up front so errors still get a proper status
+    try:
+        first, _ = await synthesize(segments[0])
+    except InferenceQueueFull as e:
+        logger.warning(f"Rejected stream, inference queue full: {text[:50]}...")
+        raise queue_full_error(e)
     except Exception as e:
-        logger.error(f"Generation error: {e}")
+        logger.error(f"Stream generation error: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    logger.info(f"Streaming {len(segments)} segments: {text[:50]}...")
+
+    async def audio_stream():
+        sample_rate, samples = decode_wav(first)
+        yield streaming_wav_header(sample_rate)
+
+        # Keep one segment synthesizing while the previous one is sent
+        pending = synthesize(segments[1]) if len(segments) > 1 else None
+        yield to_pcm16(samples)
+
+        for i in range(1, len(segments)):
+            try:
+                audio, _ = await pending
+            except Exception as e:
+                logger.error(f"Stream aborted at segment {i}: {e}")
+                return
+            pending = synthesize(segments[i + 1]) if i + 1 < len(segments) else None
+            yield to_pcm16(decode_wav(audio)[1])
+
+    return StreamingResponse(audio_stream(), media_type="audio/wav")
+
+class ComposeRequest(BaseModel):
+    template: str
+    slots: Dict[str, Union[str, int, float]] = {}
+    voice: Optional[str] = None
+
+@app.post("/tts/compose")
+async def compose_commentary(
+    body: ComposeRequest,
+    audio_format: Optional[str] = Query(None, alias="format"),
+    accept: Optional[str] = Header(None)
+) -> Response:
+    """
+    Assemble templated commentary from cached fragments
+
+    Each fixed piece of the template and each slot value is synthesized once
+    and cached as a fragment; utterances are then stitched together from
+    fragments with short crossfades and matched loudness.
+
+    Body: {"template": "Player {name} hits triple {n}!", "slots": {"name": "Dave", "n": 20}, "voice": null}
+
+    Returns:
+        Audio file in the negotiated format
+    """
+    if not cache_manager:
+        raise engine_not_ready()
+    voice, speaker_wav = resolve_voice(body.voice)
+
+    try:
+        audio_format = negotiate_format(audio_format, accept, settings.default_audio_format)
+        pieces = []
+        for literal, field, _, _ in Formatter().parse(body.template):
+            pieces.append(literal)
+            if field is not None:
+                if field not in body.slots:
+                    raise ValueError(f"Missing slot value: {field}")
+                pieces.append(str(body.slots[field]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Fragments with nothing speakable (bare punctuation/whitespace) are dropped
+    fragments = [canonicalize(piece) for piece in pieces if any(c.isalnum() for c in piece)]
+    if not fragments:
+        raise HTTPException(status_code=400, detail="No text to synthesize")
+
+    # Cached fragments are served while the model is still loading
+    if not tts_engine and not all(cache_manager.is_fragment_cached(fragment, voice) for fragment in fragments):
+        raise engine_not_ready()
+
+    def synthesize(fragment: str):
+        async def generate() -> bytes:
+            return await tts_engine.generate_audio(fragment, speaker_wav=speaker_wav)
+        return cache_manager.get_or_generate_fragment(fragment, generate, voice)
+
+    try:
+        results = await asyncio.gather(*(synthesize(fragment) for fragment in fragments))
+    except InferenceQueueFull as e:
+        raise queue_full_error(e)
+    except Exception as e:
+        logger.error(f"Compose error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/tts/batch-pregenerate")
+    misses = sum(1 for _, status in results if status != "HIT")
+    decoded = [decode_wav(audio) for audio, _ in results]
+    sample_rate = decoded[0][0]
+    segments = [trim_silence(samples, sample_rate) for _, samples in decoded]
+    segments = [match_loudness(segment, settings.compose_loudness_db) for segment in segments]
+    samples = crossfade_concat(segments, sample_rate, settings.compose_crossfade_ms)
+
+    audio = await asyncio.to_thread(encode_samples, sample_rate, samples, audio_format)
+    return AudioResponse(
+        content=audio,
+        media_type=get_media_type(audio_format),
+        headers={
+            "X-Cache": "HIT" if not misses else "PARTIAL",
+            "X-Fragments": str(len(fragments)),
+            "X-Audio-Format": audio_format,
+            "Vary": "Accept"
+        }
+    )
+
+@app.websocket("/tts/ws")
+async def stream_websocket(websocket: WebSocket):
+    """
+    Low-latency streaming over a WebSocket
+
+    Send JSON messages:
+        {"text": "Nice throw!", "quality": "great", "use_personality": true,
+         "voice": "jim", "speed": 0.95, "chunk_size": 20}
+        {"action": "cancel"}
+
+    Each utterance is answered with {"event": "start", "sample_rate": ...},
+    binary 16-bit mono PCM frames as they are decoded, then {"event": "end"}.
+    A new utterance or a cancel message stops the one in progress, which is
+    reported with {"event": "cancelled"}. A message that isn't a JSON object,
+    or has invalid parameters, is answered with {"event": "error"}. The socket
+    can be reused for any number of utterances.
+    """
+    await websocket.accept()
+    if not tts_engine:
+        await websocket.close(code=1013, reason="TTS engine not ready")
+        return
+
+    current: Optional[asyncio.Task] = None
+    cancel = threading.Event()
+
+    async def stop_current():
+        if current and not current.done():
+            cancel.set()
+            current.cancel()
+            try:
+                await current
+            except asyncio.CancelledError:
+                pass
+
+    try:
+        while True:
+            try:
+                message = await websocket.receive_json()
+            except ValueError:
+                message = None
+            if not isinstance(message, dict):
+                # The utterance in progress, if any, keeps playing
+                await websocket.send_json({"event": "error", "detail": "Messages must be JSON objects"})
+                continue
+
+            await stop_current()
+            if message.get("action") == "cancel":
+                continue
+
+            cancel = threading.Event()
+            current = asyncio.create_task(_stream_utterance(websocket, message, cancel))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await stop_current()
+
+async def _stream_utterance(websocket: WebSocket, message: dict, cancel: threading.Event):
+    """Stream one utterance to a WebSocket, caching it once complete"""
+    text = message.get("text", "")
+    if not text:
+        await websocket.send_json({"event": "error", "detail": "No text to synthesize"})
+        return
+
+    quality = message.get("quality")
+    try:
+        voice, speaker_wav = resolve_voice(message.get("voice"))
+        speed = float(message.get("speed", 0.95))
+        chunk_size = int(message.get("chunk_size", settings.stream_chunk_size))
+        if not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"speed must be between {MIN_SPEED} and {MAX_SPEED}")
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be at least 1")
+    except HTTPException as e:
+        await websocket.send_json({"event": "error", "detail": e.detail})
+        return
+    except (TypeError, ValueError) as e:
+        await websocket.send_json({"event": "error", "detail": f"Invalid parameters: {e}"})
+        return
+    sample_rate = tts_engine.sample_rate
+
+    started = time.perf_counter()
+
+    try:
+        spoken = cache_manager.spoken_text(text, quality, message.get("use_personality", True))
+        cached = cache_manager.get_cached(spoken, voice, speed)
+        if cached:
+            sample_rate, samples = decode_wav(cached)
+            await websocket.send_json({"event": "start", "text": text, "sample_rate": sample_rate, "format": "pcm_s16le"})
+            await websocket.send_bytes(to_pcm16(samples))
+            await websocket.send_json({"event": "end", "cache": "HIT", "chunks": 1})
+            return
+
+        await websocket.send_json({"event": "start", "text": text, "sample_rate": sample_rate, "format": "pcm_s16le"})
+        chunks = []
+        first_chunk_ms = None
+        async for chunk in tts_engine.stream_audio(
+            spoken, speed=speed, chunk_size=chunk_size, cancel=cancel, speaker_wav=speaker_wav
+        ):
+            if first_chunk_ms is None:
+                first_chunk_ms = round((time.perf_counter() - started) * 1000, 1)
+            chunks.append(chunk)
+            await websocket.send_bytes(chunk)
+
+        if cancel.is_set():
+            return
+        await websocket.send_json({"event": "end", "cache": "MISS", "chunks": len(chunks), "first_chunk_ms": first_chunk_ms})
+
+        pcm = b"".join(chunks)
+        metrics.record_synthesis(0.0, len(pcm) / 2 / sample_rate)
+
+        # Only complete utterances are cached
+        buffer = io.BytesIO()
+        write(buffer, sample_rate, np.frombuffer(pcm, dtype="<i2"))
+        cache_manager.cache_audio(spoken, buffer.getvalue(), voice, speed)
+
+    except asyncio.CancelledError:
+        try:
+            await websocket.send_json({"event": "cancelled", "text": text})
+        except Exception:
+            pass
+        raise
+    except InferenceQueueFull as e:
+        await websocket.send_json({"event": "error", "detail": str(e), "retry_after": e.retry_after})
+    except WebSocketDisconnect:
+        cancel.set()
+    except Exception as e:
+        logger.error(f"WebSocket stream error: {e}")
+        await websocket.send_json({"event": "error", "detail": str(e)})
+
+@app.post("/tts/batch-pregenerate", status_code=202)
 async def batch_pregenerate(items: list[dict]):
     """
     Pre-generate multiple commentaries for instant playback
 
+    Returns immediately with a job id; poll /tts/jobs/{job_id} for progress.
+
     Body: [
         {"text": "Nice throw!", "quality": "great"},
-        {"text": "Missed it!", "quality": "miss"}
+        {"text": "Missed it!", "quality": "miss", "voice": "jim"}
     ]
     """
-    if not cache_manager:
+    if not job_manager or not tts_engine:
+        raise engine_not_ready()
+    for item in items:
+        item["voice"], _ = resolve_voice(item.get("voice"))
+
+    job = job_manager.submit(items)
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "total": len(job.items),
+        "status_url": f"/tts/jobs/{job.id}"
+    }
+
+@app.get("/tts/jobs")
+async def list_jobs():
+    """List recent pregeneration jobs"""
+    if not job_manager:
         raise HTTPException(status_code=503, detail="Cache not ready")
 
-    results = []
+    return {"jobs": [job.to_dict(include_items=False) for job in job_manager.list_jobs()]}
 
-    for item in items:
-        text = item.get("text", "")
-        quality = item.get("quality")
+@app.get("/tts/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Per-item status, throughput and ETA of a pregeneration job"""
+    job = job_manager.get(job_id) if job_manager else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-        if not text:
-            continue
+    return {**job.to_dict(), "total_cached": cache_manager.get_cache_size()}
 
-        # Check if already cached
-        if cache_manager.get_cached(text):
-            results.append({"text": text, "status": "cached"})
-            continue
+@app.delete("/tts/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a pregeneration job"""
+    job = job_manager.cancel(job_id) if job_manager else None
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
 
-        # Generate and cache
-        try:
-            enhanced = jim_personality.enhance_text(text, quality)
-            audio = await tts_engine.generate_audio(enhanced)
-            cache_manager.cache_audio(text, audio)
-            results.append({"text": text, "status": "generated"})
-            logger.info(f"Pre-generated: {text[:50]}...")
+    return {"job_id": job.id, "status": "cancelling" if job.status == "running" else job.status}
 
-        except Exception as e:
-            logger.error(f"Failed to generate '{text}': {e}")
-            results.append({"text": text, "status": "failed", "error": str(e)})
+@app.get("/voices")
+async def list_voices():
+    """List the default voice and registered voices"""
+    if not voice_registry:
+        raise HTTPException(status_code=503, detail="Voice registry not ready")
 
-    return {
-        "status": "complete",
-        "results": results,
-        "total_cached": cache_manager.get_cache_size()
-    }
+    return {"voices": voice_registry.list_voices()}
+
+@app.post("/voices", status_code=201)
+async def register_voice(
+    name: str = Form(...),
+    file: UploadFile = File(...),
+    description: str = Form("")
+):
+    """
+    Register a voice from a reference clip
+
+    Upload as multipart form data: name, file (WAV/FLAC/OGG, a few seconds
+    of clean speech) and an optional description. Registering an existing
+    name replaces its clip. Select the voice with the `voice` parameter of
+    the generate, stream, compose, WebSocket and batch endpoints.
+    """
+    if not voice_registry:
+        raise HTTPException(status_code=503, detail="Voice registry not ready")
+
+    audio = await file.read(settings.voice_max_upload_bytes + 1)
+    if len(audio) > settings.voice_max_upload_bytes:
+        raise HTTPException(status_code=413, detail=f"Reference clip larger than {settings.voice_max_upload_bytes} bytes")
+
+    try:
+        return await asyncio.to_thread(voice_registry.register, name, audio, description)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.delete("/voices/{name}")
+async def delete_voice(name: str):
+    """Delete a registered voice (its cached audio is left until the cache is cleared)"""
+    if not voice_registry:
+        raise HTTPException(status_code=503, detail="Voice registry not ready")
+    if not voice_registry.delete(name):
+        raise HTTPException(status_code=404, detail=f"Unknown voice: {name}")
+
+    return {"status": "success", "message": f"Voice '{name}' deleted"}
 
 @app.get("/cache/stats")
 async def cache_stats():
@@ -235,7 +949,10 @@ async def cache_stats():
 
     return {
         "total_items": cache_manager.get_cache_size(),
-        "cache_dir": str(settings.cache_dir)
+        "in_flight": cache_manager.get_inflight_count(),
+        "cache_dir": str(settings.cache_dir),
+        **cache_manager.get_stats(),
+        "requests": request_log.get_stats() if request_log else None
     }
 
 @app.delete("/cache/clear")
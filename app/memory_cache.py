@@ -0,0 +1,147 @@
+"""
+Memory Cache
+Byte-budgeted in-memory audio cache with LRU eviction and optional TinyLFU admission
+"""
+import hashlib
+import logging
+from collections import OrderedDict
+from typing import Literal, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class FrequencySketch:
+    """
+    Count-min sketch of recent access frequency
+
+    Counters are halved every `sample_size` increments so the estimate tracks
+    recent popularity rather than all-time totals.
+    """
+
+    def __init__(self, width: int = 4096, depth: int = 4, sample_size: int = 40960):
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size
+        self.rows = [[0] * width for _ in range(depth)]
+        self.additions = 0
+
+    def _indexes(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        for row in range(self.depth):
+            yield row, int.from_bytes(digest[row * 4:row * 4 + 4], "little") % self.width
+
+    def increment(self, key: str):
+        for row, i in self._indexes(key):
+            self.rows[row][i] += 1
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self._age()
+
+    def estimate(self, key: str) -> int:
+        return min(self.rows[row][i] for row, i in self._indexes(key))
+
+    def _age(self):
+        self.rows = [[count >> 1 for count in row] for row in self.rows]
+        self.additions //= 2
+
+
+class MemoryCache:
+    """
+    Size-aware in-memory cache
+
+    Entries are evicted least-recently-used first once the total size exceeds
+    `max_bytes`. With the `tinylfu` policy a new entry is only admitted if it
+    has been requested at least as often as the entries it would evict, so one-off
+    phrases can't flush the hot set.
+    """
+
+    def __init__(self, max_bytes: int, policy: Literal["lru", "tinylfu"] = "lru"):
+        self.max_bytes = max_bytes
+        self.policy = policy
+        self.entries: "OrderedDict[str, bytes]" = OrderedDict()
+        self.bytes = 0
+        self.sketch = FrequencySketch() if policy == "tinylfu" else None
+
+        # Stats
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.rejected = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get an entry and mark it most recently used"""
+        if self.sketch:
+            self.sketch.increment(key)
+
+        audio = self.entries.get(key)
+        if audio is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return audio
+
+    def put(self, key: str, audio: bytes) -> bool:
+        """
+        Insert an entry, evicting as needed to stay within budget
+
+        Returns:
+            True if the entry was admitted
+        """
+        size = len(audio)
+        if size > self.max_bytes:
+            self.rejected += 1
+            return False
+
+        if key in self.entries:
+            self.bytes -= len(self.entries.pop(key))
+
+        # Pick victims from the LRU end until the new entry fits
+        victims = []
+        freed = 0
+        for victim in self.entries:
+            if self.bytes - freed + size <= self.max_bytes:
+                break
+            victims.append(victim)
+            freed += len(self.entries[victim])
+
+        if victims and self.sketch:
+            candidate = self.sketch.estimate(key)
+            if any(self.sketch.estimate(victim) > candidate for victim in victims):
+                self.rejected += 1
+                return False
+
+        for victim in victims:
+            self.bytes -= len(self.entries.pop(victim))
+            self.evictions += 1
+
+        self.entries[key] = audio
+        self.bytes += size
+        return True
+
+    def clear(self):
+        """Drop all entries (counters are kept)"""
+        self.entries.clear()
+        self.bytes = 0
+
+    def get_stats(self) -> dict:
+        """Get residency and hit/miss/eviction counters"""
+        lookups = self.hits + self.misses
+        return {
+            "policy": self.policy,
+            "items": len(self.entries),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "rejected": self.rejected,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
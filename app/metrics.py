@@ -0,0 +1,234 @@
+"""
+Metrics
+Prometheus-format counters and histograms, plus per-request stage timings
+for Server-Timing headers
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from starlette.datastructures import MutableHeaders
+
+# Seconds; covers sub-millisecond cache hits up to long CPU syntheses
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+RTF_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0)
+
+_lock = threading.Lock()
+_registry: List["_Metric"] = []
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        _registry.append(self)
+
+    def render(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"] + self._samples()
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """Monotonically increasing value, per label set"""
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, *labels: str):
+        with _lock:
+            self.values[labels] = self.values.get(labels, 0.0) + amount
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in sorted(self.values.items())]
+
+
+class Gauge(_Metric):
+    """Value read at scrape time"""
+    type = "gauge"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self.values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, value: float, *labels: str):
+        self.values[labels] = value
+
+    def _samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(self.labels, key)} {value}" for key, value in sorted(self.values.items())]
+
+
+class Histogram(_Metric):
+    """Cumulative histogram, per label set"""
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(buckets)
+        self.series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        with _lock:
+            series = self.series.get(labels)
+            if series is None:
+                # [bucket counts..., +Inf count, sum]
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bisect.bisect_left(self.buckets, value)] += 1
+            series[-1] += value
+
+    def _samples(self) -> List[str]:
+        lines = []
+        for key, series in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(list(self.buckets) + ["+Inf"], series[:-1]):
+                cumulative += count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {series[-1]}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {cumulative}")
+        return lines
+
+
+REQUESTS = Counter("tts_requests_total", "HTTP requests served", ("endpoint", "status", "cache"))
+REQUEST_SECONDS = Histogram("tts_request_seconds", "HTTP request latency", ("endpoint",))
+STAGE_SECONDS = Histogram(
+    "tts_stage_seconds",
+    "Time spent per request stage (inference includes the engine's WAV encoding)",
+    ("stage",)
+)
+SYNTHESIS_SECONDS = Counter("tts_synthesis_seconds_total", "Time spent running model inference")
+AUDIO_SECONDS = Counter("tts_audio_seconds_total", "Seconds of audio synthesized")
+REAL_TIME_FACTOR = Gauge("tts_real_time_factor", "Synthesis seconds per second of audio, since startup")
+RTF = Histogram("tts_synthesis_rtf", "Real-time factor of individual syntheses", buckets=RTF_BUCKETS)
+STARTUP_SECONDS = Gauge("tts_startup_phase_seconds", "Duration of each startup phase", ("phase",))
+QUEUE_DEPTH = Gauge("tts_inference_queue_depth", "Synthesis calls waiting for a worker")
+INFERENCE_RUNNING = Gauge("tts_inference_running", "Synthesis calls currently executing")
+CACHE_ITEMS = Gauge("tts_cache_items", "Entries in the disk cache")
+INFLIGHT = Gauge("tts_cache_inflight", "Syntheses in flight")
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format"""
+    audio = AUDIO_SECONDS.get()
+    if audio:
+        REAL_TIME_FACTOR.set(round(SYNTHESIS_SECONDS.get() / audio, 4))
+    return "\n".join(line for metric in _registry for line in metric.render()) + "\n"
+
+
+# Stage durations (seconds) of the request being handled. The dict is shared
+# by reference with tasks and inference threads started from the request, so
+# stages recorded there show up in the request's Server-Timing header.
+_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+
+
+def start_timings() -> Dict[str, float]:
+    """Start collecting stage timings for the current request"""
+    timings: Dict[str, float] = {}
+    _timings.set(timings)
+    return timings
+
+
+def current_timings() -> Dict[str, float]:
+    """Stage timings of the current context, started if there are none yet"""
+    timings = _timings.get()
+    return timings if timings is not None else start_timings()
+
+
+def merge_timings(timings: Dict[str, float]):
+    """Add stage timings collected elsewhere (e.g. a shared task) to the current request"""
+    current = _timings.get()
+    if current is not None and current is not timings:
+        for name, seconds in timings.items():
+            current[name] = current.get(name, 0.0) + seconds
+
+
+def record_stage(name: str, seconds: float):
+    """Record a stage duration in the histogram and the current request's timings"""
+    STAGE_SECONDS.observe(seconds, name)
+    timings = _timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block as a request stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def record_synthesis(synthesis_s: float, audio_s: float):
+    """Count seconds of audio produced and, when known, the synthesis time it took"""
+    AUDIO_SECONDS.inc(audio_s)
+    if synthesis_s > 0 and audio_s > 0:
+        RTF.observe(synthesis_s / audio_s)
+
+
+def server_timing(timings: Dict[str, float], total_s: Optional[float] = None) -> str:
+    """Format stage timings as a Server-Timing header value (milliseconds)"""
+    entries = [f"{name};dur={seconds * 1000:.2f}" for name, seconds in timings.items()]
+    if total_s is not None:
+        entries.append(f"total;dur={total_s * 1000:.2f}")
+    return ", ".join(entries)
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware that counts and times requests and adds Server-Timing
+
+    Written against raw ASGI rather than BaseHTTPMiddleware so response
+    bodies (including zero-copy memoryviews) pass through untouched.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_timings()
+        started = time.perf_counter()
+        response = {"status": 500, "cache": ""}
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                response["status"] = message["status"]
+                response["cache"] = headers.get("X-Cache", "")
+                if timings:
+                    headers.append("Server-Timing", server_timing(timings, time.perf_counter() - started))
+                    headers.append("Timing-Allow-Origin", "*")
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            route = scope.get("route")
+            # Route templates only: raw paths of unmatched URLs would grow the label set without bound
+            endpoint = route.path if route else "unmatched"
+            REQUESTS.inc(1, endpoint, str(response["status"]), response["cache"])
+            REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint)
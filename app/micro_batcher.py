@@ -0,0 +1,143 @@
+"""
+Micro Batcher
+Collects concurrent synthesis requests into batches for the TTS engine
+"""
+import asyncio
+import contextvars
+import logging
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from app import metrics
+from app.inference_executor import PriorityRef, current_priority, set_current_priority
+from app.tts_base import BaseTTSEngine
+
+logger = logging.getLogger(__name__)
+
+
+class BatchPriority(PriorityRef):
+    """
+    Priority of a batch: that of its most urgent member
+
+    Members keep their own refs, which coalesced callers may raise after the
+    batch was queued; the batch follows them. Raising the batch raises every
+    member.
+    """
+
+    __slots__ = ("members",)
+
+    def __init__(self, members: List[PriorityRef]):
+        self.members = members
+
+    @property
+    def level(self) -> int:
+        return min(ref.level for ref in self.members)
+
+    @level.setter
+    def level(self, level: int):
+        for ref in self.members:
+            ref.level = min(ref.level, level)
+
+
+class MicroBatcher:
+    """
+    Dynamic micro-batching in front of a TTS engine
+
+    Requests are held for up to `max_wait_ms` or until `max_batch_size` have
+    arrived (per speed and voice), then handed to `engine.generate_batch`
+    together and the results split back to each caller. Everything other
+    than generate_audio is delegated to the wrapped engine, so this can
+    stand in for it anywhere.
+    """
+
+    def __init__(self, engine: BaseTTSEngine, max_batch_size: int = 4, max_wait_ms: int = 20):
+        self.engine = engine
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+
+        # Keyed by (speed, speaker_wav): only those can share a batch
+        self._pending: Dict[tuple, List[Tuple[str, asyncio.Future, PriorityRef]]] = {}
+        self._timers: Dict[tuple, asyncio.TimerHandle] = {}
+
+        # Stats
+        self.batches = 0
+        self.items = 0
+        self.batch_sizes: Counter = Counter()
+
+    def __getattr__(self, name):
+        return getattr(self.engine, name)
+
+    async def generate_audio(self, text: str, speed: float = 0.95, speaker_wav: Optional[str] = None) -> bytes:
+        """
+        Generate audio from text as part of the next batch
+
+        Args:
+            text: Text to synthesize
+            speed: Speech rate (only requests with the same speed share a batch)
+            speaker_wav: Voice (only requests with the same voice share a batch)
+
+        Returns:
+            WAV audio as bytes
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        group = (speed, speaker_wav)
+        batch = self._pending.setdefault(group, [])
+        batch.append((text, future, current_priority()))
+
+        if len(batch) >= self.max_batch_size:
+            self._flush(group)
+        elif group not in self._timers:
+            self._timers[group] = loop.call_later(self.max_wait, self._flush, group)
+
+        audio, timings = await future
+        # Each member's request gets the stages of the batch it ran in
+        metrics.merge_timings(timings)
+        return audio
+
+    def _flush(self, group: tuple):
+        timer = self._timers.pop(group, None)
+        if timer:
+            timer.cancel()
+        batch = self._pending.pop(group, None)
+        if batch:
+            # Run in a fresh context: the flush may happen in a member's
+            # context (or the timer's copy of it), whose priority and stage
+            # timings belong to that member alone
+            context = contextvars.copy_context()
+            context.run(set_current_priority, BatchPriority([ref for _, _, ref in batch]))
+            timings = context.run(metrics.start_timings)
+            asyncio.get_running_loop().create_task(self._run_batch(group, batch, timings), context=context)
+
+    async def _run_batch(self, group: tuple, batch: List[Tuple[str, asyncio.Future, PriorityRef]],
+                         timings: Dict[str, float]):
+        speed, speaker_wav = group
+        self.batches += 1
+        self.items += len(batch)
+        self.batch_sizes[len(batch)] += 1
+        logger.debug(f"Running batch of {len(batch)} (speed {speed}, voice {speaker_wav or 'default'})")
+
+        try:
+            results = await self.engine.generate_batch([text for text, _, _ in batch], speed, speaker_wav)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), audio in zip(batch, results):
+            if not future.done():
+                future.set_result((audio, timings))
+
+    def get_stats(self) -> dict:
+        """Get batch counts and achieved occupancy"""
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": round(self.max_wait * 1000, 1),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "occupancy": round(self.items / (self.batches * self.max_batch_size), 4) if self.batches else 0.0,
+            "batch_sizes": dict(sorted(self.batch_sizes.items())),
+            "pending": sum(len(batch) for batch in self._pending.values()),
+        }
@@ -0,0 +1,86 @@
+"""
+Post-processing
+Speed, silence and loudness adjustments derived from a cached rendering
+instead of re-synthesizing
+"""
+from typing import NamedTuple, Optional, Union
+
+from app.audio_encoders import encode_samples
+from app.audio_utils import decode_wav, normalize_loudness, time_stretch, trim_silence
+from app.config import settings
+
+# Speed every rendering is synthesized at; other speeds are derived from it
+BASE_SPEED = 0.95
+
+MIN_SPEED = 0.5
+MAX_SPEED = 2.0
+MIN_LOUDNESS_LUFS = -40.0
+MAX_LOUDNESS_LUFS = -5.0
+
+
+class PostProcess(NamedTuple):
+    """
+    Adjustments applied to a base rendering: trim, then stretch, then loudness
+
+    `tempo` is relative to the base rendering (1.25 plays 25% faster, at
+    the same pitch).
+    """
+    tempo: float = 1.0
+    loudness_lufs: Optional[float] = None
+    trim_silence: bool = False
+
+    @classmethod
+    def for_request(cls, speed: Optional[float] = None, loudness_lufs: Optional[float] = None) -> "PostProcess":
+        """
+        Adjustments for a request, with the server defaults filled in
+
+        Speed (engine scale, BASE_SPEED is as synthesized) is rounded to
+        0.01 and loudness to 0.1 LU, so near-identical requests share one
+        derived entry.
+
+        Raises:
+            ValueError: If speed or loudness is out of range
+        """
+        if speed is not None and not MIN_SPEED <= speed <= MAX_SPEED:
+            raise ValueError(f"speed must be between {MIN_SPEED} and {MAX_SPEED}")
+        if loudness_lufs is None:
+            loudness_lufs = settings.output_loudness_lufs
+        if loudness_lufs is not None and not MIN_LOUDNESS_LUFS <= loudness_lufs <= MAX_LOUDNESS_LUFS:
+            raise ValueError(f"loudness must be between {MIN_LOUDNESS_LUFS} and {MAX_LOUDNESS_LUFS} LUFS")
+
+        return cls(
+            tempo=round(speed, 2) / BASE_SPEED if speed is not None else 1.0,
+            loudness_lufs=round(loudness_lufs, 1) if loudness_lufs is not None else None,
+            trim_silence=settings.output_trim_silence
+        )
+
+    @property
+    def key(self) -> str:
+        """Canonical description for cache keys ("" when nothing is changed)"""
+        parts = []
+        if self.trim_silence:
+            parts.append("trim")
+        if self.tempo != 1.0:
+            parts.append(f"tempo={self.tempo:.4f}")
+        if self.loudness_lufs is not None:
+            parts.append(f"lufs={self.loudness_lufs:g}")
+        return ",".join(parts)
+
+    def apply(self, audio: Union[bytes, memoryview]) -> bytes:
+        """
+        Derive the adjusted rendering
+
+        Args:
+            audio: Base WAV rendering
+
+        Returns:
+            Adjusted audio as float32 WAV
+        """
+        sample_rate, samples = decode_wav(audio)
+        if self.trim_silence:
+            samples = trim_silence(samples, sample_rate)
+        if self.tempo != 1.0:
+            samples = time_stretch(samples, self.tempo)
+        if self.loudness_lufs is not None:
+            samples = normalize_loudness(samples, sample_rate, self.loudness_lufs)
+        return encode_samples(sample_rate, samples, "wav-float32")
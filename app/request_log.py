@@ -0,0 +1,325 @@
+"""
+Request Log
+Rotating log of synthesis requests plus decayed per-phrase frequency counts,
+used to warm the cache with what clients actually ask for
+"""
+import asyncio
+import fcntl
+import json
+import logging
+import math
+import os
+import time
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Warm-up window used to report the hit ratio right after a restart
+WARM_WINDOW_S = 300
+
+# Buffered log lines are appended this often
+FLUSH_INTERVAL_S = 1.0
+# New phrase counts are merged into the shared statistics after this many requests
+SAVE_EVERY = 100
+
+
+class SharedRotatingFileHandler(RotatingFileHandler):
+    """
+    RotatingFileHandler that several worker processes can write to
+
+    Each write holds an flock on `<log>.lock`, so only one process rolls
+    the log over, and a process whose file was rotated by another reopens
+    the current one instead of writing into a backup.
+    """
+
+    def __init__(self, filename: str, **kwargs):
+        super().__init__(filename, **kwargs)
+        self._lock_file = open(f"{self.baseFilename}.lock", "a")
+
+    def emit(self, record: logging.LogRecord):
+        fcntl.flock(self._lock_file, fcntl.LOCK_EX)
+        try:
+            if self.stream is not None and self._rotated_elsewhere():
+                self.stream.close()
+                self.stream = None
+            super().emit(record)
+        finally:
+            fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _rotated_elsewhere(self) -> bool:
+        try:
+            return os.stat(self.baseFilename).st_ino != os.fstat(self.stream.fileno()).st_ino
+        except FileNotFoundError:
+            return True
+
+    def close(self):
+        super().close()
+        self._lock_file.close()
+
+
+class RequestLog:
+    """
+    Compact request history
+
+    Every request is appended as a JSON line to a size-rotated log. Alongside
+    it, each phrase keeps an exponentially decayed request count (half-life
+    `half_life_s`) and a running estimate of its synthesis cost. Phrases are
+    ranked by expected hit value: decayed count x synthesis cost, i.e. how
+    much latency caching it is likely to save.
+
+    Workers share the log and the statistics file. Each worker keeps the
+    requests it recorded since its last save apart and merges them into the
+    file under an flock, so counts from every worker add up.
+
+    `record` only updates memory; it runs on the event loop for every
+    request. File writes happen in a background task (see `start`), off the
+    loop.
+    """
+
+    def __init__(self, log_path: str, stats_path: str, max_bytes: int = 5 * 1024 * 1024,
+                 backups: int = 3, half_life_s: float = 86400.0, max_phrases: int = 5000):
+        self.stats_path = Path(stats_path)
+        self.half_life_s = half_life_s
+        self.max_phrases = max_phrases
+        self.phrases: Dict[str, dict] = {}
+        # Requests recorded here since the last save, merged into the shared file by flush()
+        self._pending: Dict[str, dict] = {}
+        self._dirty = 0
+        self._lines: List[str] = []
+        self._flush_task: Optional[asyncio.Task] = None
+
+        Path(log_path).parent.mkdir(parents=True, exist_ok=True)
+        self._log = logging.getLogger("app.request_log.entries")
+        self._log.propagate = False
+        self._log.setLevel(logging.INFO)
+        if not self._log.handlers:
+            handler = SharedRotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backups)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            self._log.addHandler(handler)
+
+        # Hit ratio since startup and within the warm-up window
+        self.started = time.time()
+        self.lookups = 0
+        self.hits = 0
+        self.window_lookups = 0
+        self.window_hits = 0
+
+        self._load()
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock against other workers saving the statistics"""
+        with open(self.stats_path.with_suffix(".lock"), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def phrase_key(text: str, quality: Optional[str], use_personality: bool, voice: Optional[str]) -> str:
+        """
+        Key of a phrase in the statistics
+
+        Covers everything that selects a distinct rendering, as a JSON list so
+        no combination of fields can collide with another.
+        """
+        return json.dumps([text, quality, use_personality, voice], separators=(",", ":"))
+
+    def _read_stats(self) -> Dict[str, dict]:
+        if not self.stats_path.exists():
+            return {}
+        phrases = json.loads(self.stats_path.read_text())
+        # Files written before phrases were keyed by every request parameter
+        for key in [key for key in phrases if not key.startswith("[")]:
+            entry = phrases.pop(key)
+            entry["text"] = entry.get("text", key)
+            entry["voice"] = entry.get("voice")
+            entry["use_personality"] = entry.get("use_personality", True)
+            phrases[self.phrase_key(entry["text"], entry["quality"], entry["use_personality"], entry["voice"])] = entry
+        return phrases
+
+    def _load(self):
+        try:
+            self.phrases = self._read_stats()
+            if self.phrases:
+                logger.info(f"📈 Loaded request history for {len(self.phrases)} phrases")
+        except Exception as e:
+            logger.error(f"Error loading request history: {e}")
+
+    def start(self):
+        """Start writing recorded requests in the background"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        """Stop the background writer and write out everything recorded"""
+        if self._flush_task:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush(save=True)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(FLUSH_INTERVAL_S)
+            await self.flush(save=self._dirty >= SAVE_EVERY)
+
+    async def flush(self, save: bool = False):
+        """
+        Append buffered log lines in a thread
+
+        Args:
+            save: Also merge this worker's new phrase counts into the shared statistics
+        """
+        lines, self._lines = self._lines, []
+        pending = {}
+        if save:
+            pending, self._pending, self._dirty = self._pending, {}, 0
+        if not lines and not pending:
+            return
+
+        phrases = await asyncio.to_thread(self._write, lines, pending)
+        if phrases is not None:
+            # Requests recorded meanwhile stay pending for the next save
+            self.phrases = phrases
+            self._merge(self.phrases, self._pending)
+        elif pending:
+            self._merge(self._pending, pending)
+
+    def _write(self, lines: List[str], pending: Dict[str, dict]) -> Optional[Dict[str, dict]]:
+        """Blocking file writes; returns the merged statistics if they were saved"""
+        if lines:
+            try:
+                self._log.info("\n".join(lines))
+            except Exception as e:
+                logger.error(f"Error writing request log: {e}")
+        if not pending:
+            return None
+
+        tmp_path = self.stats_path.with_name(f"{self.stats_path.stem}.{os.getpid()}.tmp")
+        try:
+            with self._locked():
+                phrases = self._merge(self._read_stats(), pending)
+                if len(phrases) > self.max_phrases:
+                    phrases = self._pruned(phrases, time.time())
+                tmp_path.write_text(json.dumps(phrases, separators=(",", ":")))
+                os.replace(tmp_path, self.stats_path)
+            return phrases
+        except Exception as e:
+            logger.error(f"Error saving request history: {e}")
+            return None
+
+    def _merge(self, phrases: Dict[str, dict], counts: Dict[str, dict]) -> Dict[str, dict]:
+        """Add one set of decayed counts to another (in place)"""
+        for key, added in counts.items():
+            entry = phrases.get(key)
+            if entry is None:
+                phrases[key] = dict(added)
+                continue
+            last = max(entry["last"], added["last"])
+            entry["score"] = self._decayed(entry, last) + self._decayed(added, last)
+            entry["last"] = last
+            if added["cost_ms"] is not None:
+                entry["cost_ms"] = added["cost_ms"]
+        return phrases
+
+    def _decayed(self, entry: dict, now: float) -> float:
+        return entry["score"] * math.pow(2.0, -(now - entry["last"]) / self.half_life_s)
+
+    def record(self, text: str, quality: Optional[str], use_personality: bool,
+               status: str, latency_ms: float, voice: Optional[str] = None):
+        """
+        Record one request
+
+        Args:
+            text, quality, use_personality, voice: Request parameters
+            status: Cache status (HIT, MISS, COALESCED)
+            latency_ms: Time to serve the request
+        """
+        now = time.time()
+        self._lines.append(json.dumps({
+            "ts": round(now, 3), "text": text, "quality": quality, "use_personality": use_personality,
+            "voice": voice, "status": status, "latency_ms": round(latency_ms, 1)
+        }))
+
+        hit = status != "MISS"
+        self.lookups += 1
+        self.hits += hit
+        if now - self.started <= WARM_WINDOW_S:
+            self.window_lookups += 1
+            self.window_hits += hit
+
+        # Each combination of parameters is its own rendering, so its own phrase
+        key = self.phrase_key(text, quality, use_personality, voice)
+        entry = self.phrases.get(key)
+        if entry is None:
+            entry = self.phrases[key] = {
+                "text": text, "quality": quality, "use_personality": use_personality, "voice": voice,
+                "score": 0.0, "last": now, "cost_ms": None
+            }
+        entry["score"] = self._decayed(entry, now) + 1.0
+        entry["last"] = now
+        if status == "MISS":
+            # Running estimate of what a miss on this phrase costs
+            entry["cost_ms"] = latency_ms if entry["cost_ms"] is None else 0.7 * entry["cost_ms"] + 0.3 * latency_ms
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = {**entry, "score": 0.0, "cost_ms": None}
+        pending["score"] = self._decayed(pending, now) + 1.0
+        pending["last"] = now
+        if status == "MISS":
+            pending["cost_ms"] = entry["cost_ms"]
+
+        self._dirty += 1
+        if len(self.phrases) > self.max_phrases * 1.1:
+            self.phrases = self._pruned(self.phrases, now)
+
+    def _pruned(self, phrases: Dict[str, dict], now: float) -> Dict[str, dict]:
+        """The hottest max_phrases phrases"""
+        ranked = sorted(phrases.items(), key=lambda item: self._decayed(item[1], now), reverse=True)
+        return dict(ranked[:self.max_phrases])
+
+    def top_phrases(self, k: int) -> List[dict]:
+        """
+        Most valuable phrases to have cached
+
+        Returns:
+            Up to k entries ({text, quality, use_personality, voice, score, value})
+            ordered by expected hit value
+        """
+        now = time.time()
+        costs = [entry["cost_ms"] for entry in self.phrases.values() if entry["cost_ms"]]
+        default_cost = sum(costs) / len(costs) if costs else 1.0
+
+        ranked = []
+        for entry in self.phrases.values():
+            score = self._decayed(entry, now)
+            ranked.append({
+                "text": entry["text"],
+                "quality": entry["quality"],
+                "use_personality": entry["use_personality"],
+                "voice": entry["voice"],
+                "score": round(score, 3),
+                "value": score * (entry["cost_ms"] or default_cost),
+            })
+        ranked.sort(key=lambda item: item["value"], reverse=True)
+        return ranked[:k]
+
+    def get_stats(self) -> dict:
+        """Tracked phrases and hit ratio since startup"""
+        return {
+            "tracked_phrases": len(self.phrases),
+            "requests": self.lookups,
+            "hit_ratio": round(self.hits / self.lookups, 4) if self.lookups else 0.0,
+            "warm_window_s": WARM_WINDOW_S,
+            "warm_window_requests": self.window_lookups,
+            "warm_window_hit_ratio": round(self.window_hits / self.window_lookups, 4) if self.window_lookups else 0.0,
+        }
@@ -0,0 +1,334 @@
+"""
+Segment Store
+Append-only audio blob file plus a compact index, served through mmap
+"""
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Index record: magic, offset, length, blob crc32, key length, meta length,
+# followed by key bytes, meta JSON bytes and a crc32 of the whole record
+INDEX_MAGIC = b"TTSI"
+INDEX_HEADER = struct.Struct("<4sQIIHH")
+INDEX_TRAILER = struct.Struct("<I")
+
+
+class IndexEntry(NamedTuple):
+    offset: int
+    length: int
+    crc: int
+    meta: dict
+
+
+class SegmentStore:
+    """
+    Disk store for audio blobs
+
+    Blobs are appended to `segments.dat`; each append is followed by a record
+    in `segments.idx` mapping key -> (offset, length, crc, metadata). Only the
+    index is read at startup. Reads return zero-copy memoryview slices of a
+    read-only mmap of the segment file.
+
+    Appends are crash-safe: the blob is written and synced before its index
+    record, and on open a torn index record or a blob with no index record at
+    the tail is detected and truncated away.
+
+    A blob can be published under more than one key (see link); such
+    records point at an existing blob instead of appending a new one.
+
+    Several processes can share one store. Appends, repair and clearing hold
+    an exclusive flock on `segments.lock`, and an entry is published by its
+    index record, so readers never see a partial blob. Each process picks up
+    entries appended by others when a lookup misses its in-memory index.
+    """
+
+    DATA_FILE = "segments.dat"
+    INDEX_FILE = "segments.idx"
+    LOCK_FILE = "segments.lock"
+
+    def __init__(self, directory: str, fsync: bool = True):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.data_path = self.directory / self.DATA_FILE
+        self.index_path = self.directory / self.INDEX_FILE
+        self.fsync = fsync
+
+        self.index: Dict[str, IndexEntry] = {}
+        self._mmap: Optional[mmap.mmap] = None
+        # Bumped whenever the store is reopened, i.e. after a clear by any process
+        self.generation = 0
+        self._lock_file = open(self.directory / self.LOCK_FILE, "ab")
+        with self._locked():
+            self._open()
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock against other processes writing the store"""
+        fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self._lock_file.fileno(), fcntl.LOCK_UN)
+
+    def _open(self):
+        """Open files, load the index and repair a torn tail (call with the lock held)"""
+        self.data_path.touch(exist_ok=True)
+        self.index_path.touch(exist_ok=True)
+
+        records, index_end = self._read_index()
+        valid = self._verify_tail(records)
+        if valid < len(records):
+            index_end = records[valid][2]
+        # Linked records point back at earlier blobs, so the data ends at the furthest one
+        data_end = max((entry.offset + entry.length for _, entry, _ in records[:valid]), default=0)
+
+        for key, entry, _ in records[:valid]:
+            self.index[key] = entry
+
+        if index_end < self.index_path.stat().st_size:
+            logger.warning(f"Truncating torn index tail at byte {index_end}")
+            os.truncate(self.index_path, index_end)
+        if data_end < self.data_path.stat().st_size:
+            logger.warning(f"Truncating unindexed segment tail at byte {data_end}")
+            os.truncate(self.data_path, data_end)
+
+        self._data_file = open(self.data_path, "ab")
+        self._index_file = open(self.index_path, "ab")
+        self._index_pos = index_end
+        self._index_inode = os.fstat(self._index_file.fileno()).st_ino
+        self._remap()
+        self.generation += 1
+
+    def refresh(self):
+        """Pick up records appended, or a clear, by other processes (one stat when nothing changed)"""
+        self._refresh()
+
+    def _refresh(self):
+        """Load index records appended by other processes since the last look"""
+        try:
+            stat = os.stat(self.index_path)
+        except FileNotFoundError:
+            return
+        if stat.st_ino != self._index_inode or stat.st_size < self._index_pos:
+            # Another process cleared the store
+            with self._locked():
+                self._close_files()
+                self.index.clear()
+                self._open()
+            return
+        if stat.st_size != self._index_pos:
+            self._load_new_records()
+
+    def _load_new_records(self):
+        # A record still being written fails its checks and is read next time
+        records, end = self._read_index(self._index_pos)
+        for key, entry, _ in records:
+            self.index[key] = entry
+        self._index_pos = end
+
+    def _read_index(self, start: int = 0) -> Tuple[List[Tuple[str, IndexEntry, int]], int]:
+        """
+        Parse the index file from a record boundary
+
+        Returns:
+            ([(key, entry, record offset), ...] in append order,
+             byte offset of the end of the last well-formed record)
+        """
+        records = []
+        size = self.index_path.stat().st_size
+        if size <= start:
+            return records, start
+
+        pos = start
+        with open(self.index_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            while pos + INDEX_HEADER.size <= size:
+                magic, offset, length, crc, key_len, meta_len = INDEX_HEADER.unpack_from(buf, pos)
+                end = pos + INDEX_HEADER.size + key_len + meta_len + INDEX_TRAILER.size
+                if magic != INDEX_MAGIC or end > size:
+                    break
+                (record_crc,) = INDEX_TRAILER.unpack_from(buf, end - INDEX_TRAILER.size)
+                if zlib.crc32(buf[pos:end - INDEX_TRAILER.size]) != record_crc:
+                    break
+
+                body = pos + INDEX_HEADER.size
+                key = buf[body:body + key_len].decode()
+                meta = json.loads(buf[body + key_len:body + key_len + meta_len]) if meta_len else {}
+                records.append((key, IndexEntry(offset, length, crc, meta), pos))
+                pos = end
+
+        return records, pos
+
+    def _verify_tail(self, records: List[Tuple[str, IndexEntry, int]]) -> int:
+        """
+        Find where the intact records end
+
+        Blobs are appended in index order, so only records at the tail can
+        point past the end of the segment file or at a torn blob. The check
+        walks back from the end and stops at the first intact blob.
+
+        Returns:
+            Number of leading records that are intact
+        """
+        size = self.data_path.stat().st_size
+
+        with open(self.data_path, "rb") as f:
+            for i in range(len(records) - 1, -1, -1):
+                key, entry, _ = records[i]
+                if entry.offset + entry.length <= size:
+                    f.seek(entry.offset)
+                    if zlib.crc32(f.read(entry.length)) == entry.crc:
+                        return i + 1
+                logger.warning(f"Dropping torn segment entry: {key}")
+
+        return 0
+
+    def _remap(self):
+        """Map the segment file at its current size"""
+        size = self.data_path.stat().st_size
+        # Old maps are dropped, not closed: live memoryview slices keep them valid
+        self._mmap = None
+        if size:
+            with open(self.data_path, "rb") as f:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __contains__(self, key: str) -> bool:
+        if key not in self.index:
+            self._refresh()
+        return key in self.index
+
+    def __len__(self) -> int:
+        self._refresh()
+        return len(self.index)
+
+    def keys(self) -> Iterator[str]:
+        self._refresh()
+        return iter(list(self.index))
+
+    def get(self, key: str) -> Optional[memoryview]:
+        """Get a zero-copy view of a stored blob"""
+        entry = self.index.get(key)
+        if entry is None:
+            self._refresh()
+            entry = self.index.get(key)
+            if entry is None:
+                return None
+        end = entry.offset + entry.length
+        if self._mmap is None or end > len(self._mmap):
+            self._remap()
+        return memoryview(self._mmap)[entry.offset:end]
+
+    def get_meta(self, key: str) -> Optional[dict]:
+        """Get metadata stored alongside a blob"""
+        entry = self.index.get(key)
+        return entry.meta if entry else None
+
+    def put(self, key: str, data: bytes, meta: Optional[dict] = None):
+        """
+        Append a blob and publish it in the index
+
+        Args:
+            key: Cache key
+            data: Audio bytes
+            meta: JSON-serializable metadata (format, text, ...)
+        """
+        while True:
+            self._refresh()
+            with self._locked():
+                # Retry if another process cleared the store since the refresh
+                if os.stat(self.index_path).st_ino == self._index_inode:
+                    self._append(key, data, meta or {})
+                    return
+
+    def link(self, key: str, target: str, data: bytes, meta: Optional[dict] = None):
+        """
+        Publish data under another key, sharing target's blob when it holds the same bytes
+
+        If target is gone or now holds different bytes (another process
+        replaced it), the data is appended as a blob of its own instead.
+
+        Args:
+            key: New key
+            target: Existing key expected to hold `data`
+            data: The bytes `key` must refer to
+            meta: JSON-serializable metadata for the new key
+        """
+        crc = zlib.crc32(data)
+        while True:
+            self._refresh()
+            with self._locked():
+                if os.stat(self.index_path).st_ino != self._index_inode:
+                    continue
+                self._load_new_records()
+                entry = self.index.get(target)
+                if entry is not None and entry.length == len(data) and entry.crc == crc:
+                    self._write_record(key, entry.offset, entry.length, crc, meta or {})
+                else:
+                    self._append(key, data, meta or {})
+                return
+
+    def _append(self, key: str, data: bytes, meta: dict):
+        # Other processes may have appended since our last look
+        offset = os.fstat(self._data_file.fileno()).st_size
+        crc = zlib.crc32(data)
+
+        self._data_file.write(data)
+        self._data_file.flush()
+        if self.fsync:
+            os.fsync(self._data_file.fileno())
+
+        self._write_record(key, offset, len(data), crc, meta)
+
+    def _write_record(self, key: str, offset: int, length: int, crc: int, meta: dict):
+        key_bytes = key.encode()
+        meta_bytes = json.dumps(meta, separators=(",", ":")).encode() if meta else b""
+        record = INDEX_HEADER.pack(INDEX_MAGIC, offset, length, crc, len(key_bytes), len(meta_bytes))
+        record += key_bytes + meta_bytes
+        record += INDEX_TRAILER.pack(zlib.crc32(record))
+
+        self._load_new_records()
+        self._index_file.write(record)
+        self._index_file.flush()
+        if self.fsync:
+            os.fsync(self._index_file.fileno())
+
+        self._index_pos += len(record)
+        self.index[key] = IndexEntry(offset, length, crc, meta)
+
+    def clear(self):
+        """Remove all blobs"""
+        with self._locked():
+            self._close_files()
+            # Unlink rather than truncate so any slices still being sent stay valid
+            self.data_path.unlink(missing_ok=True)
+            self.index_path.unlink(missing_ok=True)
+            self.index.clear()
+            self._open()
+
+    def get_stats(self) -> dict:
+        """Get item count and on-disk sizes"""
+        return {
+            "items": len(self.index),
+            # Blobs shared by several keys count once
+            "bytes": sum({entry.offset: entry.length for entry in self.index.values()}.values()),
+            "segment_file_bytes": self.data_path.stat().st_size,
+            "index_file_bytes": self.index_path.stat().st_size,
+        }
+
+    def _close_files(self):
+        self._data_file.close()
+        self._index_file.close()
+        self._mmap = None
+
+    def close(self):
+        """Close file handles"""
+        self._close_files()
+        self._lock_file.close()
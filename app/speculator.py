@@ -0,0 +1,205 @@
+"""
+Speculative Generation
+Learns which phrases follow which and pregenerates likely next lines while
+the inference queue is idle
+"""
+import asyncio
+import logging
+import time
+from collections import Counter, OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from app.inference_executor import InferenceQueueFull, inference_priority
+
+logger = logging.getLogger(__name__)
+
+# (text, quality, use_personality, voice)
+Phrase = Tuple[str, Optional[str], bool, Optional[str]]
+
+
+class Speculator:
+    """
+    Idle-time speculative pregeneration
+
+    Every request updates a first-order transition model: counts of which
+    phrase came next after each phrase, and after each throw quality. When
+    the inference executor has nothing running or queued, the most likely
+    successors of the last phrase that aren't cached yet are synthesized at
+    background priority, one at a time, re-checking for idleness before each
+    so live requests are never kept waiting for more than one utterance.
+
+    Memory is bounded for a long-running server: at most `max_states`
+    phrases keep successor counts, each keeps its `max_successors` most
+    common successors, and a guess not requested within `pending_horizon_s`
+    is given up on (it stays counted as wasted).
+    """
+
+    def __init__(self, cache_manager, executor, candidates: int = 3, min_probability: float = 0.2,
+                 session_gap_s: float = 300.0, max_states: int = 2000, max_successors: int = 50,
+                 pending_horizon_s: float = 3600.0, poll_interval_s: float = 0.05):
+        self.cache_manager = cache_manager
+        self.executor = executor
+        self.candidates = candidates
+        self.min_probability = min_probability
+        self.session_gap_s = session_gap_s
+        self.max_states = max_states
+        self.max_successors = max_successors
+        self.pending_horizon_s = pending_horizon_s
+        self.poll_interval_s = poll_interval_s
+
+        self.after_phrase: "OrderedDict[str, Counter]" = OrderedDict()
+        self.after_quality: Dict[Optional[str], Counter] = {}
+        self.last: Optional[Phrase] = None
+        self.last_seen = 0.0
+
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        # Stats: speculated (text, voice) -> (when, synthesis seconds), oldest
+        # first, until it is requested or expires
+        self.pending: "OrderedDict[Tuple[str, Optional[str]], Tuple[float, float]]" = OrderedDict()
+        self.speculated = 0
+        self.hits = 0
+        self.expired = 0
+        self.synthesis_s = 0.0
+        self.used_s = 0.0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def observe(self, text: str, quality: Optional[str], use_personality: bool, status: str,
+                voice: Optional[str] = None):
+        """
+        Learn from one served request
+
+        Args:
+            text, quality, use_personality, voice: Request parameters
+            status: Cache status the request was served with
+        """
+        now = time.monotonic()
+        phrase = (text, quality, use_personality, voice)
+
+        self._expire(now)
+        if (text, voice) in self.pending and status != "MISS":
+            self.hits += 1
+            self.used_s += self.pending.pop((text, voice))[1]
+
+        if self.last is not None and now - self.last_seen <= self.session_gap_s:
+            prev_text, prev_quality, _, _ = self.last
+            self._count(self.after_phrase.setdefault(prev_text, Counter()), phrase)
+            self.after_phrase.move_to_end(prev_text)
+            if len(self.after_phrase) > self.max_states:
+                self.after_phrase.popitem(last=False)
+            self._count(self.after_quality.setdefault(prev_quality, Counter()), phrase)
+
+        self.last = phrase
+        self.last_seen = now
+        self._wakeup.set()
+
+    def _count(self, successors: Counter, phrase: Phrase):
+        """Count a successor, keeping only the most common once there are twice too many"""
+        successors[phrase] += 1
+        if len(successors) > 2 * self.max_successors:
+            kept = successors.most_common(self.max_successors)
+            successors.clear()
+            successors.update(dict(kept))
+
+    def _expire(self, now: float):
+        """Give up on guesses that were not requested within the horizon"""
+        while self.pending:
+            key, (speculated_at, _) = next(iter(self.pending.items()))
+            if now - speculated_at <= self.pending_horizon_s:
+                break
+            del self.pending[key]
+            self.expired += 1
+
+    def predict(self) -> List[Tuple[Phrase, float]]:
+        """
+        Likely next phrases after the last request
+
+        Uses what followed the last phrase, falling back to what followed its
+        throw quality when the phrase itself has no history.
+
+        Returns:
+            [(phrase, probability), ...] most likely first
+        """
+        if self.last is None:
+            return []
+        prev_text, prev_quality, _, _ = self.last
+        successors = self.after_phrase.get(prev_text) or self.after_quality.get(prev_quality)
+        if not successors:
+            return []
+
+        total = sum(successors.values())
+        return [
+            (phrase, count / total)
+            for phrase, count in successors.most_common(self.candidates)
+            if count / total >= self.min_probability
+        ]
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            for phrase, probability in self.predict():
+                text, quality, use_personality, voice = phrase
+                try:
+                    spoken = self.cache_manager.spoken_text(text, quality, use_personality)
+                    if self.cache_manager.is_cached(spoken, voice):
+                        continue
+                except KeyError:
+                    # The voice has been deleted
+                    continue
+                # Yield to live work: only start when nothing is running or queued
+                while not self.executor.is_idle():
+                    if self._wakeup.is_set():
+                        break
+                    await asyncio.sleep(self.poll_interval_s)
+                if self._wakeup.is_set():
+                    # A new request arrived; re-predict from it
+                    break
+                await self._speculate(text, quality, use_personality, voice, probability)
+
+    async def _speculate(self, text: str, quality: Optional[str], use_personality: bool,
+                         voice: Optional[str], probability: float):
+        logger.debug(f"Speculating ({probability:.0%}): {text[:50]}")
+        started = time.perf_counter()
+        try:
+            with inference_priority("background"):
+                status = await self.cache_manager.pregenerate(text, quality, use_personality, voice)
+        except InferenceQueueFull:
+            return
+        except Exception as e:
+            logger.error(f"Speculative generation failed for '{text[:50]}': {e}")
+            return
+
+        if status == "MISS":
+            elapsed = time.perf_counter() - started
+            self.speculated += 1
+            self.synthesis_s += elapsed
+            self.pending[(text, voice)] = (time.monotonic(), elapsed)
+            self.pending.move_to_end((text, voice))
+
+    def get_stats(self) -> dict:
+        """Speculation hit rate and synthesis time spent on unused guesses"""
+        return {
+            "states": len(self.after_phrase),
+            "speculated": self.speculated,
+            "hits": self.hits,
+            "hit_rate": round(self.hits / self.speculated, 4) if self.speculated else 0.0,
+            "synthesis_s": round(self.synthesis_s, 2),
+            "wasted_s": round(self.synthesis_s - self.used_s, 2),
+            "unused": len(self.pending),
+            "expired": self.expired,
+        }
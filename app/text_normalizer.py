@@ -0,0 +1,104 @@
+"""
+Text Normalizer
+Canonical form of commentary text, so trivially different inputs share one
+synthesis and one cache entry
+"""
+import re
+import unicodedata
+
+_ONES = [
+    "zero", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen", "eighteen", "nineteen",
+]
+_TENS = ["", "", "twenty", "thirty", "forty", "fifty", "sixty", "seventy", "eighty", "ninety"]
+_SCALES = [(10 ** 9, "billion"), (10 ** 6, "million"), (1000, "thousand")]
+_ORDINALS = {
+    "one": "first", "two": "second", "three": "third", "five": "fifth",
+    "eight": "eighth", "nine": "ninth", "twelve": "twelfth",
+}
+
+# Typographic variants the model reads the same way
+_CHARACTERS = str.maketrans({
+    "‘": "'", "’": "'", "“": '"', "”": '"',
+    "–": "-", "—": "-", "…": "...",
+})
+
+_DECIMAL_NUMBER = re.compile(r"\b(\d{1,12})\.(\d+)\b")
+_ORDINAL_NUMBER = re.compile(r"\b(\d{1,12})(?:st|nd|rd|th)\b")
+_NUMBER = re.compile(r"\b\d{1,3}(?:,\d{3})+\b|\b\d{1,12}\b")
+_SPACE_BEFORE_PUNCTUATION = re.compile(r"\s+([.,!?;:])")
+_REPEATED_MARK = re.compile(r"([!?,;:])\1+")
+_LONG_ELLIPSIS = re.compile(r"\.{4,}")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def number_to_words(n: int) -> str:
+    """
+    Spell out a non-negative integer, British style ("one hundred and eighty")
+
+    Args:
+        n: Integer below one trillion
+
+    Returns:
+        The number in words
+    """
+    if n < 20:
+        return _ONES[n]
+    if n < 100:
+        tens, ones = divmod(n, 10)
+        return _TENS[tens] + (f"-{_ONES[ones]}" if ones else "")
+    if n < 1000:
+        hundreds, rest = divmod(n, 100)
+        return f"{_ONES[hundreds]} hundred" + (f" and {number_to_words(rest)}" if rest else "")
+
+    for scale, name in _SCALES:
+        if n >= scale:
+            high, rest = divmod(n, scale)
+            words = f"{number_to_words(high)} {name}"
+            if rest:
+                words += f" and {number_to_words(rest)}" if rest < 100 else f" {number_to_words(rest)}"
+            return words
+    raise ValueError(f"Number out of range: {n}")
+
+
+def ordinal_to_words(n: int) -> str:
+    """Spell out an ordinal ("twentieth", "one hundred and first")"""
+    words = number_to_words(n)
+    head, sep, last = words.rpartition("-") if "-" in words.split()[-1] else words.rpartition(" ")
+    if last in _ORDINALS:
+        last = _ORDINALS[last]
+    elif last.endswith("y"):
+        last = last[:-1] + "ieth"
+    else:
+        last += "th"
+    return head + sep + last
+
+
+def decimal_to_words(whole: str, fraction: str) -> str:
+    """Spell out a decimal digit by digit after the point ("two point five")"""
+    return f"{number_to_words(int(whole))} point " + " ".join(_ONES[int(digit)] for digit in fraction)
+
+
+def canonicalize(text: str) -> str:
+    """
+    Reduce text to the canonical form that is synthesized and cached
+
+    Folds typographic variants and case, spells out numbers (including
+    ordinals like "3rd" and decimals), collapses repeated marks ("!!!" -> "!"), removes
+    space before punctuation and collapses whitespace. XTTS lowercases and
+    expands numbers itself, so none of this changes what it says.
+
+    Args:
+        text: Commentary as received
+
+    Returns:
+        Canonical text; equal for inputs that would be spoken the same
+    """
+    text = unicodedata.normalize("NFKC", text).translate(_CHARACTERS).lower()
+    text = _DECIMAL_NUMBER.sub(lambda m: decimal_to_words(m.group(1), m.group(2)), text)
+    text = _ORDINAL_NUMBER.sub(lambda m: ordinal_to_words(int(m.group(1))), text)
+    text = _NUMBER.sub(lambda m: number_to_words(int(m.group(0).replace(",", ""))), text)
+    text = _LONG_ELLIPSIS.sub("...", text)
+    text = _REPEATED_MARK.sub(r"\1", text)
+    text = _SPACE_BEFORE_PUNCTUATION.sub(r"\1", text)
+    return _WHITESPACE.sub(" ", text).strip()
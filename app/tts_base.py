@@ -1,6 +1,12 @@
 from abc import ABC, abstractmethod
 from pathlib import Path
+from typing import AsyncIterator, Callable, Iterator, List, Optional
+import asyncio
 import logging
+import threading
+from app.config import settings
+from app.inference_executor import InferenceExecutor
+from app.audio_utils import decode_wav, to_pcm16
 
 logger = logging.getLogger(__name__)
 
@@ -26,20 +32,131 @@ class BaseTTSEngine(ABC):
             logger.warning("Will use default speaker instead")
             self.speaker_wav = None
 
+        # Blocking synthesis runs here, off the event loop
+        self.inference = InferenceExecutor(
+            workers=settings.inference_workers,
+            max_queue=settings.inference_queue_size,
+            retry_after=settings.inference_retry_after,
+            aging_s=settings.priority_aging_s
+        )
+
+    async def run_inference(self, func, *args, **kwargs):
+        """
+        Run a blocking synthesis call on the inference executor
+
+        Raises:
+            InferenceQueueFull: If the inference queue is at capacity
+        """
+        return await self.inference.run(func, *args, **kwargs)
+
+    async def run_inference_stream(
+        self,
+        func: Callable[..., Iterator],
+        *args,
+        cancel: Optional[threading.Event] = None,
+        **kwargs
+    ) -> AsyncIterator:
+        """
+        Run a blocking generator on the inference executor, yielding as it produces
+
+        The generator holds one inference slot until it finishes. Setting
+        `cancel` (or closing this iterator) stops it after the current item.
+
+        Raises:
+            InferenceQueueFull: If the inference queue is at capacity
+        """
+        cancel = cancel or threading.Event()
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        def produce():
+            for item in func(*args, **kwargs):
+                if cancel.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, item)
+
+        task = asyncio.ensure_future(self.run_inference(produce))
+        task.add_done_callback(lambda _: queue.put_nowait(done))
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                yield item
+            task.result()
+        finally:
+            cancel.set()
+
+    def get_inference_stats(self) -> dict:
+        """Get inference queue depth and wait times"""
+        return self.inference.get_stats()
+
     @abstractmethod
-    async def generate_audio(self, text: str, speed: float = 0.95) -> bytes:
+    async def generate_audio(self, text: str, speed: float = 0.95, speaker_wav: Optional[str] = None) -> bytes:
         """
         Generate audio from text
 
         Args:
             text: Text to synthesize
             speed: Speech rate (0.8-1.2, lower = slower/more drunk)
+            speaker_wav: Reference clip of the voice to use (None: the engine's default voice)
 
         Returns:
             WAV audio as bytes
         """
         pass
 
+    async def generate_batch(
+        self,
+        texts: List[str],
+        speed: float = 0.95,
+        speaker_wav: Optional[str] = None
+    ) -> List[bytes]:
+        """
+        Generate audio for several texts at once
+
+        Engines that can batch inference should override this. The default
+        synthesizes each text in turn.
+
+        Args:
+            texts: Texts to synthesize
+            speed: Speech rate shared by the whole batch
+            speaker_wav: Voice shared by the whole batch
+
+        Returns:
+            WAV audio bytes for each text, in order
+        """
+        return [await self.generate_audio(text, speed, speaker_wav) for text in texts]
+
+    async def stream_audio(
+        self,
+        text: str,
+        speed: float = 0.95,
+        chunk_size: int = 20,
+        cancel: Optional[threading.Event] = None,
+        speaker_wav: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream audio from text as it is synthesized
+
+        Engines that can decode incrementally should override this. The
+        default synthesizes the whole utterance and yields it as one chunk.
+
+        Args:
+            text: Text to synthesize
+            speed: Speech rate (0.8-1.2, lower = slower/more drunk)
+            chunk_size: Engine-specific chunk size hint (XTTS: GPT tokens per chunk)
+            cancel: Set to stop synthesis early
+            speaker_wav: Reference clip of the voice to use (None: the engine's default voice)
+
+        Yields:
+            16-bit mono PCM chunks at `self.sample_rate`
+        """
+        audio = await self.generate_audio(text, speed, speaker_wav)
+        if not (cancel and cancel.is_set()):
+            yield to_pcm16(decode_wav(audio)[1])
+
     @abstractmethod
     def is_gpu_available(self) -> bool:
         """Check if GPU/acceleration is available"""
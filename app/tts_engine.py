@@ -8,6 +8,60 @@ from app.config import settings
 
 logger = logging.getLogger(__name__)
 
+MLX_MODEL = "mlx-community/csm-1b"
+
+# Engines whose generate_batch runs a whole batch in one forward pass. For the
+# others a batch would just be its items back to back in one slot.
+BATCHING_ENGINES = {"stub", "xtts"}
+
+def engine_fingerprint() -> str:
+    """
+    Identify what renders the audio, for cache keys
+
+    Derived from settings alone, so it is known before the model has loaded
+    and is the same in every worker and inference server. Anything that
+    changes the sound of the output (engine, model, int8 fast path) is part
+    of it.
+
+    Returns:
+        Fingerprint such as "xtts:tts_models/multilingual/multi-dataset/xtts_v2:int8"
+    """
+    engine_type = settings.selected_engine
+    if engine_type == "mlx":
+        return f"mlx:{MLX_MODEL}"
+    if engine_type == "stub":
+        return "stub"
+    fingerprint = f"{engine_type}:{settings.tts_model}"
+    if settings.xtts_cpu_optimize and settings.tts_device == "cpu":
+        fingerprint += ":int8"
+    return fingerprint
+
+def micro_batching_enabled() -> bool:
+    """
+    Whether this process groups requests into engine batches
+
+    Only with MICRO_BATCH_ENABLED, in the process that runs the model (the
+    inference servers in remote mode), and for an engine that batches.
+    """
+    return (
+        settings.micro_batch_enabled
+        and settings.inference_mode == "local"
+        and settings.selected_engine in BATCHING_ENGINES
+    )
+
+def inference_capacity() -> int:
+    """
+    Syntheses this process can have running at once without queueing
+
+    One per inference slot, times the batch size when requests are
+    micro-batched locally. In remote mode the local executor still runs at
+    most INFERENCE_WORKERS calls at a time.
+    """
+    capacity = max(1, settings.inference_workers)
+    if micro_batching_enabled():
+        capacity *= max(1, settings.micro_batch_max_size)
+    return capacity
+
 def create_tts_engine(
     model_name: str = None,
     device: str = None,
@@ -29,13 +83,23 @@ def create_tts_engine(
     device = device or settings.tts_device
     speaker_wav = speaker_wav or settings.speaker_wav
 
+    if settings.inference_mode == "remote":
+        # The model lives in separate inference server processes
+        logger.info("Creating TTS engine: remote")
+        from app.tts_engine_remote import RemoteTTSEngine
+        return RemoteTTSEngine(
+            model_name=model_name,
+            device=device,
+            speaker_wav=speaker_wav
+        )
+
     engine_type = settings.selected_engine
     logger.info(f"Creating TTS engine: {engine_type}")
 
     if engine_type == "mlx":
         from app.tts_engine_mlx import MLXEngine
         return MLXEngine(
-            model_name="mlx-community/csm-1b",
+            model_name=MLX_MODEL,
             device="mps",
             speaker_wav=speaker_wav
         )
@@ -46,6 +110,13 @@ def create_tts_engine(
             device=device,
             speaker_wav=speaker_wav
         )
+    elif engine_type == "stub":
+        from app.tts_engine_stub import StubEngine
+        return StubEngine(
+            model_name="stub",
+            device="cpu",
+            speaker_wav=speaker_wav
+        )
     else:
         raise ValueError(f"Unknown engine type: {engine_type}")
 
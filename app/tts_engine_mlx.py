@@ -4,7 +4,9 @@ from scipy.io.wavfile import write
 import logging
 import tempfile
 from pathlib import Path
+from typing import Optional
 from app.tts_base import BaseTTSEngine
+from app.inference_executor import InferenceQueueFull
 
 logger = logging.getLogger(__name__)
 
@@ -41,70 +43,76 @@ class MLXEngine(BaseTTSEngine):
         except:
             return False
 
-    async def generate_audio(self, text: str, speed: float = 0.95) -> bytes:
+    async def generate_audio(self, text: str, speed: float = 0.95, speaker_wav: Optional[str] = None) -> bytes:
         """
         Generate audio from text using MLX-Audio CSM
 
         Args:
             text: Text to synthesize
             speed: Speech rate (0.8-1.2, lower = slower/more drunk)
+            speaker_wav: Reference clip of the voice to use (None: the default voice)
 
         Returns:
             WAV audio as bytes
         """
         try:
-            # Create a temporary directory for MLX-Audio output
-            with tempfile.TemporaryDirectory() as temp_dir:
-                temp_path = Path(temp_dir)
-
-                # MLX-Audio expects file paths for output
-                output_prefix = str(temp_path / "output")
-
-                # Generate audio using MLX-Audio
-                logger.debug(f"Generating audio with MLX-Audio: {text[:50]}...")
-
-                # Call MLX-Audio generation function
-                # Note: generate_audio writes to file and returns None
-                self.generate_func(
-                    text=text,
-                    model_path=self.model_name,  # "mlx-community/csm-1b"
-                    ref_audio=self.speaker_wav if self.speaker_wav else None,
-                    speed=speed,
-                    file_prefix=output_prefix,
-                    audio_format="wav",
-                    join_audio=True,
-                    verbose=False,
-                    play=False  # Don't play audio, just generate
-                )
-
-                # Find the generated WAV file - MLX-Audio appends _0, _1, etc
-                output_file = temp_path / "output_0.wav"
-
-                if not output_file.exists():
-                    # Try without suffix
-                    output_file = temp_path / "output.wav"
-
-                if not output_file.exists():
-                    # Try to find any WAV file generated
-                    wav_files = list(temp_path.glob("*.wav"))
-                    if wav_files:
-                        output_file = wav_files[0]
-                        logger.debug(f"Using generated file: {output_file.name}")
-                    else:
-                        raise FileNotFoundError(f"MLX-Audio did not generate output file. Expected at {temp_path / 'output_0.wav'}")
-
-                # Read the WAV file and return as bytes
-                with open(output_file, 'rb') as f:
-                    audio_bytes = f.read()
-
-                logger.debug(f"Generated {len(audio_bytes)} bytes of audio")
-                return audio_bytes
-
+            return await self.run_inference(self._synthesize, text, speed, speaker_wav)
+        except InferenceQueueFull:
+            raise
         except Exception as e:
             logger.error(f"Error generating audio with MLX: {e}")
             logger.exception("Full traceback:")
             raise
 
+    def _synthesize(self, text: str, speed: float, speaker_wav: Optional[str] = None) -> bytes:
+        """Blocking synthesis, runs on the inference executor"""
+        # Create a temporary directory for MLX-Audio output
+        with tempfile.TemporaryDirectory() as temp_dir:
+            temp_path = Path(temp_dir)
+
+            # MLX-Audio expects file paths for output
+            output_prefix = str(temp_path / "output")
+
+            # Generate audio using MLX-Audio
+            logger.debug(f"Generating audio with MLX-Audio: {text[:50]}...")
+
+            # Call MLX-Audio generation function
+            # Note: generate_audio writes to file and returns None
+            self.generate_func(
+                text=text,
+                model_path=self.model_name,  # "mlx-community/csm-1b"
+                ref_audio=speaker_wav or self.speaker_wav or None,
+                speed=speed,
+                file_prefix=output_prefix,
+                audio_format="wav",
+                join_audio=True,
+                verbose=False,
+                play=False  # Don't play audio, just generate
+            )
+
+            # Find the generated WAV file - MLX-Audio appends _0, _1, etc
+            output_file = temp_path / "output_0.wav"
+
+            if not output_file.exists():
+                # Try without suffix
+                output_file = temp_path / "output.wav"
+
+            if not output_file.exists():
+                # Try to find any WAV file generated
+                wav_files = list(temp_path.glob("*.wav"))
+                if wav_files:
+                    output_file = wav_files[0]
+                    logger.debug(f"Using generated file: {output_file.name}")
+                else:
+                    raise FileNotFoundError(f"MLX-Audio did not generate output file. Expected at {temp_path / 'output_0.wav'}")
+
+            # Read the WAV file and return as bytes
+            with open(output_file, 'rb') as f:
+                audio_bytes = f.read()
+
+            logger.debug(f"Generated {len(audio_bytes)} bytes of audio")
+            return audio_bytes
+
     def get_voice_info(self) -> dict:
         """Get information about loaded voice"""
         return {
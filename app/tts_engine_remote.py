@@ -0,0 +1,170 @@
+"""
+Remote TTS Engine
+Forwards synthesis to inference server processes over unix sockets
+"""
+import itertools
+import logging
+import threading
+import time
+from multiprocessing.connection import Client, Connection
+from typing import AsyncIterator, Iterator, List, Optional
+
+from app.config import settings
+from app.tts_base import BaseTTSEngine
+from app.inference_executor import InferenceQueueFull, current_priority
+from app.inference_server import inference_authkey, inference_socket_path
+
+logger = logging.getLogger(__name__)
+
+class RemoteTTSEngine(BaseTTSEngine):
+    """
+    TTS engine backed by shared inference servers (see app.inference_server)
+
+    Used when several HTTP workers run side by side: none of them loads the
+    model. Calls still go through this worker's inference executor, so local
+    queue limits, priorities and stage timings behave as with a local engine;
+    each executor thread holds its own connection, spread round-robin over
+    the configured servers.
+    """
+
+    def __init__(self, model_name: str, device: str = "cpu", speaker_wav: str = None):
+        super().__init__(model_name, device, speaker_wav)
+
+        self.addresses = [inference_socket_path(i) for i in range(max(1, settings.inference_processes))]
+        self.authkey = inference_authkey()
+        self._local = threading.local()
+        self._next_address = itertools.count()
+
+        self.info = self._wait_for_servers(settings.inference_connect_timeout_s)
+        self.sample_rate = self.info["sample_rate"]
+        logger.info(f"✅ Connected to {len(self.addresses)} inference server(s)")
+
+    def _wait_for_servers(self, timeout: float) -> dict:
+        """Block until every inference server answers (they may still be loading the model)"""
+        deadline = time.monotonic() + timeout
+        info = None
+        for address in self.addresses:
+            while True:
+                try:
+                    conn = Client(address, family="AF_UNIX", authkey=self.authkey)
+                    try:
+                        conn.send({"op": "info"})
+                        info = self._unwrap(conn.recv())
+                    finally:
+                        conn.close()
+                    break
+                except (FileNotFoundError, ConnectionRefusedError, EOFError):
+                    if time.monotonic() > deadline:
+                        raise TimeoutError(f"Inference server at {address} did not come up within {timeout:.0f}s")
+                    logger.info(f"Waiting for inference server at {address}...")
+                    time.sleep(1.0)
+        return info
+
+    def _connection(self) -> Connection:
+        """This thread's connection, opened on first use"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            address = self.addresses[next(self._next_address) % len(self.addresses)]
+            conn = self._local.conn = Client(address, family="AF_UNIX", authkey=self.authkey)
+        return conn
+
+    def _disconnect(self):
+        conn = getattr(self._local, "conn", None)
+        self._local.conn = None
+        if conn is not None:
+            conn.close()
+
+    @staticmethod
+    def _unwrap(reply: dict):
+        if reply.get("ok"):
+            return reply["result"]
+        if reply.get("error") == "queue_full":
+            raise InferenceQueueFull(reply["queue_size"], reply["retry_after"])
+        raise RuntimeError(f"Inference server error: {reply.get('detail')}")
+
+    def _call(self, op: str, **params):
+        """Blocking request/response, runs on the inference executor"""
+        # The executor runs this in the caller's context, so the priority carries over
+        request = {"op": op, "priority": current_priority().name, **params}
+        try:
+            conn = self._connection()
+            conn.send(request)
+            reply = conn.recv()
+        except (EOFError, OSError) as e:
+            self._disconnect()
+            raise ConnectionError(f"Lost connection to inference server: {e}")
+        return self._unwrap(reply)
+
+    def _call_stream(self, text: str, speed: float, chunk_size: int, speaker_wav: Optional[str]) -> Iterator[bytes]:
+        """Blocking streamed request, runs on the inference executor"""
+        conn = self._connection()
+        finished = False
+        try:
+            conn.send({"op": "stream", "priority": current_priority().name, "text": text,
+                       "speed": speed, "chunk_size": chunk_size, "speaker_wav": speaker_wav})
+            while True:
+                reply = conn.recv()
+                if "chunk" not in reply:
+                    finished = True
+                    self._unwrap(reply)
+                    return
+                yield reply["chunk"]
+        except (EOFError, OSError) as e:
+            finished = True
+            self._disconnect()
+            raise ConnectionError(f"Lost connection to inference server: {e}")
+        finally:
+            if not finished:
+                # Stopped early: cancel and drain so the connection can be reused
+                try:
+                    conn.send({"op": "cancel"})
+                    while "chunk" in conn.recv():
+                        pass
+                except (EOFError, OSError):
+                    self._disconnect()
+
+    def is_gpu_available(self) -> bool:
+        """Check if the inference servers use a GPU"""
+        return self.info["gpu"]
+
+    async def generate_audio(self, text: str, speed: float = 0.95, speaker_wav: Optional[str] = None) -> bytes:
+        """
+        Generate audio on an inference server
+
+        Args:
+            text: Text to synthesize
+            speed: Speech rate (0.8-1.2, lower = slower/more drunk)
+            speaker_wav: Reference clip of the voice to use (None: the default voice);
+                the path must be readable by the inference servers
+
+        Returns:
+            WAV audio as bytes
+        """
+        return await self.run_inference(self._call, "generate", text=text, speed=speed, speaker_wav=speaker_wav)
+
+    async def generate_batch(
+        self,
+        texts: List[str],
+        speed: float = 0.95,
+        speaker_wav: Optional[str] = None
+    ) -> List[bytes]:
+        """Generate a batch on an inference server"""
+        return await self.run_inference(self._call, "batch", texts=texts, speed=speed, speaker_wav=speaker_wav)
+
+    async def stream_audio(
+        self,
+        text: str,
+        speed: float = 0.95,
+        chunk_size: int = 20,
+        cancel: Optional[threading.Event] = None,
+        speaker_wav: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """Stream audio from an inference server as it is synthesized"""
+        async for chunk in self.run_inference_stream(
+            self._call_stream, text, speed, chunk_size, speaker_wav, cancel=cancel
+        ):
+            yield chunk
+
+    def get_voice_info(self) -> dict:
+        """Get information about the voice loaded by the inference servers"""
+        return {**self.info["voice"], "inference_servers": self.addresses}
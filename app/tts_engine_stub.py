@@ -0,0 +1,98 @@
+import hashlib
+import io
+import logging
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from scipy.io.wavfile import write
+
+from app import metrics
+from app.config import settings
+from app.tts_base import BaseTTSEngine
+
+logger = logging.getLogger(__name__)
+
+class StubEngine(BaseTTSEngine):
+    """Deterministic stand-in engine for testing and benchmarks (no model download)"""
+
+    def __init__(self, model_name: str = "stub", device: str = "cpu", speaker_wav: str = None):
+        super().__init__(model_name, device, speaker_wav)
+
+        self.sample_rate = 24000
+        self.latency = settings.stub_latency_ms / 1000
+        self.cpu_cost = settings.stub_cpu_ms / 1000
+
+        # (batch size, longest text) of every batch the engine has run
+        self.batch_shapes: List[Tuple[int, int]] = []
+
+        logger.info(f"✅ Stub engine ready ({settings.stub_latency_ms} ms latency, {settings.stub_cpu_ms} ms CPU per call)")
+
+    def is_gpu_available(self) -> bool:
+        """The stub never uses a GPU"""
+        return False
+
+    async def generate_audio(self, text: str, speed: float = 0.95, speaker_wav: Optional[str] = None) -> bytes:
+        """
+        Generate deterministic audio for text
+
+        Args:
+            text: Text to synthesize
+            speed: Speech rate (shortens or lengthens the output)
+            speaker_wav: Voice to use (changes the pitch)
+
+        Returns:
+            WAV audio as bytes
+        """
+        results = await self.run_inference(self._synthesize_batch, [text], speed, speaker_wav)
+        return results[0]
+
+    async def generate_batch(
+        self,
+        texts: List[str],
+        speed: float = 0.95,
+        speaker_wav: Optional[str] = None
+    ) -> List[bytes]:
+        """Generate a batch in one inference call, recording its shape"""
+        return await self.run_inference(self._synthesize_batch, texts, speed, speaker_wav)
+
+    def _synthesize_batch(self, texts: List[str], speed: float, speaker_wav: Optional[str] = None) -> List[bytes]:
+        """Blocking synthesis, runs on the inference executor"""
+        self.batch_shapes.append((len(texts), max(len(text) for text in texts)))
+        time.sleep(self.latency)
+        self._burn_cpu(self.cpu_cost)
+        return [self._render(text, speed, speaker_wav) for text in texts]
+
+    @staticmethod
+    def _burn_cpu(seconds: float):
+        """Keep a core busy with matrix math, like a CPU forward pass would"""
+        if seconds <= 0:
+            return
+        matrix = np.random.default_rng(0).standard_normal((128, 128), dtype=np.float32)
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            matrix = np.tanh(matrix @ matrix)
+
+    def _render(self, text: str, speed: float, speaker_wav: Optional[str] = None) -> bytes:
+        """A tone whose pitch and length depend only on the text, speed and voice"""
+        voice = f"{speaker_wav}:" if speaker_wav and speaker_wav != self.speaker_wav else ""
+        seed = int(hashlib.md5(f"{voice}{text}".encode()).hexdigest()[:8], 16)
+        duration = max(0.3, 0.06 * len(text)) / max(speed, 0.05)
+        t = np.arange(int(self.sample_rate * duration)) / self.sample_rate
+        frequency = 110 + seed % 330
+        wav = 0.3 * np.sin(2 * np.pi * frequency * t) * np.hanning(len(t))
+
+        buffer = io.BytesIO()
+        with metrics.stage("wav_encode"):
+            write(buffer, self.sample_rate, wav.astype(np.float32))
+        return buffer.getvalue()
+
+    def get_voice_info(self) -> dict:
+        """Get information about loaded voice"""
+        return {
+            "engine": "stub",
+            "model": self.model_name,
+            "device": "cpu",
+            "speaker_wav": self.speaker_wav,
+            "sample_rate": self.sample_rate
+        }
@@ -1,11 +1,21 @@
 import builtins
-import torch
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, List, Optional, Tuple
 import numpy as np
 import io
 from scipy.io.wavfile import write
 import logging
 from pathlib import Path
+from app import metrics
+from app.config import settings
 from app.tts_base import BaseTTSEngine
+from app.inference_executor import InferenceQueueFull
+from app.audio_utils import to_pcm16
+from app.voice_registry import clip_content_id
 
 # Monkeypatch input to auto-accept TTS license
 def _auto_accept_input(prompt=""):
@@ -13,15 +23,76 @@ def _auto_accept_input(prompt=""):
     return "y"
 builtins.input = _auto_accept_input
 
-from TTS.api import TTS
+# torch and TTS take seconds to import, so they are loaded with the model
+# rather than when this module is imported
+torch = None
+TTS = None
+split_sentence = None
+
+def _import_backend():
+    """Import torch and Coqui TTS on first use"""
+    global torch, TTS, split_sentence
+    if TTS is None:
+        import torch as _torch
+        from TTS.api import TTS as _TTS
+        from TTS.tts.layers.xtts.tokenizer import split_sentence as _split_sentence
+        torch, TTS, split_sentence = _torch, _TTS, _split_sentence
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_SPEAKER = "Claribel Dervla"  # Default XTTS sample speaker
+WARM_UP_TEXT = "Warming up the voice model."
+
+def configure_torch_threads(threads: int, interop_threads: int):
+    """
+    Set torch's intra-op and inter-op thread pools (0 keeps torch's default)
+
+    Inter-op threads can only be set before torch first runs parallel work,
+    so this has to happen before the model is loaded.
+    """
+    if threads > 0:
+        torch.set_num_threads(threads)
+    if interop_threads > 0:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            logger.warning(f"Could not set inter-op threads: {e}")
+    logger.info(f"Torch threads: {torch.get_num_threads()} intra-op, {torch.get_num_interop_threads()} inter-op")
+
+def quantize_gpt(model) -> int:
+    """
+    Quantize the XTTS GPT transformer's linear layers to int8 (CPU only)
+
+    Weights are stored as int8 and activations quantized on the fly. HF's
+    GPT-2 implements its projections as Conv1D (a transposed Linear), which
+    quantize_dynamic doesn't recognize, so those are turned into Linear
+    layers first. Only the transformer blocks are touched: the conditioning
+    encoder, embeddings and HiFi-GAN decoder stay in float32, so speaker
+    latents are unchanged.
+
+    Returns:
+        Number of layers quantized
+    """
+    transformer = model.gpt.gpt
+    for parent in list(transformer.modules()):
+        for name, child in list(parent.named_children()):
+            if type(child).__name__ == "Conv1D":
+                linear = torch.nn.Linear(child.weight.shape[0], child.weight.shape[1])
+                linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous())
+                linear.bias = torch.nn.Parameter(child.bias.detach())
+                setattr(parent, name, linear)
+
+    layers = sum(1 for module in transformer.modules() if isinstance(module, torch.nn.Linear))
+    # In place: the inference wrapper holds the same transformer object
+    torch.ao.quantization.quantize_dynamic(transformer, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return layers
+
 class XTTSEngine(BaseTTSEngine):
     """Coqui XTTS-based TTS engine for GPU/CPU"""
 
     def __init__(self, model_name: str, device: str = "cuda", speaker_wav: str = None):
         super().__init__(model_name, device, speaker_wav)
+        _import_backend()
 
         # Check if CUDA is actually available
         self.device = device if torch.cuda.is_available() and device == "cuda" else "cpu"
@@ -30,65 +101,390 @@ class XTTSEngine(BaseTTSEngine):
             logger.warning("CUDA requested but not available, falling back to CPU")
 
         logger.info(f"Initializing XTTS on {self.device}")
+        configure_torch_threads(settings.torch_threads, settings.torch_interop_threads)
 
         # Load model
         self.tts = TTS(model_name).to(self.device)
-        self.sample_rate = 22050
+        self.model = self.tts.synthesizer.tts_model
+        self.sample_rate = self.model.config.audio.output_sample_rate
 
         logger.info(f"✅ XTTS model loaded: {model_name}")
+
+        # Dynamic quantization kernels only exist for CPU
+        self.quantized = settings.xtts_cpu_optimize and self.device == "cpu"
+        if settings.xtts_cpu_optimize and not self.quantized:
+            logger.warning("XTTS_CPU_OPTIMIZE only applies on CPU; running in full precision")
+        if self.quantized:
+            layers = quantize_gpt(self.model)
+            logger.info(f"⚡ Quantized {layers} GPT linear layers to int8")
+
+        # Conditioning latents are computed once per voice, not per request
+        self.latent_dir = Path(settings.speaker_latent_dir)
+        self.latent_dir.mkdir(parents=True, exist_ok=True)
         if self.speaker_wav:
+            self.gpt_cond_latent, self.speaker_embedding = self._load_speaker_latents(self.speaker_wav)
             logger.info(f"✅ Using voice clone: {self.speaker_wav}")
         else:
+            speaker = self.model.speaker_manager.speakers[DEFAULT_SPEAKER]
+            self.gpt_cond_latent = speaker["gpt_cond_latent"]
+            self.speaker_embedding = speaker["speaker_embedding"]
             logger.info("ℹ️  Using default speaker (no voice clone)")
 
+        # Latents of other voices, most recently used last; evicted voices are
+        # reloaded from their file in latent_dir
+        self.voice_cache_size = max(1, settings.voice_cache_size)
+        self._voices: "OrderedDict[str, Tuple]" = OrderedDict()
+        self._voices_lock = threading.Lock()
+        self.voice_loads = 0
+
+        # The first synthesis pays for lazy initialization (kernel selection,
+        # allocator growth, quantized weight packing); do it before serving
+        if settings.xtts_warm_up:
+            started = time.perf_counter()
+            self._synthesize(WARM_UP_TEXT, 1.0)
+            logger.info(f"🔥 XTTS warm-up synthesis took {time.perf_counter() - started:.2f}s")
+
+    def _get_latent_key(self, speaker_wav: str) -> str:
+        """Cache key from the voice file contents and the model"""
+        digest = hashlib.sha256(self.model_name.encode())
+        clip_id = clip_content_id(speaker_wav)
+        if clip_id:
+            # Registered clips are content-addressed; no need to read (or still have) the file
+            digest.update(f"clip:{clip_id}".encode())
+            return digest.hexdigest()
+        with open(speaker_wav, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _load_speaker_latents(self, speaker_wav: str):
+        """
+        Get GPT conditioning latents and speaker embedding for a voice file
+
+        Latents are persisted to disk keyed by a content hash of the wav, so
+        they are only computed the first time a given clip is seen.
+
+        Returns:
+            (gpt_cond_latent, speaker_embedding) tensors
+        """
+        latent_file = self.latent_dir / f"{self._get_latent_key(speaker_wav)}.pt"
+
+        if latent_file.exists():
+            try:
+                data = torch.load(latent_file, map_location=self.device)
+                logger.info(f"📦 Loaded cached speaker latents: {latent_file.name}")
+                return data["gpt_cond_latent"], data["speaker_embedding"]
+            except Exception as e:
+                logger.error(f"Error loading speaker latents {latent_file}: {e}")
+
+        logger.info(f"Computing speaker latents for {speaker_wav}...")
+        gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(audio_path=[speaker_wav])
+
+        # Write to a temp file and rename so a crash never leaves a partial file
+        tmp_file = latent_file.with_suffix(".tmp")
+        try:
+            torch.save({
+                "speaker_wav": speaker_wav,
+                "model": self.model_name,
+                "gpt_cond_latent": gpt_cond_latent.cpu(),
+                "speaker_embedding": speaker_embedding.cpu(),
+            }, tmp_file)
+            os.replace(tmp_file, latent_file)
+        except Exception as e:
+            logger.error(f"Error caching speaker latents: {e}")
+
+        return gpt_cond_latent, speaker_embedding
+
+    def _get_voice(self, speaker_wav: Optional[str]):
+        """
+        Conditioning latents for a voice, from memory when recently used
+
+        Args:
+            speaker_wav: Reference clip (None: the default voice)
+
+        Returns:
+            (gpt_cond_latent, speaker_embedding) tensors
+        """
+        if speaker_wav is None or speaker_wav == self.speaker_wav:
+            return self.gpt_cond_latent, self.speaker_embedding
+
+        with self._voices_lock:
+            latents = self._voices.get(speaker_wav)
+            if latents is not None:
+                self._voices.move_to_end(speaker_wav)
+                return latents
+
+            latents = self._load_speaker_latents(speaker_wav)
+            self.voice_loads += 1
+            self._voices[speaker_wav] = latents
+            if len(self._voices) > self.voice_cache_size:
+                evicted, _ = self._voices.popitem(last=False)
+                logger.debug(f"Evicted voice latents: {evicted}")
+            return latents
+
     def is_gpu_available(self) -> bool:
         """Check if GPU is being used"""
         return torch.cuda.is_available() and self.device == "cuda"
 
-    async def generate_audio(self, text: str, speed: float = 0.95) -> bytes:
+    async def generate_audio(self, text: str, speed: float = 0.95, speaker_wav: Optional[str] = None) -> bytes:
         """
         Generate audio from text using XTTS
 
         Args:
             text: Text to synthesize
             speed: Speech rate (0.8-1.2, lower = slower/more drunk)
+            speaker_wav: Reference clip of the voice to use (None: the default voice)
 
         Returns:
             WAV audio as bytes
         """
         try:
-            # Generate audio array
-            if self.speaker_wav:
-                # Use voice cloning
-                wav = self.tts.tts(
-                    text=text,
-                    speaker_wav=self.speaker_wav,
-                    language="en",
-                    speed=speed
-                )
-            else:
-                # Use default speaker - XTTS requires either speaker_wav or speaker name
-                # Using a sample voice from the model
-                wav = self.tts.tts(
-                    text=text,
-                    language="en",
-                    speed=speed,
-                    speaker="Claribel Dervla"  # Default XTTS sample speaker
-                )
+            return await self.run_inference(self._synthesize, text, speed, speaker_wav)
+        except InferenceQueueFull:
+            raise
+        except Exception as e:
+            logger.error(f"Error generating audio: {e}")
+            raise
+
+    def _synthesize(self, text: str, speed: float, speaker_wav: Optional[str] = None) -> bytes:
+        """Blocking synthesis, runs on the inference executor"""
+        # Run from the cached conditioning latents instead of re-encoding the voice
+        gpt_cond_latent, speaker_embedding = self._get_voice(speaker_wav)
+        config = self.model.config
+        with torch.inference_mode():
+            out = self.model.inference(
+                text,
+                "en",
+                gpt_cond_latent,
+                speaker_embedding,
+                temperature=config.temperature,
+                length_penalty=config.length_penalty,
+                repetition_penalty=config.repetition_penalty,
+                top_k=config.top_k,
+                top_p=config.top_p,
+                speed=speed,
+                enable_text_splitting=True
+            )
+        return self._encode_wav(out["wav"])
 
-            # Convert to WAV bytes
-            wav_array = np.array(wav)
+    def _encode_wav(self, wav) -> bytes:
+        """Float samples to WAV bytes"""
+        wav_array = np.array(wav)
 
-            # Create WAV file in memory
-            buffer = io.BytesIO()
+        # Create WAV file in memory
+        buffer = io.BytesIO()
+        with metrics.stage("wav_encode"):
             write(buffer, self.sample_rate, wav_array.astype(np.float32))
-            buffer.seek(0)
+        buffer.seek(0)
 
-            return buffer.read()
+        return buffer.read()
 
-        except Exception as e:
-            logger.error(f"Error generating audio: {e}")
-            raise
+    async def generate_batch(
+        self,
+        texts: List[str],
+        speed: float = 0.95,
+        speaker_wav: Optional[str] = None
+    ) -> List[bytes]:
+        """
+        Generate audio for several texts in one padded GPT decode
+
+        Args:
+            texts: Texts to synthesize
+            speed: Speech rate shared by the whole batch
+            speaker_wav: Voice shared by the whole batch
+
+        Returns:
+            WAV audio bytes for each text, in order
+        """
+        return await self.run_inference(self._synthesize_batch, texts, speed, speaker_wav)
+
+    def _synthesize_batch(self, texts: List[str], speed: float, speaker_wav: Optional[str] = None) -> List[bytes]:
+        """
+        Blocking batched synthesis, runs on the inference executor
+
+        Follows Xtts.inference, except that every sentence of every text is a
+        row of one GPT decode and one HiFi-GAN pass. The GPT latents of each
+        row still take a forward of their own, which is cheap next to the
+        token-by-token decode.
+        """
+        gpt_cond_latent, speaker_embedding = self._get_voice(speaker_wav)
+        gpt_cond_latent = gpt_cond_latent.to(self.device)
+        speaker_embedding = speaker_embedding.to(self.device)
+        gpt = self.model.gpt
+        length_scale = 1.0 / max(speed, 0.05)
+
+        # One row per sentence, remembering which text it came from
+        rows, owners = [], []
+        for index, text in enumerate(texts):
+            for sentence in split_sentence(text, "en", self.model.tokenizer.char_limits["en"]):
+                tokens = self.model.tokenizer.encode(sentence.strip().lower(), lang="en")
+                rows.append(torch.IntTensor(tokens).to(self.device))
+                owners.append(index)
+        if not rows:
+            return [self._encode_wav(np.zeros(0)) for _ in texts]
+
+        with torch.inference_mode():
+            codes = self._generate_codes(rows, gpt_cond_latent)
+
+            latents = []
+            for tokens, row_codes in zip(rows, codes):
+                latent = gpt(
+                    tokens[None],
+                    torch.tensor([tokens.shape[-1]], device=self.device),
+                    row_codes[None],
+                    torch.tensor([row_codes.shape[-1] * gpt.code_stride_len], device=self.device),
+                    cond_latents=gpt_cond_latent,
+                    return_attentions=False,
+                    return_latent=True
+                )
+                if length_scale != 1.0:
+                    latent = torch.nn.functional.interpolate(
+                        latent.transpose(1, 2), scale_factor=length_scale, mode="linear"
+                    ).transpose(1, 2)
+                latents.append(latent[0])
+
+            wavs = self._decode_latents(latents, speaker_embedding)
+
+        results = []
+        for index in range(len(texts)):
+            parts = [wav for owner, wav in zip(owners, wavs) if owner == index]
+            results.append(self._encode_wav(torch.cat(parts).numpy() if parts else np.zeros(0)))
+        return results
+
+    def _generate_codes(self, rows: List, gpt_cond_latent) -> List:
+        """
+        Sample audio codes for every row in one GPT decode
+
+        Prefixes (voice latents + text) are left-padded to the same length and
+        the pads masked out. XTTS's transformer has no position embedding of
+        its own (text and audio positions are added to the inputs, per row),
+        so padding doesn't change what a row attends to.
+
+        Returns:
+            Audio codes of each row, up to and including its stop token
+        """
+        gpt = self.model.gpt
+        config = self.model.config
+
+        prefixes = []
+        for tokens in rows:
+            tokens = torch.nn.functional.pad(tokens, (1, 0), value=gpt.start_text_token)
+            tokens = torch.nn.functional.pad(tokens, (0, 1), value=gpt.stop_text_token)[None]
+            embedding = gpt.text_embedding(tokens) + gpt.text_pos_embedding(tokens)
+            prefixes.append(torch.cat([gpt_cond_latent, embedding], dim=1)[0])
+
+        width = max(prefix.shape[0] for prefix in prefixes)
+        batch = gpt_cond_latent.new_zeros((len(prefixes), width, prefixes[0].shape[-1]))
+        # One extra column for the start-of-audio token
+        attention_mask = torch.ones((len(prefixes), width + 1), dtype=torch.long, device=self.device)
+        for i, prefix in enumerate(prefixes):
+            batch[i, width - prefix.shape[0]:] = prefix
+            attention_mask[i, :width - prefix.shape[0]] = 0
+
+        gpt.gpt_inference.store_prefix_emb(batch)
+        inputs = torch.full((len(prefixes), width + 1), fill_value=1, dtype=torch.long, device=self.device)
+        inputs[:, -1] = gpt.start_audio_token
+        generated = gpt.gpt_inference.generate(
+            inputs,
+            attention_mask=attention_mask,
+            bos_token_id=gpt.start_audio_token,
+            pad_token_id=gpt.stop_audio_token,
+            eos_token_id=gpt.stop_audio_token,
+            max_length=gpt.max_gen_mel_tokens + inputs.shape[-1],
+            do_sample=True,
+            top_p=config.top_p,
+            top_k=config.top_k,
+            temperature=config.temperature,
+            num_return_sequences=1,
+            num_beams=1,
+            length_penalty=config.length_penalty,
+            repetition_penalty=config.repetition_penalty,
+            output_attentions=False
+        )[:, inputs.shape[-1]:]
+
+        # Rows that finished early are padded with stop tokens
+        codes = []
+        for row in generated:
+            stops = (row == gpt.stop_audio_token).nonzero()
+            codes.append(row[:stops[0, 0] + 1] if len(stops) else row)
+        return codes
+
+    def _decode_latents(self, latents: List, speaker_embedding) -> List:
+        """
+        Decode the GPT latents of every row in one HiFi-GAN pass
+
+        Shorter rows are padded by repeating their last frame and their audio
+        cut back to the length an unbatched decode gives. The decoder's
+        convolutions see past the cut, so the last few milliseconds can
+        differ slightly from unbatched output.
+
+        Returns:
+            Float waveform of each row
+        """
+        decoder = self.model.hifigan_decoder
+        length = max(latent.shape[0] for latent in latents)
+        batch = torch.stack([
+            torch.nn.functional.pad(latent.T[None], (0, length - latent.shape[0]), mode="replicate")[0].T
+            for latent in latents
+        ])
+        wavs = decoder(batch, g=speaker_embedding.expand(len(latents), -1, -1)).cpu()
+
+        results = []
+        for latent, wav in zip(latents, wavs):
+            # Same rounding as the decoder's interpolations
+            frames = int(latent.shape[0] * decoder.ar_mel_length_compression / decoder.output_hop_length)
+            if decoder.output_sample_rate != decoder.input_sample_rate:
+                frames = int(frames * decoder.output_sample_rate / decoder.input_sample_rate)
+            results.append(wav.reshape(-1)[:frames * decoder.output_hop_length])
+        return results
+
+    async def stream_audio(
+        self,
+        text: str,
+        speed: float = 0.95,
+        chunk_size: int = 20,
+        cancel: Optional[threading.Event] = None,
+        speaker_wav: Optional[str] = None
+    ) -> AsyncIterator[bytes]:
+        """
+        Stream audio while the GPT decoder is still running
+
+        Args:
+            text: Text to synthesize
+            speed: Speech rate (0.8-1.2, lower = slower/more drunk)
+            chunk_size: GPT tokens decoded per audio chunk (smaller = lower latency)
+            cancel: Set to stop synthesis after the current chunk
+            speaker_wav: Reference clip of the voice to use (None: the default voice)
+
+        Yields:
+            16-bit mono PCM chunks at `self.sample_rate`
+        """
+        async for chunk in self.run_inference_stream(
+            self._synthesize_stream, text, speed, chunk_size, speaker_wav, cancel=cancel
+        ):
+            yield chunk
+
+    def _synthesize_stream(self, text: str, speed: float, chunk_size: int, speaker_wav: Optional[str] = None):
+        """Blocking incremental synthesis, runs on the inference executor"""
+        gpt_cond_latent, speaker_embedding = self._get_voice(speaker_wav)
+        config = self.model.config
+        # The generator is driven from one executor thread, so the mode holds across yields
+        with torch.inference_mode():
+            for wav_chunk in self.model.inference_stream(
+                text,
+                "en",
+                gpt_cond_latent,
+                speaker_embedding,
+                stream_chunk_size=chunk_size,
+                temperature=config.temperature,
+                length_penalty=config.length_penalty,
+                repetition_penalty=config.repetition_penalty,
+                top_k=config.top_k,
+                top_p=config.top_p,
+                speed=speed,
+                enable_text_splitting=True
+            ):
+                yield to_pcm16(wav_chunk.cpu().numpy())
 
     def get_voice_info(self) -> dict:
         """Get information about loaded voice"""
@@ -97,5 +493,10 @@ class XTTSEngine(BaseTTSEngine):
             "model": self.tts.model_name,
             "device": self.device,
             "speaker_wav": self.speaker_wav,
-            "sample_rate": self.sample_rate
+            "sample_rate": self.sample_rate,
+            "quantized": self.quantized,
+            "torch_threads": torch.get_num_threads(),
+            "loaded_voices": len(self._voices),
+            "voice_cache_size": self.voice_cache_size,
+            "voice_loads": self.voice_loads
         }
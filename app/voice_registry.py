@@ -0,0 +1,219 @@
+"""
+Voice Registry
+Named reference clips for voice cloning, selectable per request
+"""
+import fcntl
+import hashlib
+import io
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import soundfile as sf
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "voices.json"
+LOCK_FILE = "voices.lock"
+DEFAULT_VOICE = "default"
+NAME_PATTERN = re.compile(r"^[a-z0-9][a-z0-9_-]{0,63}$")
+# Registered clips are named after the sha256 of their contents
+CLIP_NAME_PATTERN = re.compile(r"^([0-9a-f]{16})\.wav$")
+
+
+def clip_content_id(path: str) -> Optional[str]:
+    """
+    Content hash prefix of a registered clip, taken from its file name
+
+    Lets per-voice state be keyed by content without reading the clip,
+    which may already have been deleted. None for other files, such as
+    the default SPEAKER_WAV.
+    """
+    match = CLIP_NAME_PATTERN.match(Path(path).name)
+    return match.group(1) if match else None
+
+
+class VoiceRegistry:
+    """
+    Reference clips registered under a name
+
+    Clips are normalized to 16-bit mono WAV and stored under their content
+    hash, so a path always refers to the same audio: engines can key
+    per-voice state by path, and re-registering a name with a different clip
+    gives it new cache keys instead of serving audio in the old voice. The
+    index is shared through the filesystem, so every HTTP worker and
+    inference server sees the same voices.
+
+    The name "default" (or no name) is the server's configured SPEAKER_WAV.
+    """
+
+    def __init__(self, voices_dir: str, default_speaker_wav: Optional[str] = None,
+                 min_duration_s: float = 2.0, max_duration_s: float = 60.0):
+        self.voices_dir = Path(voices_dir)
+        self.voices_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.voices_dir / INDEX_FILE
+        self.default_speaker_wav = default_speaker_wav
+        self.default_sha256 = self._file_sha256(default_speaker_wav)
+        self.min_duration_s = min_duration_s
+        self.max_duration_s = max_duration_s
+
+        self.voices: Dict[str, dict] = {}
+        self._index_mtime = None
+        self._refresh()
+        logger.info(f"🗣️  Voice registry: {len(self.voices)} registered voices")
+
+    @staticmethod
+    def _file_sha256(path: Optional[str]) -> Optional[str]:
+        """Content hash of a clip, or None if there isn't one"""
+        try:
+            return hashlib.sha256(Path(path).read_bytes()).hexdigest() if path else None
+        except OSError:
+            return None
+
+    @contextmanager
+    def _locked(self):
+        """Exclusive lock against other processes changing the index"""
+        with open(self.voices_dir / LOCK_FILE, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _refresh(self):
+        """Reload the index if another process changed it"""
+        try:
+            mtime = self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            self.voices = {}
+            self._index_mtime = None
+            return
+        if mtime == self._index_mtime:
+            return
+        try:
+            self.voices = json.loads(self.index_path.read_text())
+            self._index_mtime = mtime
+        except Exception as e:
+            logger.error(f"Error loading voice index: {e}")
+
+    def _save(self):
+        tmp_path = self.index_path.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps(self.voices, indent=2))
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = self.index_path.stat().st_mtime_ns
+
+    def list_voices(self) -> List[dict]:
+        """The default voice followed by registered voices, by name"""
+        self._refresh()
+        default = {"name": DEFAULT_VOICE, "path": self.default_speaker_wav, "default": True}
+        return [default] + [self.voices[name] for name in sorted(self.voices)]
+
+    def resolve(self, name: Optional[str]) -> Optional[dict]:
+        """
+        Look up a voice by name
+
+        Args:
+            name: Registered voice name; None or "default" for the default voice
+
+        Returns:
+            The voice record, or None for the default voice
+
+        Raises:
+            KeyError: If no voice is registered under the name
+        """
+        if not name or name == DEFAULT_VOICE:
+            return None
+        # Another worker may have registered, replaced or deleted it (one stat when unchanged)
+        self._refresh()
+        voice = self.voices.get(name)
+        if voice is None:
+            raise KeyError(name)
+        return voice
+
+    def register(self, name: str, audio: bytes, description: str = "") -> dict:
+        """
+        Register (or replace) a voice from a reference clip
+
+        Args:
+            name: Voice name (lowercase letters, digits, '-' and '_')
+            audio: Reference clip in any format soundfile reads (WAV, FLAC, OGG)
+            description: Free-form note shown when listing voices
+
+        Returns:
+            The voice record
+
+        Raises:
+            ValueError: If the name or the clip is not usable
+        """
+        if name == DEFAULT_VOICE or not NAME_PATTERN.match(name):
+            raise ValueError(f"Invalid voice name: {name!r}")
+
+        try:
+            samples, sample_rate = sf.read(io.BytesIO(audio), dtype="float32", always_2d=True)
+        except Exception as e:
+            raise ValueError(f"Unreadable audio: {e}")
+        samples = samples.mean(axis=1)
+        duration = len(samples) / sample_rate
+        if not self.min_duration_s <= duration <= self.max_duration_s:
+            raise ValueError(
+                f"Reference clip is {duration:.1f}s; use {self.min_duration_s:.0f}-{self.max_duration_s:.0f}s of clean speech"
+            )
+        if not np.any(samples):
+            raise ValueError("Reference clip is silent")
+
+        buffer = io.BytesIO()
+        sf.write(buffer, samples, sample_rate, format="WAV", subtype="PCM_16")
+        wav = buffer.getvalue()
+        digest = hashlib.sha256(wav).hexdigest()
+        path = self.voices_dir / f"{digest[:16]}.wav"
+
+        with self._locked():
+            self._refresh()
+            if not path.exists():
+                tmp_path = path.with_suffix(".tmp")
+                tmp_path.write_bytes(wav)
+                os.replace(tmp_path, path)
+            replaced = self.voices.get(name)
+            self.voices[name] = {
+                "name": name,
+                "path": str(path),
+                "sha256": digest,
+                "duration_s": round(duration, 2),
+                "sample_rate": sample_rate,
+                "description": description,
+                "created": round(time.time(), 3),
+            }
+            self._save()
+            if replaced:
+                self._remove_unused(replaced)
+
+        logger.info(f"🗣️  Registered voice '{name}' ({duration:.1f}s)")
+        return self.voices[name]
+
+    def delete(self, name: str) -> bool:
+        """Remove a voice; returns False if it was not registered"""
+        with self._locked():
+            self._refresh()
+            voice = self.voices.pop(name, None)
+            if voice is None:
+                return False
+            self._save()
+            self._remove_unused(voice)
+
+        logger.info(f"Deleted voice '{name}'")
+        return True
+
+    def _remove_unused(self, voice: dict):
+        """Delete a clip once no name refers to it (call with the lock held)"""
+        if any(other["path"] == voice["path"] for other in self.voices.values()):
+            return
+        try:
+            os.unlink(voice["path"])
+        except FileNotFoundError:
+            pass
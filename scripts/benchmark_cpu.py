@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+"""
+Benchmark the XTTS CPU fast path against full precision
+
+Loads the model once in full precision and once with XTTS_CPU_OPTIMIZE
+(int8 GPT), synthesizes the same phrases with the same seeds in each, and
+reports real-time factor (synthesis seconds per second of audio), load
+time (including the warm-up synthesis), memory after load, and how close
+the optimized output stays to the baseline. Sampling makes waveforms
+differ from run to run even in full precision, so similarity is measured
+on speaker embeddings: each output's cosine similarity to the reference
+voice, and the optimized outputs' similarity to the baseline outputs of
+the same phrase.
+
+Requires the XTTS dependencies (requirements.txt) and about twice the
+model's memory; the optimized run's RSS includes what the baseline run
+left allocated.
+
+Usage:
+    python scripts/benchmark_cpu.py [--speaker-wav voices/jim_voice.wav]
+        [--threads 4] [--interop-threads 1] [--json cpu.json]
+"""
+import argparse
+import gc
+import json
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import numpy as np  # noqa: E402
+
+from app.audio_utils import wav_duration  # noqa: E402
+from app.config import settings  # noqa: E402
+
+PHRASES = [
+    "Nice throw!",
+    "Triple twenty! Amazing!",
+    "Ohhh, that's a miss! Are you even trying?",
+    "Bullseye! What a comeback, the crowd goes wild!",
+    "Game over! Next player, step up to the oche and show us what you've got.",
+]
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * resource.getpagesize() / 1024 / 1024, 1)
+    except OSError:
+        # No /proc (macOS): fall back to the peak
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def cosine(a, b) -> float:
+    a, b = np.asarray(a).ravel(), np.asarray(b).ravel()
+    return float(np.dot(a, b) / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+
+def speaker_embedding(engine, audio: bytes, workdir: Path):
+    """Speaker embedding of synthesized audio, from the engine's (float32) speaker encoder"""
+    path = workdir / "embed.wav"
+    path.write_bytes(audio)
+    _, embedding = engine.model.get_conditioning_latents(audio_path=[str(path)])
+    return embedding.cpu().numpy()
+
+
+def run_mode(optimize: bool, args, workdir: Path, reference=None) -> dict:
+    import torch
+    from app.tts_engine_xtts import XTTSEngine
+
+    settings.xtts_cpu_optimize = optimize
+    started = time.perf_counter()
+    engine = XTTSEngine(settings.tts_model, device="cpu", speaker_wav=args.speaker_wav)
+    load_s = time.perf_counter() - started
+    memory = rss_mb()
+
+    voice = engine.speaker_embedding.cpu().numpy()
+    phrases = []
+    for i, text in enumerate(PHRASES):
+        rtfs = []
+        for run in range(args.runs):
+            torch.manual_seed(args.seed + i * 1000 + run)
+            t = time.perf_counter()
+            audio = engine._synthesize(text, 1.0)
+            synthesis_s = time.perf_counter() - t
+            rtfs.append(synthesis_s / wav_duration(audio))
+
+        embedding = speaker_embedding(engine, audio, workdir)
+        result = {
+            "text": text,
+            "audio_s": round(wav_duration(audio), 2),
+            "rtf": round(float(np.median(rtfs)), 3),
+            "voice_similarity": round(cosine(embedding, voice), 4),
+        }
+        if reference is not None:
+            result["baseline_similarity"] = round(cosine(embedding, reference[i]["embedding"]), 4)
+        result["embedding"] = embedding
+        phrases.append(result)
+        print(f"  {'int8' if optimize else 'fp32'} rtf {result['rtf']:.3f}  {text}", file=sys.stderr)
+
+    summary = {
+        "quantized": engine.quantized,
+        "torch_threads": torch.get_num_threads(),
+        "load_s": round(load_s, 2),
+        "rss_mb": memory,
+        "rtf_mean": round(float(np.mean([p["rtf"] for p in phrases])), 3),
+        "voice_similarity_mean": round(float(np.mean([p["voice_similarity"] for p in phrases])), 4),
+        "phrases": phrases,
+    }
+    if reference is not None:
+        summary["baseline_similarity_mean"] = round(float(np.mean([p["baseline_similarity"] for p in phrases])), 4)
+
+    del engine
+    gc.collect()
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare XTTS CPU fast path with full precision")
+    parser.add_argument("--speaker-wav", default="voices/jim_voice.wav", help="Reference voice clip")
+    parser.add_argument("--threads", type=int, help="Override TORCH_THREADS")
+    parser.add_argument("--interop-threads", type=int, help="Override TORCH_INTEROP_THREADS")
+    parser.add_argument("--runs", type=int, default=2, help="Syntheses per phrase (median RTF is reported)")
+    parser.add_argument("--seed", type=int, default=0, help="Sampling seed")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="tts-cpu-bench-"))
+    settings.tts_device = "cpu"
+    settings.speaker_latent_dir = str(workdir / "latents")
+    if args.threads is not None:
+        settings.torch_threads = args.threads
+    if args.interop_threads is not None:
+        settings.torch_interop_threads = args.interop_threads
+
+    baseline = run_mode(False, args, workdir)
+    optimized = run_mode(True, args, workdir, reference=baseline["phrases"])
+
+    for summary in (baseline, optimized):
+        for phrase in summary["phrases"]:
+            del phrase["embedding"]
+    results = {
+        "model": settings.tts_model,
+        "baseline": baseline,
+        "optimized": optimized,
+        "speedup": round(baseline["rtf_mean"] / optimized["rtf_mean"], 2) if optimized["rtf_mean"] else None,
+    }
+
+    print(f"\n{'':<10}{'RTF':>8}{'load s':>9}{'voice sim':>11}{'vs fp32':>9}{'RSS MB':>10}")
+    for name, summary in (("fp32", baseline), ("int8", optimized)):
+        print(f"{name:<10}{summary['rtf_mean']:>8.3f}{summary['load_s']:>9.1f}"
+              f"{summary['voice_similarity_mean']:>11.4f}{summary.get('baseline_similarity_mean', 1.0):>9.4f}"
+              f"{summary['rss_mb']:>10.0f}")
+    print(f"\nSpeed-up: {results['speedup']}x")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"Wrote {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
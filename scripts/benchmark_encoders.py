@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+"""
+Benchmark output encodings
+
+Reports encoded size (bytes per second of audio) and encode cost for every
+registered format, using a WAV file as the source rendering.
+
+Usage:
+    python scripts/benchmark_encoders.py [input.wav] [--runs 20] [--json out.json]
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.audio_encoders import ENCODERS, encode_audio  # noqa: E402
+from app.audio_utils import decode_wav  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark audio output encodings")
+    parser.add_argument("input", nargs="?", default="voices/jim_voice.wav", help="Source WAV file")
+    parser.add_argument("--runs", type=int, default=20, help="Encodes per format")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    args = parser.parse_args()
+
+    audio = Path(args.input).read_bytes()
+    sample_rate, samples = decode_wav(audio)
+    duration = len(samples) / sample_rate
+    print(f"Source: {args.input} ({duration:.2f}s @ {sample_rate} Hz, {len(audio)} bytes)\n")
+
+    results = []
+    for name in ENCODERS:
+        encoded = encode_audio(audio, name)  # warm-up
+        started = time.perf_counter()
+        for _ in range(args.runs):
+            encode_audio(audio, name)
+        encode_ms = (time.perf_counter() - started) / args.runs * 1000
+
+        results.append({
+            "format": name,
+            "bytes": len(encoded),
+            "bytes_per_audio_second": round(len(encoded) / duration),
+            "encode_ms": round(encode_ms, 3),
+            "encode_ms_per_audio_second": round(encode_ms / duration, 3),
+        })
+
+    baseline = next(r["bytes"] for r in results if r["format"] == "wav-float32")
+    print(f"{'format':<14}{'bytes':>10}{'B/s audio':>12}{'vs f32':>9}{'encode ms':>12}{'ms/s audio':>12}")
+    for r in results:
+        r["ratio_vs_float32"] = round(r["bytes"] / baseline, 4)
+        print(f"{r['format']:<14}{r['bytes']:>10}{r['bytes_per_audio_second']:>12}"
+              f"{r['ratio_vs_float32']:>9.3f}{r['encode_ms']:>12.2f}{r['encode_ms_per_audio_second']:>12.2f}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({
+            "source": args.input,
+            "duration_s": round(duration, 3),
+            "sample_rate": sample_rate,
+            "results": results,
+        }, indent=2))
+        print(f"\nWrote {args.json}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+#!/usr/bin/env python
+"""
+Benchmark the server end to end
+
+Drives the FastAPI app in-process (no network, no TLS) at a given
+concurrency and cache hit ratio, then reports throughput, latency
+percentiles, memory and startup time (to accepting connections and to
+ready) as JSON. Uses the deterministic stub
+engine by default, so no model download is needed; pass --engine xtts to
+measure the real model on CPU with the same workload.
+
+Requires httpx (pip install httpx).
+
+Usage:
+    python scripts/benchmark_server.py [--engine stub|xtts] [--requests 200]
+        [--concurrency 8] [--hit-ratio 0.5] [--json baseline.json]
+"""
+import argparse
+import asyncio
+import json
+import random
+import resource
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import httpx  # noqa: E402
+
+from app.config import settings  # noqa: E402
+
+WORDS = (
+    "nice throw triple twenty bullseye miss double top what a comeback next player "
+    "game over are you even trying shanghai checkout treble nineteen one hundred and eighty"
+).split()
+
+
+def rss_mb() -> float:
+    """Current resident set size in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return round(pages * resource.getpagesize() / 1024 / 1024, 1)
+    except OSError:
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KB, macOS bytes
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def percentile(values, q: float) -> float:
+    """Nearest-rank percentile"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def make_phrase(rng: random.Random, i: int) -> str:
+    return f"{' '.join(rng.choices(WORDS, k=rng.randint(3, 8))).capitalize()} {i}!"
+
+
+async def run(args) -> dict:
+    from app import main
+
+    memory_before = rss_mb()
+    started = time.perf_counter()
+    await main.startup_event()
+    accepting_s = time.perf_counter() - started
+    # The model loads in the background; wait until misses can be served
+    await main.startup_task
+    startup_s = time.perf_counter() - started
+    memory_loaded = rss_mb()
+
+    rng = random.Random(args.seed)
+    hot = [make_phrase(rng, i) for i in range(args.hot_phrases)]
+    params = {"use_personality": "false", "format": args.format}
+
+    transport = httpx.ASGITransport(app=main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        # Put the hot set in the cache so the hit ratio holds from the first request
+        for text in hot:
+            response = await client.post("/tts/generate", params={**params, "text": text})
+            response.raise_for_status()
+
+        texts = [
+            rng.choice(hot) if rng.random() < args.hit_ratio else make_phrase(rng, args.hot_phrases + i)
+            for i in range(args.requests)
+        ]
+        latencies = []
+        statuses: Counter = Counter()
+        cache: Counter = Counter()
+        pending = iter(texts)
+
+        async def worker():
+            for text in pending:
+                t = time.perf_counter()
+                response = await client.post("/tts/generate", params={**params, "text": text})
+                latencies.append((time.perf_counter() - t) * 1000)
+                statuses[str(response.status_code)] += 1
+                cache[response.headers.get("X-Cache", "-")] += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+        health = (await client.get("/health")).json()
+
+    await main.shutdown_event()
+
+    return {
+        "config": {
+            "engine": settings.selected_engine,
+            "requests": args.requests,
+            "concurrency": args.concurrency,
+            "hit_ratio": args.hit_ratio,
+            "hot_phrases": args.hot_phrases,
+            "format": args.format,
+            "inference_workers": settings.inference_workers,
+            "inference_queue_size": settings.inference_queue_size,
+            "micro_batch_enabled": settings.micro_batch_enabled,
+            "stub_latency_ms": settings.stub_latency_ms,
+            "stub_cpu_ms": settings.stub_cpu_ms,
+        },
+        "accepting_s": round(accepting_s, 3),
+        "startup_s": round(startup_s, 3),
+        "startup_phases_s": main.startup_phases,
+        "duration_s": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else 0.0,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(sum(latencies) / len(latencies), 2) if latencies else 0.0,
+            "max": round(max(latencies), 2) if latencies else 0.0,
+        },
+        "status": dict(statuses),
+        "cache": dict(cache),
+        "memory_mb": {
+            "before_startup": memory_before,
+            "after_startup": memory_loaded,
+            "end": rss_mb(),
+            "peak": peak_rss_mb(),
+        },
+        "inference": {
+            key: health["inference"][key]
+            for key in ("completed", "failed", "rejected", "avg_wait_ms", "max_wait_ms")
+        },
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the TTS server in-process")
+    parser.add_argument("--engine", choices=["stub", "xtts"], default="stub", help="TTS engine to benchmark")
+    parser.add_argument("--requests", type=int, default=200, help="Timed requests to send")
+    parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once")
+    parser.add_argument("--hit-ratio", type=float, default=0.5, help="Fraction of requests for cached phrases")
+    parser.add_argument("--hot-phrases", type=int, default=20, help="Size of the cached phrase set")
+    parser.add_argument("--format", default="wav-int16", help="Output format requested")
+    parser.add_argument("--latency-ms", type=int, help="Stub: simulated inference latency")
+    parser.add_argument("--cpu-ms", type=int, help="Stub: simulated inference CPU work")
+    parser.add_argument("--workers", type=int, help="Override INFERENCE_WORKERS")
+    parser.add_argument("--queue-size", type=int, help="Override INFERENCE_QUEUE_SIZE")
+    parser.add_argument("--micro-batch", action="store_true", help="Enable micro-batching")
+    parser.add_argument("--seed", type=int, default=0, help="Workload random seed")
+    parser.add_argument("--json", help="Write results to this JSON file")
+    parser.add_argument("--verbose", action="store_true", help="Show server logs")
+    args = parser.parse_args()
+
+    # Isolated cache and history so runs are repeatable
+    workdir = Path(tempfile.mkdtemp(prefix="tts-bench-"))
+    settings.log_level = "INFO" if args.verbose else "WARNING"
+    settings.tts_engine = args.engine
+    settings.tts_device = "cpu"
+    settings.cache_dir = str(workdir / "cache")
+    settings.speaker_latent_dir = str(workdir / "latents")
+    settings.voices_dir = str(workdir / "voices")
+    settings.jobs_dir = str(workdir / "jobs")
+    settings.request_log_path = str(workdir / "requests.log")
+    settings.phrase_stats_path = str(workdir / "phrase_stats.json")
+    settings.pregenerate_on_startup = False
+    settings.speculation_enabled = False
+    settings.micro_batch_enabled = args.micro_batch
+    if args.latency_ms is not None:
+        settings.stub_latency_ms = args.latency_ms
+    if args.cpu_ms is not None:
+        settings.stub_cpu_ms = args.cpu_ms
+    if args.workers is not None:
+        settings.inference_workers = args.workers
+    if args.queue_size is not None:
+        settings.inference_queue_size = args.queue_size
+
+    results = asyncio.run(run(args))
+
+    print(json.dumps(results, indent=2))
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+        print(f"\nWrote {args.json}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
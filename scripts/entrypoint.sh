@@ -15,5 +15,20 @@ except Exception as e:
     print(f'Pre-initialization: {e}')
 " 2>&1 | grep -v "EOF when reading" || true
 
+# In remote mode the model runs in dedicated inference server processes that
+# all HTTP workers share
+if [ "${INFERENCE_MODE:-local}" = "remote" ]; then
+    # Requests to the servers are pickled, so the socket key must stay private
+    if [ -z "${INFERENCE_AUTHKEY}" ]; then
+        INFERENCE_AUTHKEY="$(python -c 'import secrets; print(secrets.token_hex(32))')"
+        export INFERENCE_AUTHKEY
+    fi
+    for i in $(seq 0 $(( ${INFERENCE_PROCESSES:-1} - 1 ))); do
+        python -m app.inference_server --index "$i" &
+    done
+elif [ "${WEB_WORKERS:-1}" -gt 1 ]; then
+    echo "WEB_WORKERS=${WEB_WORKERS} without INFERENCE_MODE=remote loads one model per worker"
+fi
+
 # Now start the actual server
-exec python -m uvicorn app.main:app --host "${SERVER_HOST:-0.0.0.0}" --port "${SERVER_PORT:-8000}" --ssl-keyfile "${SSL_KEY_PATH:-/app/certs/key.pem}" --ssl-certfile "${SSL_CERT_PATH:-/app/certs/cert.pem}"
+exec python -m uvicorn app.main:app --host "${SERVER_HOST:-0.0.0.0}" --port "${SERVER_PORT:-8000}" --workers "${WEB_WORKERS:-1}" --ssl-keyfile "${SSL_KEY_PATH:-/app/certs/key.pem}" --ssl-certfile "${SSL_CERT_PATH:-/app/certs/cert.pem}"
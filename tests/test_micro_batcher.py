@@ -0,0 +1,117 @@
+"""
+Micro-batching against the stub engine (runs on CPU, no model download)
+"""
+import asyncio
+import threading
+
+import pytest
+
+from app import metrics
+from app.config import settings
+from app.inference_executor import current_priority, inference_priority
+from app.micro_batcher import MicroBatcher
+from app.tts_engine_stub import StubEngine
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    monkeypatch.setattr(settings, "stub_latency_ms", 10)
+    monkeypatch.setattr(settings, "stub_cpu_ms", 0)
+    monkeypatch.setattr(settings, "inference_workers", 1)
+    return StubEngine()
+
+
+async def _timed(batcher: MicroBatcher, text: str, **kwargs):
+    """Synthesize as its own request, returning the audio and its stage timings"""
+    timings = metrics.start_timings()
+    audio = await batcher.generate_audio(text, **kwargs)
+    return audio, timings
+
+
+def test_concurrent_requests_share_a_batch(engine):
+    batcher = MicroBatcher(engine, max_batch_size=4, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(*(batcher.generate_audio(text) for text in ("one", "three", "seven")))
+
+    results = asyncio.run(run())
+
+    assert engine.batch_shapes == [(3, 5)]
+    assert batcher.get_stats()["batch_sizes"] == {3: 1}
+    # Split back to each caller in order, identical to unbatched synthesis
+    assert results == [asyncio.run(engine.generate_audio(text)) for text in ("one", "three", "seven")]
+
+
+def test_batches_flush_at_max_size(engine):
+    batcher = MicroBatcher(engine, max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        await asyncio.gather(*(batcher.generate_audio("x" * length) for length in (1, 2, 3, 4, 5)))
+
+    asyncio.run(run())
+
+    assert sorted(engine.batch_shapes) == [(1, 5), (2, 2), (2, 4)]
+    assert batcher.get_stats()["occupancy"] == round(5 / 6, 4)
+
+
+def test_only_same_speed_and_voice_share_a_batch(engine):
+    batcher = MicroBatcher(engine, max_batch_size=4, max_wait_ms=20)
+
+    async def run():
+        await asyncio.gather(
+            batcher.generate_audio("a", speed=1.0),
+            batcher.generate_audio("bb", speed=1.0),
+            batcher.generate_audio("ccc", speed=0.9),
+            batcher.generate_audio("dddd", speed=1.0, speaker_wav="other.wav"),
+        )
+
+    asyncio.run(run())
+
+    assert sorted(engine.batch_shapes) == [(1, 3), (1, 4), (2, 2)]
+
+
+def test_each_member_gets_the_batch_timings(engine):
+    batcher = MicroBatcher(engine, max_batch_size=2, max_wait_ms=50)
+
+    async def run():
+        return await asyncio.gather(_timed(batcher, "one"), _timed(batcher, "two"))
+
+    (_, first), (_, second) = asyncio.run(run())
+
+    assert engine.batch_shapes == [(2, 3)]
+    assert first["inference"] > 0
+    assert first["inference"] == second["inference"]
+
+
+def test_raising_a_member_raises_the_queued_batch(engine):
+    batcher = MicroBatcher(engine, max_batch_size=2, max_wait_ms=50)
+    release = threading.Event()
+
+    async def run():
+        # Occupy the only worker so the batch has to queue
+        blocker = asyncio.ensure_future(engine.run_inference(release.wait))
+        await asyncio.sleep(0)
+
+        refs = []
+
+        async def member(text):
+            with inference_priority("background"):
+                refs.append(current_priority())
+                return await batcher.generate_audio(text)
+
+        members = asyncio.gather(member("one"), member("two"))
+        try:
+            while not engine.inference._waiters:
+                await asyncio.sleep(0.001)
+
+            waiter = engine.inference._waiters[0]
+            assert waiter.priority.name == "background"
+            # A live request coalescing onto one member raises that member's ref
+            refs[1].raise_to("interactive")
+            assert waiter.priority.name == "interactive"
+        finally:
+            release.set()
+            await blocker
+            await members
+
+    asyncio.run(run())